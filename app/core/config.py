@@ -2,7 +2,6 @@ import secrets
 from dotenv import load_dotenv
 from starlette.config import Config
 from starlette.datastructures import Secret
-from databases import DatabaseURL
 from pathlib import Path
 
 
@@ -25,6 +24,37 @@ ENCODING_ALGORITHM: str = "HS256"
 SECRET_KEY: str = secrets.token_urlsafe(32)
 ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 # 1 hour
 REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 # 1 day
+PRINCIPAL_CACHE_SIZE: int = config("PRINCIPAL_CACHE_SIZE", cast=int, default=10000)
+PRINCIPAL_CACHE_TTL_SECONDS: float = config("PRINCIPAL_CACHE_TTL_SECONDS", cast=float, default=15)
+PASSWORD_HASH_WORKERS: int = config("PASSWORD_HASH_WORKERS", cast=int, default=4)
+PASSWORD_HASH_MAX_QUEUE: int = config("PASSWORD_HASH_MAX_QUEUE", cast=int, default=64)
+
+QUIZ_CACHE_SIZE: int = config("QUIZ_CACHE_SIZE", cast=int, default=1024)
+QUIZ_CACHE_TTL_SECONDS: float = config("QUIZ_CACHE_TTL_SECONDS", cast=float, default=30)
+QUIZ_BATCH_MAX_SIZE: int = config("QUIZ_BATCH_MAX_SIZE", cast=int, default=100)
+QUIZ_IMPORT_BATCH_SIZE: int = config("QUIZ_IMPORT_BATCH_SIZE", cast=int, default=500)
+ATTEMPT_STORE_URL: str = config("ATTEMPT_STORE_URL", cast=str, default="")
+ATTEMPT_STORE_SIZE: int = config("ATTEMPT_STORE_SIZE", cast=int, default=100000)
+ATTEMPT_TTL_SECONDS: float = config("ATTEMPT_TTL_SECONDS", cast=float, default=4 * 60 * 60)
+QUESTION_SEARCH_MAX_LENGTH: int = config("QUESTION_SEARCH_MAX_LENGTH", cast=int, default=200)
+CATALOGUE_CACHE_CONTROL: str = config("CATALOGUE_CACHE_CONTROL", default="private, no-cache")
+CATALOGUE_ETAG_TTL_SECONDS: float = config("CATALOGUE_ETAG_TTL_SECONDS", cast=float, default=30)
+
+# write graded results behind from an in-process queue instead of committing each submission
+RESULT_WRITE_BEHIND: bool = config("RESULT_WRITE_BEHIND", cast=bool, default=False)
+RESULT_QUEUE_SIZE: int = config("RESULT_QUEUE_SIZE", cast=int, default=10000)
+RESULT_FLUSH_BATCH_SIZE: int = config("RESULT_FLUSH_BATCH_SIZE", cast=int, default=1000)
+RESULT_FLUSH_RETRY_SECONDS: float = config("RESULT_FLUSH_RETRY_SECONDS", cast=float, default=1)
+RESULT_QUEUE_DRAIN_SECONDS: float = config("RESULT_QUEUE_DRAIN_SECONDS", cast=float, default=10)
+# queued results are also appended here and replayed on start; empty disables it
+RESULT_SPOOL_FILE: str = config("RESULT_SPOOL_FILE", cast=str, default="")
+
+PAGE_MAX_LIMIT: int = config("PAGE_MAX_LIMIT", cast=int, default=100)
+
+LEADERBOARD_DEFAULT_SIZE: int = config("LEADERBOARD_DEFAULT_SIZE", cast=int, default=50)
+LEADERBOARD_MAX_SIZE: int = config("LEADERBOARD_MAX_SIZE", cast=int, default=100)
+LEADERBOARD_WARM_BATCH_SIZE: int = config("LEADERBOARD_WARM_BATCH_SIZE", cast=int, default=10000)
+LEADERBOARD_TTL_SECONDS: float = config("LEADERBOARD_TTL_SECONDS", cast=float, default=30)
 
 TEST_USER_EMAIL: str = config("TEST_USER_EMAIL", cast=str)
 FIRST_SUPERUSER_EMAIL: str = config("FIRST_SUPERUSER_EMAIL", cast=str)
@@ -36,7 +66,20 @@ POSTGRES_HOST: str = config("POSTGRES_HOST", cast=str, default="db")
 POSTGRES_PORT: str = config("POSTGRES_PORT", cast=str, default="5432")
 POSTGRES_DB: str = config("POSTGRES_DB", cast=str)
 DB_DEFAULT: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
-DATABASE_URL: DatabaseURL = config("DATABASE_URL", cast=DatabaseURL, default=DB_DEFAULT)
+ASYNC_DB_DEFAULT: str = f"postgresql+asyncpg://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_HOST}:{POSTGRES_PORT}/{POSTGRES_DB}"
+
+DB_POOL_SIZE: int = config("DB_POOL_SIZE", cast=int, default=5)
+DB_MAX_OVERFLOW: int = config("DB_MAX_OVERFLOW", cast=int, default=10)
+DB_POOL_TIMEOUT_SECONDS: float = config("DB_POOL_TIMEOUT_SECONDS", cast=float, default=30)
+DB_POOL_RECYCLE_SECONDS: int = config("DB_POOL_RECYCLE_SECONDS", cast=int, default=30 * 60)
+DB_POOL_PRE_PING: bool = config("DB_POOL_PRE_PING", cast=bool, default=True)
+DB_STATEMENT_CACHE_SIZE: int = config("DB_STATEMENT_CACHE_SIZE", cast=int, default=100)
+DB_REPLICA_URL: str = config("DB_REPLICA_URL", cast=str, default="")
+PRIMARY_PIN_SECONDS: int = config("PRIMARY_PIN_SECONDS", cast=int, default=10)
+SLOW_QUERY_SECONDS: float = config("SLOW_QUERY_SECONDS", cast=float, default=0.5)
+SERVER_TIMING: bool = config("SERVER_TIMING", cast=bool, default=True)
+PROFILER_INTERVAL_SECONDS: float = config("PROFILER_INTERVAL_SECONDS", cast=float, default=0.005)
+PROFILER_MAX_SECONDS: float = config("PROFILER_MAX_SECONDS", cast=float, default=60)
 
 TEST_POSTGRES_USER: str = config("TEST_POSTGRES_USER", cast=str)
 TEST_POSTGRES_PASSWORD: Secret = config("TEST_POSTGRES_PASSWORD", cast=Secret)
@@ -44,7 +87,15 @@ TEST_POSTGRES_HOST: str = config("TEST_POSTGRES_HOST", cast=str, default="db")
 TEST_POSTGRES_PORT: str = config("TEST_POSTGRES_PORT", cast=str, default="5432")
 TEST_POSTGRES_DB: str = config("TEST_POSTGRES_DB", cast=str)
 TEST_DB_DEFAULT: str = f"postgresql://{TEST_POSTGRES_USER}:{TEST_POSTGRES_PASSWORD}@{TEST_POSTGRES_HOST}:{TEST_POSTGRES_PORT}/{TEST_POSTGRES_DB}"
-TEST_DATABASE_URL: DatabaseURL = config("TEST_DATABASE_URL", cast=DatabaseURL, default=TEST_DB_DEFAULT)
+TEST_ASYNC_DB_DEFAULT: str = f"postgresql+asyncpg://{TEST_POSTGRES_USER}:{TEST_POSTGRES_PASSWORD}@{TEST_POSTGRES_HOST}:{TEST_POSTGRES_PORT}/{TEST_POSTGRES_DB}"
 
 SENDGRID_API_KEY: str = config("SENDGRID_API_KEY", cast=str)
 FROM_EMAIL: str = config("FROM_EMAIL", cast=str)
+SENDGRID_API_URL: str = config("SENDGRID_API_URL", cast=str, default="https://api.sendgrid.com/v3/mail/send")
+
+NOTIFICATION_EXPIRE_DAYS: int = config("NOTIFICATION_EXPIRE_DAYS", cast=int, default=7)
+NOTIFICATION_BATCH_SIZE: int = config("NOTIFICATION_BATCH_SIZE", cast=int, default=500)
+NOTIFICATION_CONCURRENCY: int = config("NOTIFICATION_CONCURRENCY", cast=int, default=20)
+NOTIFICATION_MAX_RETRIES: int = config("NOTIFICATION_MAX_RETRIES", cast=int, default=5)
+NOTIFICATION_RETRY_BACKOFF_SECONDS: float = config("NOTIFICATION_RETRY_BACKOFF_SECONDS", cast=float, default=0.5)
+NOTIFICATION_CHECKPOINT_FILE: str = config("NOTIFICATION_CHECKPOINT_FILE", cast=str, default="notification.checkpoint")
@@ -1,18 +1,36 @@
 from typing import Callable
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
+from fastapi.responses import JSONResponse
 
-from app.database.connection import open_db_connection, close_db_connection
+from app.core.security import password_hasher
+from app.crud.base import MissingReference
+from app.database.session import SessionLocal, engine, read_engine
+from app.core import config
+from app.utils.leaderboard import leaderboards
+from app.utils.result_queue import result_queue
 
 
 def create_start_app_handler(app: FastAPI) -> Callable:
     async def start_app() -> None:
-        await open_db_connection(app)
+        await leaderboards.warm(SessionLocal)
+        if config.RESULT_WRITE_BEHIND:
+            await result_queue.start(SessionLocal)
 
     return start_app
 
 
 def create_stop_app_handler(app: FastAPI) -> Callable:
     async def stop_app() -> None:
-        await close_db_connection(app)
+        await result_queue.stop()
+        await engine.dispose()
+        if read_engine is not None:
+            await read_engine.dispose()
+        password_hasher.shutdown()
 
-    return stop_app
\ No newline at end of file
+    return stop_app
+
+async def missing_reference_handler(request: Request, exc: MissingReference) -> JSONResponse:
+    return JSONResponse(
+        status_code=status.HTTP_409_CONFLICT,
+        content={"detail": "A referenced row was deleted, reload and try again"}
+    )
@@ -0,0 +1,363 @@
+import logging
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, TypeVar
+
+from sqlalchemy import event
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+from starlette.routing import BaseRoute
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.core import config
+
+
+logger = logging.getLogger(__name__)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# statements run outside of any request: startup, the result queue and so on
+BACKGROUND_ROUTE = "background"
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 4, 5, 10, 20, 50, 100)
+POOL_WAIT_SECONDS_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+Labels = tuple[str, ...]
+M = TypeVar("M", bound="Metric")
+
+
+def escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(value)
+
+
+def format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{escape_label(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str, labels: Labels = ()):
+        self.name = name
+        self.description = description
+        self.labels = labels
+        self.values: dict[Labels, float] = {}
+
+    def get(self, *labels: str) -> float:
+        return self.values.get(labels, 0.0)
+
+    def clear(self) -> None:
+        self.values.clear()
+
+    def samples(self) -> list[str]:
+        return [f"{self.name}{format_labels(self.labels, labels)} {format_value(value)}" for labels, value in self.values.items()]
+
+    def render(self) -> list[str]:
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}", *self.samples()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        self.values[labels] = self.values.get(labels, 0.0) + amount
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, *labels: str, value: float) -> None:
+        self.values[labels] = value
+
+
+@dataclass
+class HistogramValue:
+    bucket_counts: list[int]
+    count: int = 0
+    sum: float = 0.0
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, labels: Labels = (), buckets: tuple[float, ...] = REQUEST_SECONDS_BUCKETS):
+        super().__init__(name, description, labels)
+        self.buckets = buckets
+        self.values: dict[Labels, HistogramValue] = {}
+
+    def observe(self, *labels: str, value: float) -> None:
+        histogram = self.values.get(labels)
+        if histogram is None:
+            histogram = self.values[labels] = HistogramValue(bucket_counts=[0] * (len(self.buckets) + 1))
+        # counts per bucket; the cumulative ones are summed up when rendered
+        histogram.bucket_counts[bisect_left(self.buckets, value)] += 1
+        histogram.count += 1
+        histogram.sum += value
+
+    def get(self, *labels: str) -> HistogramValue | None:
+        return self.values.get(labels)
+
+    def samples(self) -> list[str]:
+        lines = []
+        for labels, histogram in self.values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), histogram.bucket_counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else format_value(bound)
+                bucket_labels = format_labels(self.labels, labels, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(self.labels, labels)} {format_value(histogram.sum)}")
+            lines.append(f"{self.name}_count{format_labels(self.labels, labels)} {histogram.count}")
+        return lines
+
+
+class MetricsRegistry:
+
+    def __init__(self):
+        self.metrics: list[Metric] = []
+        # called before every render, to refresh gauges read from elsewhere
+        self.collectors: list[Callable[[], None]] = []
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        for collect in self.collectors:
+            collect()
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+    def clear(self) -> None:
+        for metric in self.metrics:
+            metric.clear()
+
+
+registry = MetricsRegistry()
+
+http_requests = registry.register(Counter(
+    "http_requests_total", "Requests handled.", ("method", "route", "status")
+))
+http_request_seconds = registry.register(Histogram(
+    "http_request_duration_seconds", "Time to handle a request.", ("method", "route"), REQUEST_SECONDS_BUCKETS
+))
+db_queries_per_request = registry.register(Histogram(
+    "db_queries_per_request", "SQL statements executed by a request.", ("method", "route"), QUERY_COUNT_BUCKETS
+))
+db_query_seconds = registry.register(Histogram(
+    "db_query_duration_seconds", "Time to execute a SQL statement.", ("route",), QUERY_SECONDS_BUCKETS
+))
+db_query_rows = registry.register(Counter(
+    "db_query_rows_total", "Rows returned or changed by SQL statements.", ("route",)
+))
+db_slow_queries = registry.register(Counter(
+    "db_slow_queries_total", "SQL statements slower than SLOW_QUERY_SECONDS.", ("route",)
+))
+db_pool_checkout_seconds = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds", "Time to get a connection from the pool.", ("pool",), POOL_WAIT_SECONDS_BUCKETS
+))
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_timeouts_total", "Checkouts that gave up after DB_POOL_TIMEOUT_SECONDS.", ("pool",)
+))
+db_pool_size = registry.register(Gauge(
+    "db_pool_size", "Connections the pool keeps open.", ("pool",)
+))
+db_pool_checked_out = registry.register(Gauge(
+    "db_pool_checked_out", "Connections in use.", ("pool",)
+))
+db_pool_checked_in = registry.register(Gauge(
+    "db_pool_checked_in", "Idle connections in the pool.", ("pool",)
+))
+db_pool_overflow = registry.register(Gauge(
+    "db_pool_overflow", "Connections open beyond the pool size.", ("pool",)
+))
+password_hash_in_flight = registry.register(Gauge(
+    "password_hash_in_flight", "Password hashes running on the hasher threads."
+))
+password_hash_queue_depth = registry.register(Gauge(
+    "password_hash_queue_depth", "Password hashes waiting for a hasher thread."
+))
+password_hash_rejected = registry.register(Counter(
+    "password_hash_rejected_total", "Password hashes rejected because PASSWORD_HASH_MAX_QUEUE was full."
+))
+
+
+@dataclass
+class RequestMetrics:
+    scope: Scope
+    queries: int = 0
+    query_seconds: float = 0.0
+    rows: int = 0
+    started: float = field(default_factory=time.perf_counter)
+    # seconds spent in each named phase, see app/core/timing.py
+    timings: dict[str, float] = field(default_factory=dict)
+    endpoint_returned: float | None = None
+
+    @property
+    def method(self) -> str:
+        return self.scope["method"]
+
+    @property
+    def route(self) -> str:
+        return route_name(self.scope)
+
+    def server_timing(self) -> str:
+        entries = [f"{phase};dur={seconds * 1000:.2f}" for phase, seconds in self.timings.items()]
+        entries.append(f'db;dur={self.query_seconds * 1000:.2f};desc="{self.queries} queries"')
+        entries.append(f"total;dur={(time.perf_counter() - self.started) * 1000:.2f}")
+        return ", ".join(entries)
+
+
+current_request: ContextVar[RequestMetrics | None] = ContextVar("current_request", default=None)
+
+_route_paths: dict[Callable, str] = {}
+
+
+# the path template of the matched route, so /quiz/1/view and /quiz/2/view share their series
+def route_name(scope: Scope) -> str:
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    path = _route_paths.get(endpoint)
+    if path is None:
+        routes: list[BaseRoute] = scope["app"].routes
+        _route_paths.update({route.endpoint: route.path for route in routes if hasattr(route, "endpoint")})
+        path = _route_paths.setdefault(endpoint, getattr(endpoint, "__name__", UNMATCHED_ROUTE))
+    return path
+
+
+# Attributes every statement of the engine, with its duration and row count,
+# to the request whose task executes it.
+def instrument_engine(engine: AsyncEngine) -> None:
+    sync_engine = engine.sync_engine
+
+    @event.listens_for(sync_engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        seconds = time.perf_counter() - conn.info["query_started"].pop()
+        rows = cursor.rowcount
+        if rows < 0:
+            # asyncpg only reports a count for changes; the adapter has already fetched any selected rows
+            rows = len(getattr(cursor, "_rows", None) or ())
+        record_query(statement, seconds, rows)
+
+    @event.listens_for(sync_engine, "handle_error")
+    def handle_error(context):
+        started = context.connection.info.get("query_started") if context.connection is not None else None
+        if started:
+            started.pop()
+
+
+def record_query(statement: str, seconds: float, rows: int) -> None:
+    request = current_request.get()
+    route = BACKGROUND_ROUTE
+    if request is not None:
+        route = request.route
+        request.queries += 1
+        request.query_seconds += seconds
+        request.rows += rows
+    db_query_seconds.observe(route, value=seconds)
+    db_query_rows.inc(route, amount=rows)
+    if seconds >= config.SLOW_QUERY_SECONDS:
+        db_slow_queries.inc(route)
+        method = request.method if request is not None else "-"
+        logger.warning("Slow query in %s %s: %.1f ms, %d rows: %s", method, route, seconds * 1000, rows, " ".join(statement.split()))
+
+
+# Times every checkout, so waiting for a free connection shows up both in
+# the histogram and in the `pool` phase of the request that waited.
+# The `pool` label is the pool's logging name (create_engine's
+# pool_logging_name), which survives the pool being recreated on dispose().
+def pool_label(pool: Pool) -> str:
+    return pool.logging_name or "default"
+
+
+class InstrumentedQueuePool(AsyncAdaptedQueuePool):
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except PoolTimeoutError:
+            db_pool_timeouts.inc(pool_label(self))
+            raise
+        finally:
+            seconds = time.perf_counter() - started
+            db_pool_checkout_seconds.observe(pool_label(self), value=seconds)
+            request = current_request.get()
+            if request is not None:
+                request.timings["pool"] = request.timings.get("pool", 0.0) + seconds
+
+
+def instrument_pool(engine: AsyncEngine) -> None:
+    def collect() -> None:
+        pool = engine.pool
+        if isinstance(pool, QueuePool):
+            label = pool_label(pool)
+            db_pool_size.set(label, value=pool.size())
+            db_pool_checked_out.set(label, value=pool.checkedout())
+            db_pool_checked_in.set(label, value=pool.checkedin())
+            # counts up from -size until the pool is full
+            db_pool_overflow.set(label, value=max(pool.overflow(), 0))
+
+    registry.collectors.append(collect)
+
+
+# `hasher` is an app.core.security.PasswordHasherPool, which counts its own rejections
+def instrument_password_hasher(hasher) -> None:
+    def collect() -> None:
+        stats = hasher.stats()
+        password_hash_in_flight.set(value=stats["in_flight"])
+        password_hash_queue_depth.set(value=stats["queue_depth"])
+
+    registry.collectors.append(collect)
+
+
+class RequestMetricsMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(scope=scope)
+        token = current_request.set(request)
+        status = 500
+
+        async def send_with_status(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if config.SERVER_TIMING:
+                    MutableHeaders(scope=message).append("Server-Timing", request.server_timing())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            seconds = time.perf_counter() - request.started
+            current_request.reset(token)
+            # the router has filled in the endpoint by now
+            method, route = request.method, request.route
+            http_requests.inc(method, route, str(status))
+            http_request_seconds.observe(method, route, value=seconds)
+            db_queries_per_request.observe(method, route, value=request.queries)
@@ -0,0 +1,62 @@
+import asyncio
+import sys
+import threading
+import time
+from collections import Counter
+from types import FrameType
+
+from app.core import config
+from app.utils.HTTP_errors import HTTP_409_CONFLICT
+
+
+def frame_label(frame: FrameType) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})"
+
+
+# root first, as flamegraph.pl and speedscope expect collapsed stacks
+def collapse_stack(thread_name: str, frame: FrameType | None) -> str:
+    labels = []
+    while frame is not None:
+        labels.append(frame_label(frame))
+        frame = frame.f_back
+    labels.append(thread_name)
+    return ";".join(reversed(labels))
+
+
+# Samples the stacks of every thread of the process from a thread of its own,
+# so the event loop keeps serving requests (and shows up in the samples) while
+# a profile is taken. An idle event loop shows up waiting in its selector.
+class SamplingProfiler:
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.running = False
+
+    def sample(self, seconds: float) -> Counter[str]:
+        stacks: Counter[str] = Counter()
+        sampler_id = threading.get_ident()
+        thread_names: dict[int, str] = {}
+        deadline = time.monotonic() + seconds
+        while time.monotonic() < deadline:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == sampler_id:
+                    continue
+                if thread_id not in thread_names:
+                    thread_names.update({thread.ident: thread.name for thread in threading.enumerate()})
+                stacks[collapse_stack(thread_names.get(thread_id, str(thread_id)), frame)] += 1
+            time.sleep(self.interval)
+        return stacks
+
+    async def profile(self, seconds: float) -> str:
+        if self.running:
+            raise HTTP_409_CONFLICT("A profile is already being taken")
+        self.running = True
+        try:
+            stacks = await asyncio.get_running_loop().run_in_executor(None, self.sample, seconds)
+        finally:
+            self.running = False
+        return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+profiler = SamplingProfiler(interval=config.PROFILER_INTERVAL_SECONDS)
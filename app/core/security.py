@@ -1,15 +1,76 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
+from typing import Any, Callable
 
 from fastapi.security import OAuth2PasswordBearer
 from jose import jwt
 from passlib.context import CryptContext
 
 from app.core import config
+from app.core.metrics import instrument_password_hasher, password_hash_rejected
+from app.utils.cache import TTLCache, VersionedCache
+from app.utils.HTTP_errors import HTTP_503_SERVICE_UNAVAILABLE
 
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 reusable_oauth2 = OAuth2PasswordBearer(tokenUrl="/signin")
 
+
+class PasswordHasherPool:
+    # bcrypt is CPU bound and releases the GIL, so it runs on a small thread pool
+    # instead of the event loop; calls beyond `max_queue` waiting ones are rejected
+
+    def __init__(self, max_workers: int, max_queue: int):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="password-hasher")
+
+    @property
+    def queue_depth(self) -> int:
+        return max(self.pending - self.max_workers, 0)
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        if self.pending >= self.max_workers + self.max_queue:
+            self.rejected += 1
+            password_hash_rejected.inc()
+            raise HTTP_503_SERVICE_UNAVAILABLE("Too many authentication requests, try again later")
+
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self.pending -= 1
+            self.completed += 1
+
+    def stats(self) -> dict[str, int]:
+        return {
+            "workers": self.max_workers,
+            "in_flight": min(self.pending, self.max_workers),
+            "queue_depth": self.queue_depth,
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
+
+
+password_hasher = PasswordHasherPool(
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    max_queue=config.PASSWORD_HASH_MAX_QUEUE
+)
+instrument_password_hasher(password_hasher)
+
+# authenticated users by id; the TTL bounds staleness across worker processes
+principal_cache = VersionedCache(
+    TTLCache(maxsize=config.PRINCIPAL_CACHE_SIZE, ttl=config.PRINCIPAL_CACHE_TTL_SECONDS)
+)
+
+
 async def create_jwt(token_data: dict, refresh: bool = False) -> str:
     if refresh:
         expires_delta = timedelta(minutes=config.REFRESH_TOKEN_EXPIRE_MINUTES)
@@ -24,8 +85,8 @@ async def create_jwt(token_data: dict, refresh: bool = False) -> str:
 
 
 async def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return await password_hasher.run(pwd_context.verify, plain_password, hashed_password)
 
 
 async def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return await password_hasher.run(pwd_context.hash, password)
@@ -0,0 +1,54 @@
+import asyncio
+import functools
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Coroutine, Iterator
+
+from fastapi import Request, Response
+from fastapi.routing import APIRoute
+
+from app.core.metrics import current_request
+
+
+# Adds the time spent in the block to the named phase of the current request,
+# reported in its Server-Timing header. Phases may overlap: time spent in SQL
+# inside a phase also counts towards `db`.
+@contextmanager
+def timed(phase: str) -> Iterator[None]:
+    request = current_request.get()
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        if request is not None:
+            request.timings[phase] = request.timings.get(phase, 0.0) + time.perf_counter() - started
+
+
+# Times what FastAPI does after the endpoint returns: validating the value
+# against the response model, encoding it and rendering the response.
+class TimedRoute(APIRoute):
+
+    def get_route_handler(self) -> Callable[[Request], Coroutine[Any, Any, Response]]:
+        endpoint = self.dependant.call
+        if asyncio.iscoroutinefunction(endpoint):
+            @functools.wraps(endpoint)
+            async def timed_endpoint(**values: Any) -> Any:
+                try:
+                    return await endpoint(**values)
+                finally:
+                    metrics = current_request.get()
+                    if metrics is not None:
+                        metrics.endpoint_returned = time.perf_counter()
+
+            self.dependant.call = timed_endpoint
+
+        handler = super().get_route_handler()
+
+        async def timed_handler(request: Request) -> Response:
+            response = await handler(request)
+            metrics = current_request.get()
+            if metrics is not None and metrics.endpoint_returned is not None:
+                metrics.timings["serialize"] = time.perf_counter() - metrics.endpoint_returned
+            return response
+
+        return timed_handler
@@ -2,51 +2,166 @@ from typing import Any, Generic, TypeVar
 
 from fastapi.encoders import jsonable_encoder
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
 
 from app.database.base_class import Base
+from app.utils.cache import quiz_snapshot_cache
+from app.utils.etag import content_versions
 
 
 ModelType = TypeVar("ModelType", bound=Base)
 CreateSchemaType = TypeVar("CreateSchemaType", bound=BaseModel)
 UpdateSchemaType = TypeVar("UpdateSchemaType", bound=BaseModel)
 
+UNIQUE_VIOLATION = "23505"
+FOREIGN_KEY_VIOLATION = "23503"
+
+
+# The row refers to one that doesn't exist, typically deleted after the caller
+# checked for it; answered with 409 Conflict, see app/core/handlers.py.
+class MissingReference(Exception):
+    pass
+
+
+def is_unique_violation(e: IntegrityError) -> bool:
+    return getattr(e.orig, "pgcode", None) == UNIQUE_VIOLATION
+
+
+def is_foreign_key_violation(e: IntegrityError) -> bool:
+    return getattr(e.orig, "pgcode", None) == FOREIGN_KEY_VIOLATION
+
 
 class CRUDBase(Generic[ModelType, CreateSchemaType, UpdateSchemaType]):
+    # loader options applied whenever whole objects are selected, so that
+    # nothing is lazy loaded outside of the session's greenlet
+    load_options: tuple = ()
+    # other tables whose rows change when a row of this model is deleted (ON DELETE SET NULL)
+    on_delete_tables: tuple[str, ...] = ()
 
     def __init__(self, model: ModelType):
         self.model = model
 
-    async def get(self, db: Session, id: Any) -> ModelType | None:
-        return db.query(self.model).filter(self.model.id == id).first()
+    def bump_versions(self, *tables: str) -> None:
+        content_versions.bump(self.model.__tablename__, *tables)
+
+    # ids of the quizzes whose cached snapshots include these rows
+    async def snapshot_quiz_ids(self, db: AsyncSession, objs: list[ModelType]) -> set[int]:
+        return set()
 
-    async def get_multi(self, db: Session, *, skip: int = 0, limit: int = 100) -> list[ModelType]:
-        return db.query(self.model).offset(skip).limit(limit).all()
+    def invalidate_snapshots(self, quiz_ids: set[int]) -> None:
+        for quiz_id in quiz_ids:
+            quiz_snapshot_cache.invalidate(quiz_id)
 
-    async def create(self, db: Session, *, new_obj: CreateSchemaType) -> ModelType:
+    def select(self) -> Select:
+        return select(self.model).options(*self.load_options)
+
+    async def get(self, db: AsyncSession, id: Any) -> ModelType | None:
+        result = await db.execute(self.select().filter(self.model.id == id))
+        return result.scalars().first()
+
+    async def get_multi(
+        self,
+        db: AsyncSession,
+        *,
+        after_id: int | None = None,
+        skip: int = 0,
+        limit: int = 100,
+        query: Select | None = None
+    ) -> list[ModelType]:
+        # query narrows the rows down; it has to select whole objects of the model
+        query = (query if query is not None else self.select()).order_by(self.model.id)
+        if after_id is not None:
+            query = query.filter(self.model.id > after_id)
+        elif skip:
+            # deprecated: the offset rows are still scanned and discarded
+            query = query.offset(skip)
+        result = await db.execute(query.limit(limit))
+        return result.scalars().all()
+
+    async def create(self, db: AsyncSession, *, new_obj: CreateSchemaType) -> ModelType:
         new_obj_data = jsonable_encoder(new_obj)
         db_obj = self.model(**new_obj_data)
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        self.bump_versions()
+        self.invalidate_snapshots(await self.snapshot_quiz_ids(db, [db_obj]))
+        await self.refresh(db, db_obj)
         return db_obj
 
-    async def update(self, db: Session, *, old_obj: ModelType, new_obj: UpdateSchemaType | dict[str, Any]) -> ModelType:
-        old_obj_data = jsonable_encoder(old_obj)
+    # Returns None instead of inserting a row that would break one of the
+    # model's unique constraints; the constraint is the only check, so there
+    # is no lookup beforehand and no race between concurrent writers. Raises
+    # MissingReference if a foreign key points at a missing row.
+    async def create_unique(self, db: AsyncSession, *, new_obj: CreateSchemaType) -> ModelType | None:
+        stmt = (
+            insert(self.model)
+            .values(**jsonable_encoder(new_obj))
+            .on_conflict_do_nothing()
+            .returning(*self.model.__table__.columns)
+        )
+        try:
+            result = await db.execute(select(self.model).from_statement(stmt))
+        except IntegrityError as e:
+            await db.rollback()
+            if is_foreign_key_violation(e):
+                raise MissingReference(str(e.orig)) from e
+            raise
+        db_obj = result.scalars().first()
+        await db.commit()
+        if db_obj is None:
+            return None
+        self.bump_versions()
+        self.invalidate_snapshots(await self.snapshot_quiz_ids(db, [db_obj]))
+        await self.refresh(db, db_obj)
+        return db_obj
+
+    async def update(self, db: AsyncSession, *, old_obj: ModelType, new_obj: UpdateSchemaType | dict[str, Any]) -> ModelType:
         if isinstance(new_obj, dict):
             update_data = new_obj
         else:
             update_data = new_obj.dict(exclude_unset=True)
-        for field in old_obj_data:
+        # the rows may move to other quizzes, so both the old and new ones change
+        quiz_ids = await self.snapshot_quiz_ids(db, [old_obj])
+        # only columns are updated; walking the instance would touch unloaded relationships
+        for field in self.model.__table__.columns.keys():
             if field in update_data:
                 setattr(old_obj, field, update_data[field])
         db.add(old_obj)
-        db.commit()
-        db.refresh(old_obj)
+        await db.commit()
+        self.bump_versions()
+        self.invalidate_snapshots(quiz_ids | await self.snapshot_quiz_ids(db, [old_obj]))
+        await self.refresh(db, old_obj)
         return old_obj
 
-    async def delete(self, db: Session, *, id: int) -> ModelType:
-        obj = db.query(self.model).filter(self.model.id == id).first()
-        db.delete(obj)
-        db.commit()
+    async def update_unique(
+        self,
+        db: AsyncSession,
+        *,
+        old_obj: ModelType,
+        new_obj: UpdateSchemaType | dict[str, Any]
+    ) -> ModelType | None:
+        try:
+            return await self.update(db, old_obj=old_obj, new_obj=new_obj)
+        except IntegrityError as e:
+            await db.rollback()
+            if is_foreign_key_violation(e):
+                raise MissingReference(str(e.orig)) from e
+            if not is_unique_violation(e):
+                raise
+            return None
+
+    async def delete(self, db: AsyncSession, *, id: int) -> ModelType:
+        obj = await self.get(db, id=id)
+        quiz_ids = await self.snapshot_quiz_ids(db, [obj])
+        await db.delete(obj)
+        await db.commit()
+        self.bump_versions(*self.on_delete_tables)
+        self.invalidate_snapshots(quiz_ids)
         return obj
+
+    async def refresh(self, db: AsyncSession, obj: ModelType) -> None:
+        await db.refresh(obj)
@@ -1,72 +1,380 @@
-from sqlalchemy.orm import Session
+from typing import AsyncIterable
+
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Table, bindparam, cast, func, or_, select, update
+from sqlalchemy.dialects.postgresql import ARRAY, insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from sqlalchemy.sql import Select
 
 from app.crud.base import CRUDBase
+from app.crud.stats import crud_stats
 from app.database.models.quiz import (
+    QUESTION_SEARCH_CONFIG,
     Answer,
     Quiz,
     Category,
     Question,
-    QuizResult
+    QuizAttempt,
+    QuizResult,
+    question_search_vector,
+    questions_categories
 )
 from app.schemes.quiz import (
     QuizCreate,
-    QuestionCreate,
-    CategoryCreate,
-    AnswerCreate
+    QuestionDocument,
+    QuizImportResponse,
+    QuizResultCreate
 )
+from app.utils.leaderboard import leaderboards
+from app.utils.scoring import AnswerKey
+
+
+# (question id, question text, ((answer id, answer text, is_correct), ...))
+QuestionRow = tuple[int, str, list[tuple[int, str, bool]]]
+
+
+# INSERT ... SELECT FROM unnest() takes one array parameter per column however
+# many rows there are, so the statement compiles once and stays cached, and
+# it is not bound by asyncpg's limit of 32767 parameters per statement.
+async def insert_rows(
+    db: AsyncSession,
+    table: Table,
+    rows: list[dict],
+    *returning,
+    skip_conflicts: bool = False
+) -> list[Row]:
+    names = list(rows[0])
+    values = func.unnest(*(
+        cast(bindparam(f"{name}_values", [row[name] for row in rows]), ARRAY(table.c[name].type))
+        for name in names
+    )).table_valued(*names).render_derived()
+    stmt = insert(table).from_select(names, select(values))
+    if skip_conflicts:
+        stmt = stmt.on_conflict_do_nothing()
+    if returning:
+        return (await db.execute(stmt.returning(*returning))).all()
+    await db.execute(stmt)
+    return []
 
 
 class CRUDAnswer(CRUDBase):
-    async def get_answers(self, db: Session, quiz_id: int) -> list[Answer]:
-        return db.query(Answer)\
-            .join(Answer.question)\
-            .join(Question.quiz)\
-            .filter(Quiz.id == quiz_id)\
-            .all()
-
-    async def get_correct_answers(self, db: Session, question_id: int) -> list[Answer]:
-        return db.query(Answer.id, Answer.is_correct)\
-            .join(Answer.question)\
-            .filter(Question.id == question_id)\
-            .filter(Answer.is_correct == True)\
-            .all()
-
-    async def exists(self, db: Session, answer: AnswerCreate) -> bool:
-        return db.query(Answer)\
-            .filter(Answer.answer_text == answer.answer_text)\
-            .join(Answer.question)\
-            .filter(Question.id == answer.question_id)\
-            .filter(Answer.question_id == answer.question_id)\
-            .first() is not None
+    async def snapshot_quiz_ids(self, db: AsyncSession, objs: list[Answer]) -> set[int]:
+        question_ids = {obj.question_id for obj in objs if obj.question_id is not None}
+        if not question_ids:
+            return set()
+        result = await db.execute(select(Question.quiz_id).filter(Question.id.in_(question_ids)))
+        return {quiz_id for quiz_id in result.scalars() if quiz_id is not None}
+
+    async def get_answers(self, db: AsyncSession, quiz_id: int) -> list[Answer]:
+        result = await db.execute(
+            select(Answer)
+            .join(Answer.question)
+            .join(Question.quiz)
+            .filter(Quiz.id == quiz_id)
+        )
+        return result.scalars().all()
+
+    async def get_correct_answers(self, db: AsyncSession, question_id: int) -> list[Answer]:
+        result = await db.execute(
+            select(Answer.id, Answer.is_correct)
+            .join(Answer.question)
+            .filter(Question.id == question_id)
+            .filter(Answer.is_correct == True)
+        )
+        return result.all()
 
 
 class CRUDQuiz(CRUDBase):
-    async def exists(self, db: Session, quiz: QuizCreate) -> bool:
-        return db.query(Quiz)\
-            .filter(
-                Quiz.title == quiz.title,
-                Quiz.description == quiz.description
-            ).first() is not None
+    on_delete_tables = ("questions", "quiz_results")
+
+    async def snapshot_quiz_ids(self, db: AsyncSession, objs: list[Quiz]) -> set[int]:
+        return {obj.id for obj in objs}
+
+    # The quiz graph as plain rows, two statements however many quizzes. Much
+    # cheaper than loading ORM objects for quizzes with thousands of questions.
+    async def get_graph_rows(self, db: AsyncSession, ids: list[int]) -> list[tuple[Row, list[QuestionRow]]]:
+        quizzes = (await db.execute(
+            select(Quiz.id, Quiz.title, Quiz.description, Quiz.is_active, Quiz.sampling_rules)
+            .filter(Quiz.id.in_(ids))
+        )).all()
+        if not quizzes:
+            return []
+
+        questions: dict[int, list[QuestionRow]] = {quiz.id: [] for quiz in quizzes}
+        result = await db.execute(
+            select(Question.quiz_id, Question.id, Question.question_text, Answer.id, Answer.answer_text, Answer.is_correct)
+            .outerjoin(Answer, Answer.question_id == Question.id)
+            .filter(Question.quiz_id.in_(ids))
+            .order_by(Question.quiz_id, Question.id, Answer.id)
+        )
+        last_question_id = None
+        for quiz_id, question_id, question_text, answer_id, answer_text, is_correct in result:
+            if question_id != last_question_id:
+                answers = []
+                questions[quiz_id].append((question_id, question_text, answers))
+                last_question_id = question_id
+            if answer_id is not None:
+                answers.append((answer_id, answer_text, is_correct))
+        return [(quiz, questions[quiz.id]) for quiz in quizzes]
+
+    async def get_category_links(self, db: AsyncSession, quiz_ids: list[int]) -> dict[int, list[tuple[int, int]]]:
+        result = await db.execute(
+            select(Question.quiz_id, questions_categories.c.question_id, questions_categories.c.category_id)
+            .join(Question, Question.id == questions_categories.c.question_id)
+            .filter(Question.quiz_id.in_(quiz_ids))
+        )
+        links: dict[int, list[tuple[int, int]]] = {}
+        for quiz_id, question_id, category_id in result:
+            links.setdefault(quiz_id, []).append((question_id, category_id))
+        return links
+
+    async def get_with_document_graph(self, db: AsyncSession, id: int) -> Quiz | None:
+        result = await db.execute(
+            select(Quiz)
+            .options(
+                selectinload(Quiz.questions).selectinload(Question.answers),
+                selectinload(Quiz.questions).selectinload(Question.categories)
+            )
+            .execution_options(populate_existing=True)
+            .filter(Quiz.id == id)
+        )
+        return result.scalars().first()
+
+    # Inserts a quiz with all of its questions, answers and category links in
+    # one transaction, a few INSERTs per batch of questions. Repeated question
+    # texts within the quiz and repeated answer texts within a question are
+    # dropped; categories are matched by name and created if new. Returns None
+    # without writing anything if the quiz already exists.
+    async def create_graph(
+        self,
+        db: AsyncSession,
+        *,
+        quiz_in: QuizCreate,
+        batches: AsyncIterable[list[QuestionDocument]]
+    ) -> QuizImportResponse | None:
+        try:
+            response = await self._insert_graph(db, quiz_in=quiz_in, batches=batches)
+        except Exception:
+            await db.rollback()
+            raise
+        if response is None:
+            return None
+        await db.commit()
+        self.bump_versions("questions", "answers", "categories")
+        return response
+
+    async def _insert_graph(
+        self,
+        db: AsyncSession,
+        *,
+        quiz_in: QuizCreate,
+        batches: AsyncIterable[list[QuestionDocument]]
+    ) -> QuizImportResponse | None:
+        quiz_id = (await db.execute(
+            insert(Quiz)
+            .values(**quiz_in.dict(include=set(QuizCreate.__fields__), exclude_none=True))
+            .on_conflict_do_nothing()
+            .returning(Quiz.id)
+        )).scalar_one_or_none()
+        if quiz_id is None:
+            return None
+
+        question_texts: set[str] = set()
+        category_ids: dict[str, int] = {}
+        questions = answers = 0
+        async for batch in batches:
+            new_questions: list[QuestionDocument] = []
+            for question in batch:
+                if question.question_text not in question_texts:
+                    question_texts.add(question.question_text)
+                    new_questions.append(question)
+            if not new_questions:
+                continue
+
+            await self._resolve_categories(
+                db,
+                {name for question in new_questions for name in question.categories},
+                category_ids
+            )
+            # question texts are unique within the quiz, so they key the returned ids
+            question_ids = {
+                question_text: question_id
+                for question_id, question_text in await insert_rows(
+                    db,
+                    Question.__table__,
+                    [{"quiz_id": quiz_id, "question_text": question.question_text} for question in new_questions],
+                    Question.id,
+                    Question.question_text
+                )
+            }
+
+            answer_rows: list[dict] = []
+            category_rows: list[dict] = []
+            for question in new_questions:
+                question_id = question_ids[question.question_text]
+                answer_texts: set[str] = set()
+                for answer in question.answers:
+                    if answer.answer_text not in answer_texts:
+                        answer_texts.add(answer.answer_text)
+                        answer_rows.append({
+                            "question_id": question_id,
+                            "answer_text": answer.answer_text,
+                            "is_correct": answer.is_correct
+                        })
+                for name in dict.fromkeys(question.categories):
+                    category_rows.append({"question_id": question_id, "category_id": category_ids[name]})
+            if answer_rows:
+                await insert_rows(db, Answer.__table__, answer_rows)
+            if category_rows:
+                await insert_rows(db, questions_categories, category_rows)
+            questions += len(new_questions)
+            answers += len(answer_rows)
+        return QuizImportResponse(quiz_id=quiz_id, questions=questions, answers=answers)
+
+    async def _resolve_categories(self, db: AsyncSession, names: set[str], category_ids: dict[str, int]) -> None:
+        missing = names - category_ids.keys()
+        if not missing:
+            return
+        rows = await insert_rows(
+            db,
+            Category.__table__,
+            [{"name": name} for name in sorted(missing)],
+            Category.id,
+            Category.name,
+            skip_conflicts=True
+        )
+        category_ids.update((name, category_id) for category_id, name in rows)
+        # names that conflicted belong to categories that already exist
+        missing -= category_ids.keys()
+        if missing:
+            result = await db.execute(select(Category.name, Category.id).filter(Category.name.in_(missing)))
+            category_ids.update(result.all())
 
 
 class CRUDQuestion(CRUDBase):
-    async def exists(self, db: Session, question: QuestionCreate) -> bool:
-        return db.query(Question)\
-            .join(Question.quiz)\
-            .filter(Quiz.id == question.quiz_id)\
-            .filter(Question.question_text == question.question_text)\
-            .first() is not None
+    on_delete_tables = ("answers",)
+    load_options = (selectinload(Question.categories),)
+
+    async def snapshot_quiz_ids(self, db: AsyncSession, objs: list[Question]) -> set[int]:
+        return {obj.quiz_id for obj in objs if obj.quiz_id is not None}
+
+    async def refresh(self, db: AsyncSession, obj: Question) -> None:
+        await db.execute(
+            self.select()
+            .execution_options(populate_existing=True)
+            .filter(Question.id == obj.id)
+        )
+
+    # Every filter is served by an index: the GIN index on the question text
+    # vector, (category_id, question_id) on the link table and the quiz_id
+    # prefix of the unique key. Categories come with the selectinload.
+    def search_query(
+        self,
+        *,
+        text: str | None = None,
+        category_id: int | None = None,
+        quiz_id: int | None = None
+    ) -> Select:
+        query = self.select()
+        if text:
+            query = query.filter(
+                question_search_vector(Question.question_text).op("@@")(
+                    func.websearch_to_tsquery(QUESTION_SEARCH_CONFIG, text)
+                )
+            )
+        if category_id is not None:
+            query = query.join(questions_categories, questions_categories.c.question_id == Question.id).filter(
+                questions_categories.c.category_id == category_id
+            )
+        if quiz_id is not None:
+            query = query.filter(Question.quiz_id == quiz_id)
+        return query
 
 
 class CRUDCategory(CRUDBase):
-    async def exists(self, db: Session, category: CategoryCreate) -> bool:
-        return db.query(Category)\
-            .filter(Category.name == category.name)\
-            .first() is not None
+    # quizzes that sample questions from these categories
+    async def snapshot_quiz_ids(self, db: AsyncSession, objs: list[Category]) -> set[int]:
+        result = await db.execute(
+            select(Quiz.id).filter(or_(*(Quiz.sampling_rules.contains([{"category_id": obj.id}]) for obj in objs)))
+        )
+        return set(result.scalars())
+
+
+class CRUDQuizAttempt(CRUDBase):
+    async def start(
+        self,
+        db: AsyncSession,
+        *,
+        user_id: int,
+        quiz_id: int,
+        question_ids: list[int],
+        answer_key: AnswerKey
+    ) -> int:
+        attempt_id = (await db.execute(
+            insert(QuizAttempt)
+            .values(user_id=user_id, quiz_id=quiz_id, question_ids=question_ids, answer_key=answer_key.dumps())
+            .returning(QuizAttempt.id)
+        )).scalar_one()
+        await db.commit()
+        return attempt_id
+
+    # Marks the attempt submitted without committing, so that the caller's
+    # commit covers the attempt and its result. Returns False if another
+    # submission got there first.
+    async def finish(self, db: AsyncSession, *, id: int) -> bool:
+        result = await db.execute(
+            update(QuizAttempt)
+            .filter(QuizAttempt.id == id, QuizAttempt.submitted_at.is_(None))
+            .values(submitted_at=func.now())
+            .returning(QuizAttempt.id)
+        )
+        return result.first() is not None
 
 
 class CRUDQuizResult(CRUDBase):
-    pass
+    async def create(self, db: AsyncSession, *, new_obj: QuizResultCreate | QuizResult) -> QuizResult:
+        db_obj = QuizResult(**jsonable_encoder(new_obj))
+        db.add(db_obj)
+        best_percentages = await crud_stats.record(db, [db_obj])
+        await db.commit()
+        self.bump_versions()
+        leaderboards.record(best_percentages)
+        await self.refresh(db, db_obj)
+        return db_obj
+
+    # Results whose submission_id is already in the table are skipped, and
+    # left out of the statistics
+    async def create_multi(self, db: AsyncSession, *, new_objs: list[QuizResultCreate]) -> None:
+        if not new_objs:
+            return
+        inserted = await insert_rows(
+            db,
+            QuizResult.__table__,
+            [new_obj.dict(exclude_none=True) for new_obj in new_objs],
+            QuizResult.user_id,
+            QuizResult.quiz_id,
+            QuizResult.user_score,
+            QuizResult.max_score,
+            QuizResult.finished_at,
+            skip_conflicts=True
+        )
+        best_percentages = await crud_stats.record(db, inserted)
+        await db.commit()
+        self.bump_versions()
+        leaderboards.record(best_percentages)
+
+    async def delete(self, db: AsyncSession, *, id: int) -> QuizResult:
+        obj = await self.get(db, id=id)
+        await db.delete(obj)
+        await db.flush()
+        best_percentage = await crud_stats.rebuild(db, user_id=obj.user_id, quiz_id=obj.quiz_id)
+        await db.commit()
+        self.bump_versions()
+        if obj.user_id is not None and obj.quiz_id is not None:
+            leaderboards.set(obj.quiz_id, obj.user_id, best_percentage)
+        return obj
 
 
 crud_answer = CRUDAnswer(Answer)
@@ -74,3 +382,4 @@ crud_quiz = CRUDQuiz(Quiz)
 crud_question = CRUDQuestion(Question)
 crud_category = CRUDCategory(Category)
 crud_quiz_result = CRUDQuizResult(QuizResult)
+crud_quiz_attempt = CRUDQuizAttempt(QuizAttempt)
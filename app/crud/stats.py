@@ -0,0 +1,156 @@
+from typing import Iterable
+
+from sqlalchemy import case, delete, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.models.quiz import QuizResult
+from app.database.models.stats import QuizUserStats
+from app.schemes.quiz import QuizResultCreate
+from app.schemes.stats import QuizStatsScheme
+
+
+result_percentage = case(
+    (QuizResult.max_score > 0, 100.0 * QuizResult.user_score / QuizResult.max_score),
+    else_=0.0
+)
+
+
+def score_percentage(user_score: float, max_score: float) -> float:
+    return 100.0 * user_score / max_score if max_score else 0.0
+
+
+class CRUDStats:
+    # Summed from the quiz's per-user rows when read, so submissions never wait
+    # on one row per quiz and deleted users drop out with their rows
+    async def get_quiz_stats(self, db: AsyncSession, quiz_id: int) -> QuizStatsScheme | None:
+        totals = (await db.execute(
+            select(
+                func.sum(QuizUserStats.attempts).label("attempts"),
+                func.count().label("users"),
+                func.max(QuizUserStats.best_percentage).label("best_percentage"),
+                func.sum(QuizUserStats.total_percentage).label("total_percentage"),
+                func.max(QuizUserStats.last_finished_at).label("last_finished_at")
+            )
+            .filter(QuizUserStats.quiz_id == quiz_id)
+        )).one()
+        if not totals.users:
+            return None
+        return QuizStatsScheme(
+            quiz_id=quiz_id,
+            attempts=totals.attempts,
+            users=totals.users,
+            best_percentage=totals.best_percentage,
+            mean_percentage=totals.total_percentage / totals.attempts if totals.attempts else 0.0,
+            last_finished_at=totals.last_finished_at
+        )
+
+    async def get_user_stats(self, db: AsyncSession, user_id: int) -> list[QuizUserStats]:
+        result = await db.execute(
+            select(QuizUserStats)
+            .execution_options(populate_existing=True)
+            .filter(QuizUserStats.user_id == user_id)
+            .order_by(QuizUserStats.quiz_id)
+        )
+        return result.scalars().all()
+
+    # Folds new results into the per-user aggregates without committing, so that the
+    # caller's commit covers both the results and their statistics. Returns
+    # the resulting best percentage of every (user_id, quiz_id) touched.
+    async def record(
+        self,
+        db: AsyncSession,
+        results: Iterable[QuizResult | QuizResultCreate | Row]
+    ) -> dict[tuple[int, int], float]:
+        user_rows: dict[tuple[int, int], dict] = {}
+        for result in results:
+            if result.user_id is None or result.quiz_id is None:
+                continue
+            percentage = score_percentage(result.user_score, result.max_score)
+            finished_at = result.finished_at or func.now()
+            row = user_rows.get((result.user_id, result.quiz_id))
+            if row is None:
+                user_rows[(result.user_id, result.quiz_id)] = {
+                    "user_id": result.user_id,
+                    "quiz_id": result.quiz_id,
+                    "attempts": 1,
+                    "best_score": result.user_score,
+                    "last_score": result.user_score,
+                    "max_score": result.max_score,
+                    "total_percentage": percentage,
+                    "last_finished_at": finished_at,
+                    "best_percentage": percentage,
+                }
+            else:
+                row["attempts"] += 1
+                row["best_score"] = max(row["best_score"], result.user_score)
+                row["last_score"] = result.user_score
+                row["max_score"] = result.max_score
+                row["total_percentage"] += percentage
+                row["last_finished_at"] = finished_at
+                row["best_percentage"] = max(row["best_percentage"], percentage)
+        if not user_rows:
+            return {}
+
+        # rows are always locked in key order so concurrent submissions can't deadlock
+        user_stmt = insert(QuizUserStats).values([row for _, row in sorted(user_rows.items())])
+        user_stmt = user_stmt.on_conflict_do_update(
+            index_elements=[QuizUserStats.user_id, QuizUserStats.quiz_id],
+            set_={
+                "attempts": QuizUserStats.attempts + user_stmt.excluded.attempts,
+                "best_score": func.greatest(QuizUserStats.best_score, user_stmt.excluded.best_score),
+                "last_score": user_stmt.excluded.last_score,
+                "max_score": user_stmt.excluded.max_score,
+                "best_percentage": func.greatest(QuizUserStats.best_percentage, user_stmt.excluded.best_percentage),
+                "total_percentage": QuizUserStats.total_percentage + user_stmt.excluded.total_percentage,
+                "last_finished_at": user_stmt.excluded.last_finished_at,
+            }
+        ).returning(QuizUserStats.user_id, QuizUserStats.quiz_id, QuizUserStats.best_percentage)
+        return {(row.user_id, row.quiz_id): row.best_percentage for row in await db.execute(user_stmt)}
+
+    # Recomputes the user's aggregates for the quiz of a removed result from
+    # quiz_results. Returns their new best percentage, or None if no results are left.
+    async def rebuild(self, db: AsyncSession, user_id: int | None, quiz_id: int | None) -> float | None:
+        if user_id is None or quiz_id is None:
+            return None
+
+        await db.execute(
+            delete(QuizUserStats)
+            .filter(QuizUserStats.user_id == user_id, QuizUserStats.quiz_id == quiz_id)
+        )
+        last_result = await db.execute(
+            select(QuizResult.user_score, QuizResult.max_score)
+            .filter(QuizResult.user_id == user_id, QuizResult.quiz_id == quiz_id)
+            .order_by(QuizResult.finished_at.desc(), QuizResult.id.desc())
+            .limit(1)
+        )
+        last_result = last_result.first()
+        if last_result is None:
+            return None
+
+        totals = (await db.execute(
+            select(
+                func.count(),
+                func.max(QuizResult.user_score),
+                func.max(result_percentage),
+                func.sum(result_percentage),
+                func.max(QuizResult.finished_at)
+            )
+            .filter(QuizResult.user_id == user_id, QuizResult.quiz_id == quiz_id)
+        )).one()
+        await db.execute(insert(QuizUserStats).values(
+            user_id=user_id,
+            quiz_id=quiz_id,
+            attempts=totals[0],
+            best_score=totals[1],
+            last_score=last_result.user_score,
+            max_score=last_result.max_score,
+            best_percentage=totals[2],
+            total_percentage=totals[3],
+            last_finished_at=totals[4]
+        ))
+        return totals[2]
+
+
+crud_stats = CRUDStats()
@@ -1,23 +1,43 @@
-from sqlalchemy.orm import Session
+from typing import Any
 
-from app.core.security import get_password_hash, verify_password
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.security import get_password_hash, principal_cache, verify_password
 from app.crud.base import CRUDBase
 from app.database.models.user import User
 from app.schemes.user import UserSignUp, UserUpdate, UserCreate
+from app.utils.leaderboard import leaderboards
 
 
 class CRUDUser(CRUDBase[User, UserSignUp | UserCreate, UserUpdate]):
 
-    async def get_by_email(self, db: Session, *, email: str) -> User | None:
-        return db.query(User).filter(User.email == email).first()
+    async def get_by_email(self, db: AsyncSession, *, email: str) -> User | None:
+        result = await db.execute(select(User).filter(User.email == email))
+        return result.scalars().first()
+
+    async def get_names(self, db: AsyncSession, *, ids: list[int]) -> dict[int, str | None]:
+        if not ids:
+            return {}
+        result = await db.execute(select(User.id, User.name).filter(User.id.in_(ids)))
+        return dict(result.all())
 
-    async def set_superuser(self, db: Session, user: User, is_superuser: bool) -> User:
+    # Tokens carry the user's token_version; bumping it revokes every token
+    # issued before. Cached principals of other worker processes still accept
+    # them until they expire, after PRINCIPAL_CACHE_TTL_SECONDS.
+    def revoke_tokens(self, user: User) -> None:
+        user.token_version = User.token_version + 1
+
+    async def set_superuser(self, db: AsyncSession, user: User, is_superuser: bool) -> User:
+        if user.is_superuser and not is_superuser:
+            self.revoke_tokens(user)
         user.is_superuser = is_superuser
-        db.commit()
-        db.refresh(user)
+        await db.commit()
+        principal_cache.invalidate(user.id)
+        await db.refresh(user)
         return user
 
-    async def create(self, db: Session, *, obj_in) -> User:
+    async def create(self, db: AsyncSession, *, obj_in) -> User:
         db_obj = User(
             name=obj_in.name,
             email=obj_in.email,
@@ -25,17 +45,30 @@ class CRUDUser(CRUDBase[User, UserSignUp | UserCreate, UserUpdate]):
             is_superuser=getattr(obj_in, "is_superuser", False),
         )
         db.add(db_obj)
-        db.commit()
-        db.refresh(db_obj)
+        await db.commit()
+        await db.refresh(db_obj)
         return db_obj
 
-    async def update_password(self, db: Session, user: User, password: str) -> User:
+    async def update_password(self, db: AsyncSession, user: User, password: str) -> User:
         user.password = await get_password_hash(password)
-        db.commit()
-        db.refresh(user)
+        self.revoke_tokens(user)
+        await db.commit()
+        principal_cache.invalidate(user.id)
+        await db.refresh(user)
+        return user
+
+    async def update(self, db: AsyncSession, *, old_obj: User, new_obj: UserUpdate | dict[str, Any]) -> User:
+        user = await super().update(db, old_obj=old_obj, new_obj=new_obj)
+        principal_cache.invalidate(user.id)
+        return user
+
+    async def delete(self, db: AsyncSession, *, id: int) -> User:
+        user = await super().delete(db, id=id)
+        principal_cache.invalidate(id)
+        leaderboards.drop_user(id)
         return user
 
-    async def authenticate(self, db: Session, email: str, password: str) -> User:
+    async def authenticate(self, db: AsyncSession, email: str, password: str) -> User:
         user = await self.get_by_email(db=db, email=email)
         if not user:
             return None
@@ -1,3 +1,4 @@
 from app.database.base_class import Base
 from app.database.models.user import User
-from app.database.models.quiz import Quiz, Question, Answer, Category, QuizResult, questions_categories
+from app.database.models.quiz import Quiz, Question, Answer, Category, QuizAttempt, QuizResult, questions_categories
+from app.database.models.stats import QuizUserStats
@@ -4,35 +4,56 @@ from sqlalchemy import (
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
+    LargeBinary,
     Sequence,
     String,
-    Table
+    Table,
+    UniqueConstraint
 )
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, UUID
 from sqlalchemy.orm import relationship
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, literal_column
 
 from app.database.base_class import Base
 
 
+# Full-text search over question texts. Queries have to use the same
+# expression, with the configuration inlined, for the GIN index to match.
+QUESTION_SEARCH_CONFIG = literal_column("'english'::regconfig")
+
+
+def question_search_vector(question_text):
+    return func.to_tsvector(QUESTION_SEARCH_CONFIG, question_text)
+
+
 # Many-to-many relationship between Category and Question
 questions_categories = Table(
     "questions_categories",
     Base.metadata,
     Column("question_id", ForeignKey("questions.id", ondelete="SET NULL"), primary_key=True),
     Column("category_id", ForeignKey("categories.id", ondelete="SET NULL"), primary_key=True),
+    # questions of a category straight from the index; the primary key covers the other direction
+    Index("ix_questions_categories_category_id_question_id", "category_id", "question_id"),
 )
 
 
 class Quiz(Base):
     __tablename__ = "quizzes"
+    __table_args__ = (
+        UniqueConstraint("title", "description", name="uq_quizzes_title_description"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
     description = Column(String, nullable=False)
     is_active = Column(Boolean, nullable=False, default=True)
+    # [{"category_id": int | None, "question_count": int}]; when set, every
+    # attempt draws its own questions instead of showing the whole quiz
+    sampling_rules = Column(JSONB, nullable=True)
 
     # one-to-many relationship with Question
-    questions = relationship("Question", back_populates="quiz")
+    questions = relationship("Question", back_populates="quiz", order_by="Question.id")
 
     # one-to-many relationship with QuizResult
     quiz_resultss = relationship("QuizResult", back_populates="quiz")
@@ -40,6 +61,11 @@ class Quiz(Base):
 
 class Question(Base):
     __tablename__ = "questions"
+    __table_args__ = (
+        # also serves quiz graph loads
+        UniqueConstraint("quiz_id", "question_text", name="uq_questions_quiz_id_question_text"),
+        Index("ix_questions_question_text_search", question_search_vector(literal_column("question_text")), postgresql_using="gin"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     question_text = Column(String, nullable=False)
 
@@ -51,13 +77,16 @@ class Question(Base):
     categories = relationship("Category", secondary=questions_categories, back_populates="questions")
 
     # one-to-many relationship with Answer
-    answers = relationship("Answer", back_populates="question")
+    answers = relationship("Answer", back_populates="question", order_by="Answer.id")
 
 
 class Category(Base):
     __tablename__ = "categories"
+    __table_args__ = (
+        UniqueConstraint("name", name="uq_categories_name"),
+    )
     id = Column(Integer, primary_key=True, index=True)
-    name = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=False)
     description = Column(String, nullable=True, default=None)
 
     # many-to-many relationship with Question
@@ -66,6 +95,10 @@ class Category(Base):
 
 class Answer(Base):
     __tablename__ = "answers"
+    __table_args__ = (
+        # also serves quiz graph loads
+        UniqueConstraint("question_id", "answer_text", name="uq_answers_question_id_answer_text"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     answer_text = Column(String, nullable=False)
     is_correct = Column(Boolean, default=False, nullable=False)
@@ -77,10 +110,18 @@ class Answer(Base):
 
 class QuizResult(Base):
     __tablename__ = "quiz_results"
+    __table_args__ = (
+        # latest result per (quiz, user), as read by the notification job
+        Index("ix_quiz_results_quiz_id_user_id_finished_at", "quiz_id", "user_id", "finished_at"),
+        Index("ix_quiz_results_user_id_finished_at", "user_id", "finished_at"),
+        UniqueConstraint("submission_id", name="uq_quiz_results_submission_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_score = Column(Float, nullable=False, default=0)
     max_score = Column(Float, nullable=False, default=1)
     finished_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    # set on results written behind, so one replayed after a crash is inserted once
+    submission_id = Column(UUID(as_uuid=True))
 
     # bidirectional one-to-many relationship with Question
     user_id = Column(Integer, ForeignKey("users.id", ondelete="SET NULL"))
@@ -89,3 +130,18 @@ class QuizResult(Base):
     # bidirectional one-to-manyrelationship with Question
     quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="SET NULL"))
     quiz = relationship("Quiz", back_populates="quiz_resultss")
+
+
+class QuizAttempt(Base):
+    __tablename__ = "quiz_attempts"
+    id = Column(Integer, primary_key=True)
+    # the questions drawn for this attempt, in the order they were shown
+    question_ids = Column(ARRAY(Integer), nullable=False)
+    # AnswerKey.dumps() of those questions when the attempt started; grading
+    # uses it, whatever happened to the quiz since
+    answer_key = Column(LargeBinary, nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    submitted_at = Column(DateTime(timezone=True), nullable=True)
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), nullable=False)
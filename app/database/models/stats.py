@@ -0,0 +1,33 @@
+from sqlalchemy import (
+    Column,
+    DateTime,
+    Float,
+    ForeignKey,
+    Index,
+    Integer
+)
+
+from app.database.base_class import Base
+
+
+# Aggregates over quiz_results, maintained in the transaction that records a
+# result; the per-quiz figures are summed from them when read
+class QuizUserStats(Base):
+    __tablename__ = "quiz_user_stats"
+    __table_args__ = (
+        Index("ix_quiz_user_stats_quiz_id_user_id", "quiz_id", "user_id"),
+    )
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    quiz_id = Column(Integer, ForeignKey("quizzes.id", ondelete="CASCADE"), primary_key=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    best_score = Column(Float, nullable=False, default=0)
+    last_score = Column(Float, nullable=False, default=0)
+    max_score = Column(Float, nullable=False, default=1)
+    best_percentage = Column(Float, nullable=False, default=0)
+    total_percentage = Column(Float, nullable=False, default=0)
+    last_finished_at = Column(DateTime(timezone=True), nullable=False)
+
+    @property
+    def mean_percentage(self) -> float:
+        return self.total_percentage / self.attempts if self.attempts else 0.0
+
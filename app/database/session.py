@@ -1,16 +1,109 @@
-from sqlalchemy import create_engine
+import time
+from typing import Any, AsyncGenerator
+
+from fastapi import Depends, Request
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from app.core import config
+from app.core.metrics import InstrumentedQueuePool, instrument_engine, instrument_pool
+
+
+PRIMARY_PIN_COOKIE = "pin_primary"
+
+
+# pool sizes are per worker process; `name` labels the pool's metrics
+def create_pooled_engine(url: str, name: str, **options: Any) -> AsyncEngine:
+    return create_async_engine(url, **{
+        "poolclass": InstrumentedQueuePool,
+        "pool_logging_name": name,
+        "pool_size": config.DB_POOL_SIZE,
+        "max_overflow": config.DB_MAX_OVERFLOW,
+        "pool_timeout": config.DB_POOL_TIMEOUT_SECONDS,
+        "pool_recycle": config.DB_POOL_RECYCLE_SECONDS,
+        "pool_pre_ping": config.DB_POOL_PRE_PING,
+        "connect_args": {"prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE},
+        **options
+    })
+
+
+def create_session_factory(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+engine = create_pooled_engine(config.ASYNC_DB_DEFAULT, "primary")
+instrument_engine(engine)
+instrument_pool(engine)
+
+SessionLocal = create_session_factory(engine)
+
+# an optional read replica, for routes that don't write
+read_engine = create_pooled_engine(config.DB_REPLICA_URL, "replica") if config.DB_REPLICA_URL else None
+if read_engine is not None:
+    instrument_engine(read_engine)
+    instrument_pool(read_engine)
 
+ReadSessionLocal = create_session_factory(read_engine) if read_engine is not None else None
 
-engine = create_engine(config.DB_DEFAULT)
+async def get_db() -> AsyncGenerator[AsyncSession, None]:
+    async with SessionLocal() as db:
+        yield db
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-def get_db():
-    db = SessionLocal()
+def pinned_to_primary(request: Request) -> bool:
     try:
+        return float(request.cookies.get(PRIMARY_PIN_COOKIE, 0)) > time.time()
+    except ValueError:
+        return False
+
+
+# Reads from the replica, unless the client wrote something in the last
+# PRIMARY_PIN_SECONDS and may not see it there yet. The primary session is
+# the request's `get_db` one; it opens no connection unless it is used.
+async def get_read_db(request: Request, db: AsyncSession = Depends(get_db)) -> AsyncGenerator[AsyncSession, None]:
+    if ReadSessionLocal is None or pinned_to_primary(request):
         yield db
-    finally:
-        db.close()
+        return
+    async with ReadSessionLocal() as read_db:
+        yield read_db
+
+
+# The session of routes that write data the replica serves. Declaring it
+# instead of `get_db` pins the client to the primary when the route succeeds.
+async def get_write_db(request: Request, db: AsyncSession = Depends(get_db)) -> AsyncSession:
+    request.state.pin_primary = True
+    return db
+
+
+# Pins the client to the primary after every successful request through a
+# `get_write_db` route, with a cookie holding the time the pin ends, so its own
+# reads see what it just wrote.
+class PrimaryPinMiddleware:
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or ReadSessionLocal is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_pin(message: Message) -> None:
+            pinned = scope.get("state", {}).get("pin_primary", False)
+            if message["type"] == "http.response.start" and message["status"] < 400 and pinned:
+                pinned_until = time.time() + config.PRIMARY_PIN_SECONDS
+                MutableHeaders(scope=message).append(
+                    "Set-Cookie",
+                    f"{PRIMARY_PIN_COOKIE}={pinned_until:.3f}; Max-Age={config.PRIMARY_PIN_SECONDS}; Path=/; HttpOnly; SameSite=lax"
+                )
+            await send(message)
+
+        await self.app(scope, receive, send_with_pin)
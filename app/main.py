@@ -1,11 +1,13 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
-from app.database.base_class import Base
-from app.database.session import engine
 from app.core import config, handlers
-from app.routes import auth, home, user, quiz
+from app.core.metrics import RequestMetricsMiddleware
+from app.crud.base import MissingReference
+from app.routes import auth, home, metrics, user, quiz, stats
 from app.database import base
+from app.database.session import PrimaryPinMiddleware
+from app.utils.pagination import NEXT_CURSOR_HEADER
 
 
 def get_application():
@@ -17,17 +19,21 @@ def get_application():
         allow_credentials=True,
         allow_methods=["*"],
         allow_headers=["*"],
+        expose_headers=[NEXT_CURSOR_HEADER],
     )
+    _app.add_middleware(PrimaryPinMiddleware)
+    _app.add_middleware(RequestMetricsMiddleware)
 
     _app.add_event_handler("startup", handlers.create_start_app_handler(_app))
     _app.add_event_handler("shutdown", handlers.create_stop_app_handler(_app))
+    _app.add_exception_handler(MissingReference, handlers.missing_reference_handler)
 
     _app.include_router(auth.router)
     _app.include_router(home.router)
     _app.include_router(user.router)
     _app.include_router(quiz.router)
-
-    Base.metadata.create_all(bind=engine)
+    _app.include_router(stats.router)
+    _app.include_router(metrics.router)
 
     return _app
 
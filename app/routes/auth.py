@@ -2,22 +2,22 @@ from datetime import datetime
 
 from fastapi import APIRouter, Depends
 from fastapi.security import OAuth2PasswordRequestForm
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.timing import TimedRoute
 from app.crud.user import crud_user
-from app.database.models.user import User
-from app.database.session import get_db
-from app.schemes.user import UserBase, UserSignUp
+from app.database.session import get_db, get_write_db
+from app.schemes.user import UserBase, UserPrincipal, UserSignUp
 from app.schemes.token import TokenResponce, RefreshTokenData
 from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST
 from app.utils.token import decode_jwt, create_new_jwt
 from app.utils.user import get_current_user
 
 
-router = APIRouter(tags=["auth"])
+router = APIRouter(tags=["auth"], route_class=TimedRoute)
 
 @router.post("/signin", response_model=TokenResponce)
-async def signin_jwt(db: Session = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()) -> TokenResponce:
+async def signin_jwt(db: AsyncSession = Depends(get_db), form_data: OAuth2PasswordRequestForm = Depends()) -> TokenResponce:
     user = await crud_user.authenticate(
         db,
         email=form_data.username,
@@ -25,23 +25,23 @@ async def signin_jwt(db: Session = Depends(get_db), form_data: OAuth2PasswordReq
     )
     if not user:
         raise HTTP_400_BAD_REQUEST("Invalid email or password")
-    return await create_new_jwt({"email": user.email,"id": user.id})
+    return await create_new_jwt({"email": user.email, "id": user.id, "token_version": user.token_version})
 
 
 @router.post("/refresh")
-async def refresh(refresh_token: str, db: Session = Depends(get_db)):
+async def refresh(refresh_token: str, db: AsyncSession = Depends(get_db)):
     token_data: RefreshTokenData = await decode_jwt(refresh_token, RefreshTokenData)
     token_expired = datetime.utcfromtimestamp(token_data.exp) < datetime.utcnow()
     if token_expired:
-        return HTTP_400_BAD_REQUEST("Token is expired")
+        raise HTTP_400_BAD_REQUEST("Token is expired")
     user = await crud_user.get(db, id=token_data.id)
-    if not user:
-        return HTTP_400_BAD_REQUEST("Invalid user")
-    return await create_new_jwt({"email": user.email, "id": user.id})
+    if not user or user.token_version != token_data.token_version:
+        raise HTTP_400_BAD_REQUEST("Invalid user")
+    return await create_new_jwt({"email": user.email, "id": user.id, "token_version": user.token_version})
 
 
 @router.post("/signup", response_model=UserBase)
-async def user_signup(user_in: UserSignUp, db: Session = Depends(get_db)) -> UserBase:
+async def user_signup(user_in: UserSignUp, db: AsyncSession = Depends(get_write_db)) -> UserBase:
     user = await crud_user.get_by_email(db, email=user_in.email)
     if user is not None:
         raise HTTP_400_BAD_REQUEST("User already exists")
@@ -49,5 +49,8 @@ async def user_signup(user_in: UserSignUp, db: Session = Depends(get_db)) -> Use
 
 
 @router.post("/test-token", response_model=UserBase)
-def test_token(current_user: User = Depends(get_current_user)) -> UserBase:
-    return current_user
+async def test_token(
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> UserBase:
+    return await crud_user.get(db, id=current_user.id)
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
+from app.core.timing import TimedRoute
 
-router = APIRouter(tags=["home"])
+
+router = APIRouter(tags=["home"], route_class=TimedRoute)
 
 @router.get("/")
 async def home():
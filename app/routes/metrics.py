@@ -0,0 +1,25 @@
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import PlainTextResponse
+
+from app.core import config
+from app.core.metrics import PROMETHEUS_CONTENT_TYPE, registry
+from app.core.profiler import profiler
+from app.core.timing import TimedRoute
+from app.schemes.user import UserPrincipal
+from app.utils.user import get_current_superuser
+
+
+router = APIRouter(tags=["metrics"], route_class=TimedRoute)
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics() -> PlainTextResponse:
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+# collapsed stacks, one `frame;frame;... count` line each, for flamegraph.pl or speedscope
+@router.post("/debug/profile", response_class=PlainTextResponse)
+async def profile(
+    seconds: float = Query(10, gt=0, le=config.PROFILER_MAX_SECONDS),
+    current_user: UserPrincipal = Depends(get_current_superuser)
+) -> PlainTextResponse:
+    return PlainTextResponse(await profiler.profile(seconds))
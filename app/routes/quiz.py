@@ -1,145 +1,313 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+import orjson
+from fastapi import APIRouter, Depends, Query, Request, Response
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import Union
 from fastapi import HTTPException
+from app.core import config
+from app.core.timing import TimedRoute
 from app.crud.quiz import (
     crud_answer,
     crud_quiz,
     crud_question,
     crud_category,
+    crud_quiz_attempt,
     crud_quiz_result
 )
-from app.database.models.user import User
-from app.database.models.quiz import (
-    Answer,
-    Quiz,
-    QuizResult
-)
-from app.database.session import get_db
+from app.database.models.quiz import QuizResult
+from app.database.session import get_db, get_read_db, get_write_db
 from app.schemes.quiz import (
+    AttemptProgress,
     CategoryCreate,
     CategoryScheme,
     AnswerCreate,
     AnswerScheme,
     QuestionCreate,
     QuestionScheme,
+    QuizAttemptResponse,
     QuizCreate,
+    QuizDocument,
+    QuizImportResponse,
     QuizScheme,
+    QuizBatchItemResponse,
     QuizRequset,
     QuizResponse,
+    QuizResultCreate,
     QuizResultResponse,
     QuizResultScheme
 )
+from app.schemes.user import UserPrincipal
+from app.utils.attempt_store import (
+    AttemptRecord,
+    discard_attempt,
+    load_progress,
+    save_attempt,
+    save_progress
+)
 from app.utils.quiz import (
-    generate_quiz_response,
-    get_quiz_max_score,
-    get_question_ids,
-    get_answers_ids,
-    get_real_answers
+    QuizSnapshot,
+    get_attempt_record,
+    get_quiz_snapshot,
+    get_quiz_snapshots,
+    grade_answers,
+    grade_quiz
+)
+from app.utils.etag import etag_matches, not_modified, set_cache_headers, table_etag
+from app.utils.leaderboard import leaderboards
+from app.utils.quiz_document import (
+    NDJSON_MEDIA_TYPE,
+    batched,
+    ndjson_lines,
+    parse_document,
+    quiz_document,
+    read_ndjson_document
 )
+from app.utils.result_queue import result_queue
+from app.utils.pagination import PageParams, get_page_params, paginate
 from app.utils.user import get_current_user, get_current_superuser
 from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST, HTTP_404_NOT_FOUND
 
 
-router = APIRouter(tags=["quiz"])
+router = APIRouter(tags=["quiz"], route_class=TimedRoute)
 
 @router.get("/quiz/{quiz_id}/view", response_model=QuizResponse)
 async def view_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    quiz: Quiz = await crud_quiz.get(id=quiz_id, db=db)
-    if not quiz:
+    snapshot: QuizSnapshot = await get_quiz_snapshot(db, quiz_id)
+    if not snapshot:
         raise HTTP_404_NOT_FOUND("Quiz not found")
-    return await generate_quiz_response(quiz)
-
-
-@router.post("/quiz/{quiz_id}/submit", response_model=QuizResultResponse)
-async def submit_quiz(
+    if snapshot.sampler is not None:
+        raise HTTP_400_BAD_REQUEST("Quiz questions are drawn per attempt, start an attempt first")
+    if etag_matches(request, snapshot.etag):
+        return not_modified(snapshot.etag)
+    # returning a Response skips response_model validation and re-encoding
+    response = Response(content=snapshot.body, media_type="application/json")
+    set_cache_headers(response, snapshot.etag)
+    return response
+
+
+@router.post("/quiz/{quiz_id}/start", response_model=QuizAttemptResponse, status_code=201)
+async def start_quiz(
     quiz_id: int,
-    quiz_request: QuizRequset,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user)
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
 ):
-    if quiz_id != quiz_request.quiz_id:
-        raise HTTP_400_BAD_REQUEST("Quiz id mismatch")
-
-    quiz: Quiz = await crud_quiz.get(id=quiz_id, db=db)
-
-    if not quiz:
+    snapshot: QuizSnapshot = await get_quiz_snapshot(db, quiz_id)
+    if not snapshot:
         raise HTTP_404_NOT_FOUND("Quiz not found")
-
-    if not quiz.is_active:
+    if not snapshot.is_active:
         raise HTTP_404_NOT_FOUND("Quiz is not active")
 
-    questions_ids: list[int] = await get_question_ids(quiz)
-    quiz_answers_ids: list[int] = await get_answers_ids(quiz)
-    quiz_answers: list[Answer] = await get_real_answers(quiz)
+    if snapshot.sampler is not None:
+        question_ids = snapshot.sampler.sample()
+        answer_key = snapshot.answer_key_for(question_ids)
+    else:
+        question_ids = list(snapshot.question_ids)
+        answer_key = snapshot.answer_key
+    attempt_id = await crud_quiz_attempt.start(
+        db,
+        user_id=current_user.id,
+        quiz_id=quiz_id,
+        question_ids=question_ids,
+        answer_key=answer_key
+    )
+    await save_attempt(attempt_id, AttemptRecord(user_id=current_user.id, quiz_id=quiz_id, answer_key=answer_key))
+    return Response(content=snapshot.attempt_body(attempt_id, question_ids), media_type="application/json", status_code=201)
 
-    if not questions_ids or not quiz_answers_ids:
-        raise HTTP_400_BAD_REQUEST("Quiz has no questions or answers")
 
-    max_score = await get_quiz_max_score(quiz)
+@router.put("/quiz/{quiz_id}/attempt/{attempt_id}/progress", status_code=204)
+async def save_attempt_progress(
+    quiz_id: int,
+    attempt_id: int,
+    progress: AttemptProgress,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    record = await get_attempt_record(db, attempt_id=attempt_id, quiz_id=quiz_id, user_id=current_user.id)
+    if any(answer.answer_id not in record.answer_key for answer in progress.answers):
+        raise HTTP_400_BAD_REQUEST("Incorrect answer id provided")
+    await save_progress(attempt_id, orjson.dumps(progress.dict()))
+    return Response(status_code=204)
 
-    if not max_score:
-        raise HTTP_400_BAD_REQUEST("Quiz don't have any correct questions")
 
-    user_answers = quiz_request.answers
+@router.get("/quiz/{quiz_id}/attempt/{attempt_id}/progress", response_model=AttemptProgress)
+async def get_attempt_progress(
+    quiz_id: int,
+    attempt_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    await get_attempt_record(db, attempt_id=attempt_id, quiz_id=quiz_id, user_id=current_user.id)
+    progress = await load_progress(attempt_id)
+    return Response(content=progress or b'{"answers":[]}', media_type="application/json")
 
-    if not user_answers or len(user_answers) != len(quiz_answers_ids):
-        raise HTTP_400_BAD_REQUEST("Incorrect number of answers provided")
 
-    for user_answer in user_answers:
-        if user_answer.answer_id not in quiz_answers_ids:
-            raise HTTP_400_BAD_REQUEST("Incorrect answer id provided")
+@router.post("/quiz/{quiz_id}/submit", response_model=QuizResultResponse)
+async def submit_quiz(
+    quiz_id: int,
+    quiz_request: QuizRequset,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+):
+    if quiz_id != quiz_request.quiz_id:
+        raise HTTP_400_BAD_REQUEST("Quiz id mismatch")
 
-    user_score: int = max_score
+    attempt_id = quiz_request.attempt_id
+    if attempt_id is not None:
+        # graded against the key frozen at start, without loading the quiz
+        record = await get_attempt_record(db, attempt_id=attempt_id, quiz_id=quiz_id, user_id=current_user.id)
+        user_score = grade_answers(record.answer_key, quiz_request)
+        max_score = record.answer_key.max_score
+        if not await crud_quiz_attempt.finish(db, id=attempt_id):
+            raise HTTP_400_BAD_REQUEST("Attempt already submitted")
+    else:
+        snapshot: QuizSnapshot = await get_quiz_snapshot(db, quiz_id)
+        user_score = await grade_quiz(snapshot, quiz_request)
+        max_score = snapshot.max_score
+
+    if result_queue.running:
+        if attempt_id is not None:
+            # the attempt is closed here, its result is written behind
+            await db.commit()
+        await result_queue.put(
+            QuizResultCreate(user_id=current_user.id, quiz_id=quiz_id, max_score=max_score, user_score=user_score)
+        )
+    else:
+        await crud_quiz_result.create(
+            db=db,
+            new_obj=QuizResult(
+                user_id=current_user.id,
+                quiz_id=quiz_id,
+                max_score=max_score,
+                user_score=user_score
+            )
+        )
+    if attempt_id is not None:
+        await discard_attempt(attempt_id)
+    return QuizResultResponse(max_score=max_score, user_score=user_score)
 
-    for user_answer in user_answers:
-        for quiz_answer in quiz_answers:
-            if user_answer.answer_id == quiz_answer.id:
-                if quiz_answer.is_correct != user_answer.is_correct:
-                    user_score -= 1
 
-    await crud_quiz_result.create(
-        db=db,
-        new_obj=QuizResult(
-            user_id=current_user.id,
-            quiz_id=quiz_id,
-            max_score=max_score,
-            user_score=user_score
+@router.post("/quiz/submit/batch", response_model=list[QuizBatchItemResponse])
+async def submit_quiz_batch(
+    quiz_requests: list[QuizRequset],
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> list[QuizBatchItemResponse]:
+    if len(quiz_requests) > config.QUIZ_BATCH_MAX_SIZE:
+        raise HTTP_400_BAD_REQUEST(f"Batch can't contain more than {config.QUIZ_BATCH_MAX_SIZE} submissions")
+
+    snapshots = await get_quiz_snapshots(db, {quiz_request.quiz_id for quiz_request in quiz_requests})
+
+    items: list[QuizBatchItemResponse] = []
+    quiz_results: list[QuizResultCreate] = []
+    for quiz_request in quiz_requests:
+        if quiz_request.attempt_id is not None:
+            # an attempt has to be closed as it is graded, see submit_quiz
+            items.append(QuizBatchItemResponse(
+                quiz_id=quiz_request.quiz_id,
+                error="Attempts can't be submitted in a batch, submit them one by one"
+            ))
+            continue
+        snapshot = snapshots.get(quiz_request.quiz_id)
+        try:
+            user_score = await grade_quiz(snapshot, quiz_request)
+        except HTTPException as e:
+            items.append(QuizBatchItemResponse(quiz_id=quiz_request.quiz_id, error=e.detail))
+            continue
+        quiz_results.append(
+            QuizResultCreate(
+                user_id=current_user.id,
+                quiz_id=quiz_request.quiz_id,
+                max_score=snapshot.max_score,
+                user_score=user_score
+            )
+        )
+        items.append(
+            QuizBatchItemResponse(
+                quiz_id=quiz_request.quiz_id,
+                result=QuizResultResponse(max_score=snapshot.max_score, user_score=user_score)
+            )
         )
-    )
-    return QuizResultResponse(max_score=max_score, user_score=user_score)
+
+    if result_queue.running:
+        for quiz_result in quiz_results:
+            await result_queue.put(quiz_result)
+    else:
+        await crud_quiz_result.create_multi(db, new_objs=quiz_results)
+    return items
 
 
 @router.post("/quiz", response_model=QuizScheme, status_code=201)
 async def create_quiz(
     quiz: QuizCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> QuizScheme:
-    if await crud_quiz.exists(db, quiz):
+    quiz = await crud_quiz.create_unique(db, new_obj=quiz)
+    if not quiz:
+        raise HTTP_400_BAD_REQUEST("Quiz already exists")
+    return quiz
+
+
+@router.post("/quiz/import", response_model=QuizImportResponse, status_code=201)
+async def import_quiz(
+    request: Request,
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
+) -> QuizImportResponse:
+    if request.headers.get("content-type", "").startswith(NDJSON_MEDIA_TYPE):
+        quiz_in, batches = await read_ndjson_document(request.stream(), config.QUIZ_IMPORT_BATCH_SIZE)
+    else:
+        quiz_in = parse_document(QuizDocument, await request.body())
+        batches = batched(quiz_in.questions, config.QUIZ_IMPORT_BATCH_SIZE)
+
+    imported = await crud_quiz.create_graph(db, quiz_in=quiz_in, batches=batches)
+    if not imported:
         raise HTTP_400_BAD_REQUEST("Quiz already exists")
-    return await crud_quiz.create(db, new_obj=quiz)
+    return imported
+
+
+@router.get("/quiz/{quiz_id}/export", response_model=QuizDocument)
+async def export_quiz(
+    quiz_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
+):
+    quiz = await crud_quiz.get_with_document_graph(db, id=quiz_id)
+    if not quiz:
+        raise HTTP_404_NOT_FOUND("Quiz not found")
+
+    document = quiz_document(quiz)
+    if NDJSON_MEDIA_TYPE in request.headers.get("accept", ""):
+        return StreamingResponse(ndjson_lines(document), media_type=NDJSON_MEDIA_TYPE)
+    return Response(content=orjson.dumps(document.dict()), media_type="application/json")
 
 
 @router.get("/quizzes", response_model=list[QuizScheme])
 async def get_quizzes(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> list[QuizScheme]:
-    return await crud_quiz.get_multi(db, skip=skip, limit=limit)
+    etag = table_etag("quizzes")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await paginate(db, crud_quiz, page, response)
 
 
 @router.get("/quiz/{quiz_id}", response_model=QuizScheme)
 async def get_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> QuizScheme:
     quiz = await crud_quiz.get(db, id=quiz_id)
     if not quiz:
@@ -151,8 +319,8 @@ async def get_quiz(
 async def update_quiz(
     quiz_id: int,
     quiz_in: QuizScheme,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser),
 ):
     if quiz_id != quiz_in.id:
         raise HTTP_400_BAD_REQUEST("Quiz id mismatch")
@@ -161,51 +329,80 @@ async def update_quiz(
     if not quiz:
         raise HTTP_404_NOT_FOUND("Quiz not found")
 
-    return await crud_quiz.update(db, old_obj=quiz, new_obj=quiz_in)
+    quiz = await crud_quiz.update_unique(db, old_obj=quiz, new_obj=quiz_in)
+    if not quiz:
+        raise HTTP_400_BAD_REQUEST("Quiz already exists")
+    return quiz
 
 
 @router.delete("/quiz/{quiz_id}")
 async def delete_quiz(
     quiz_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     quiz = await crud_quiz.get(db, id=quiz_id)
     if not quiz:
         raise HTTP_404_NOT_FOUND("Quiz not found")
-    return await crud_quiz.delete(db, id=quiz_id)
+    quiz = await crud_quiz.delete(db, id=quiz_id)
+    leaderboards.drop_quiz(quiz_id)
+    return quiz
 
 
 @router.post("/question", response_model=QuestionScheme, status_code=201)
 async def create_question(
     question: QuestionCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> QuestionScheme:
-    if await crud_question.exists(db, question):
-        raise HTTP_400_BAD_REQUEST("Question already exists")
-
     if not await crud_quiz.get(db, id=question.quiz_id):
         raise HTTP_404_NOT_FOUND("Quiz not found")
 
-    return await crud_question.create(db, new_obj=question)
+    question = await crud_question.create_unique(db, new_obj=question)
+    if not question:
+        raise HTTP_400_BAD_REQUEST("Question already exists")
+    return question
 
 
 @router.get("/questions", response_model=list[QuestionScheme])
 async def get_questions(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
+) -> list[QuestionScheme]:
+    etag = table_etag("questions", "categories")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await paginate(db, crud_question, page, response)
+
+
+@router.get("/questions/search", response_model=list[QuestionScheme])
+async def search_questions(
+    request: Request,
+    response: Response,
+    q: str | None = Query(None, max_length=config.QUESTION_SEARCH_MAX_LENGTH),
+    category: int | None = None,
+    quiz_id: int | None = None,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> list[QuestionScheme]:
-    return await crud_question.get_multi(db, skip=skip, limit=limit)
+    etag = table_etag("questions", "categories")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    query = crud_question.search_query(text=q, category_id=category, quiz_id=quiz_id)
+    return await paginate(db, crud_question, page, response, query=query)
 
 
 @router.get("/question/{question_id}", response_model=QuestionScheme)
 async def get_question(
     question_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> QuestionScheme:
     question = await crud_question.get(db, id=question_id)
     if not question:
@@ -217,8 +414,8 @@ async def get_question(
 async def update_question(
     question_id: int,
     question_in: QuestionScheme,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser),
 ):
     if question_id != question_in.id:
         raise HTTP_400_BAD_REQUEST("Question id mismatch")
@@ -230,14 +427,17 @@ async def update_question(
     if not question:
         raise HTTP_404_NOT_FOUND("Question not found")
 
-    return await crud_question.update(db, old_obj=question, new_obj=question_in)
+    question = await crud_question.update_unique(db, old_obj=question, new_obj=question_in)
+    if not question:
+        raise HTTP_400_BAD_REQUEST("Question already exists")
+    return question
 
 
 @router.delete("/question/{question_id}")
 async def delete_question(
     question_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     question = await crud_question.get(db, id=question_id)
     if not question:
@@ -248,29 +448,35 @@ async def delete_question(
 @router.post("/category", response_model=CategoryScheme, status_code=201)
 async def create_category(
     category: CategoryCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> CategoryScheme:
-    if await crud_category.exists(db, category):
+    category = await crud_category.create_unique(db, new_obj=category)
+    if not category:
         raise HTTP_400_BAD_REQUEST("Category already exists")
-    return await crud_category.create(db, new_obj=category)
+    return category
 
 
 @router.get("/categories", response_model=list[CategoryScheme])
 async def get_categories(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> list[CategoryScheme]:
-    return await crud_category.get_multi(db, skip=skip, limit=limit)
+    etag = table_etag("categories")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await paginate(db, crud_category, page, response)
 
 
 @router.get("/category/{category_id}")
 async def get_category(
     category_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> CategoryScheme:
     category = await crud_category.get(db, id=category_id)
     if not category:
@@ -282,8 +488,8 @@ async def get_category(
 async def update_category(
     category_id: int,
     category_in: CategoryScheme,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser),
 ):
     if category_id != category_in.id:
         raise HTTP_400_BAD_REQUEST("Category id mismatch")
@@ -292,14 +498,17 @@ async def update_category(
     if not category:
         raise HTTP_404_NOT_FOUND("Category not found")
 
-    return await crud_category.update(db, old_obj=category, new_obj=category_in)
+    category = await crud_category.update_unique(db, old_obj=category, new_obj=category_in)
+    if not category:
+        raise HTTP_400_BAD_REQUEST("Category already exists")
+    return category
 
 
 @router.delete("/category/{category_id}")
 async def delete_category(
     category_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     category = await crud_category.get(db, id=category_id)
     if not category:
@@ -310,33 +519,39 @@ async def delete_category(
 @router.post("/answer", response_model=AnswerScheme, status_code=201)
 async def create_answer(
     answer: AnswerCreate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> AnswerScheme:
-    if await crud_answer.exists(db, answer):
-        raise HTTP_400_BAD_REQUEST("Answer already exists")
-
-    if not await crud_question.get(db, id=answer.question_id):
+    question = await crud_question.get(db, id=answer.question_id)
+    if not question:
         raise HTTP_404_NOT_FOUND("Question not found")
 
-    return await crud_answer.create(db, new_obj=answer)
+    answer = await crud_answer.create_unique(db, new_obj=answer)
+    if not answer:
+        raise HTTP_400_BAD_REQUEST("Answer already exists")
+    return answer
 
 
 @router.get("/answers", response_model=list[AnswerScheme])
 async def get_results(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> list[AnswerScheme]:
-    return await crud_answer.get_multi(db, skip=skip, limit=limit)
+    etag = table_etag("answers")
+    if etag_matches(request, etag):
+        return not_modified(etag)
+    set_cache_headers(response, etag)
+    return await paginate(db, crud_answer, page, response)
 
 
 @router.get("/answer/{answer_id}", response_model=AnswerScheme)
 async def get_result(
     answer_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> AnswerScheme:
     answer = await crud_answer.get(db, id=answer_id)
     if not answer:
@@ -348,27 +563,31 @@ async def get_result(
 async def update_answer(
     answer_id: int,
     answer_in: AnswerScheme,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser),
 ):
     if answer_id != answer_in.id:
         raise HTTP_400_BAD_REQUEST("Answer id mismatch")
 
-    if not await crud_question.get(db, id=answer_in.question_id):
+    question = await crud_question.get(db, id=answer_in.question_id)
+    if not question:
         raise HTTP_404_NOT_FOUND("Question not found")
 
     answer = await crud_answer.get(db, id=answer_id)
     if not answer:
         raise HTTP_404_NOT_FOUND("Answer not found")
 
-    return await crud_answer.update(db, old_obj=answer, new_obj=answer_in)
+    answer = await crud_answer.update_unique(db, old_obj=answer, new_obj=answer_in)
+    if not answer:
+        raise HTTP_400_BAD_REQUEST("Answer already exists")
+    return answer
 
 
 @router.delete("/answer/{answer_id}")
 async def delete_answer(
     answer_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     answer = await crud_answer.get(db, id=answer_id)
     if not answer:
@@ -378,19 +597,20 @@ async def delete_answer(
 
 @router.get("/results", response_model=list[QuizResultScheme])
 async def get_results(
-    skip: int = 0,
-    limit: int = 10,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    request: Request,
+    response: Response,
+    page: PageParams = Depends(get_page_params),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> list[QuizResultScheme]:
-    return await crud_quiz_result.get_multi(db, skip=skip, limit=limit)
+    return await paginate(db, crud_quiz_result, page, response)
 
 
 @router.get("/result/{result_id}", response_model=QuizResultScheme)
 async def get_result(
     result_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ) -> QuizResultScheme:
     result = await crud_quiz_result.get(db, id=result_id)
     if not result:
@@ -401,8 +621,8 @@ async def get_result(
 @router.delete("/result/{result_id}")
 async def delete_result(
     result_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     result = await crud_quiz_result.get(db, id=result_id)
     if not result:
@@ -0,0 +1,78 @@
+from dataclasses import asdict
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config
+from app.core.timing import TimedRoute
+from app.crud.stats import crud_stats
+from app.crud.user import crud_user
+from app.database.session import get_read_db
+from app.schemes.stats import (
+    LeaderboardEntryScheme,
+    LeaderboardResponse,
+    QuizStatsScheme,
+    QuizUserStatsScheme,
+    ResultQueueStatsScheme
+)
+from app.schemes.user import UserPrincipal
+from app.utils.leaderboard import leaderboards
+from app.utils.result_queue import result_queue
+from app.utils.user import get_current_superuser, get_current_user
+from app.utils.HTTP_errors import HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+
+router = APIRouter(tags=["stats"], route_class=TimedRoute)
+
+@router.get("/stats/quiz/{quiz_id}", response_model=QuizStatsScheme)
+async def get_quiz_stats(
+    quiz_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> QuizStatsScheme:
+    stats = await crud_stats.get_quiz_stats(db, quiz_id=quiz_id)
+    if not stats:
+        raise HTTP_404_NOT_FOUND("Quiz has no results")
+    return stats
+
+
+@router.get("/stats/user/{user_id}", response_model=list[QuizUserStatsScheme])
+async def get_user_stats(
+    user_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> list[QuizUserStatsScheme]:
+    if user_id != current_user.id and not current_user.is_superuser:
+        raise HTTP_403_FORBIDDEN("Only superusers can view other users' statistics")
+    return await crud_stats.get_user_stats(db, user_id=user_id)
+
+
+@router.get("/stats/quiz/{quiz_id}/leaderboard", response_model=LeaderboardResponse)
+async def get_quiz_leaderboard(
+    quiz_id: int,
+    limit: int = Query(config.LEADERBOARD_DEFAULT_SIZE, ge=1, le=config.LEADERBOARD_MAX_SIZE),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: UserPrincipal = Depends(get_current_user)
+) -> LeaderboardResponse:
+    board = await leaderboards.load(db, quiz_id)
+    entries = board.top(limit)
+    me = board.rank(current_user.id)
+    names = await crud_user.get_names(db, ids=[entry.user_id for entry in entries])
+    return LeaderboardResponse(
+        quiz_id=quiz_id,
+        entries=[LeaderboardEntryScheme(**asdict(entry), name=names.get(entry.user_id)) for entry in entries],
+        me=LeaderboardEntryScheme(**asdict(me), name=current_user.name) if me else None
+    )
+
+
+@router.get("/stats/result-queue", response_model=ResultQueueStatsScheme)
+async def get_result_queue_stats(
+    current_user: UserPrincipal = Depends(get_current_superuser)
+) -> ResultQueueStatsScheme:
+    metrics = result_queue.metrics
+    return ResultQueueStatsScheme(
+        **asdict(metrics),
+        running=result_queue.running,
+        capacity=result_queue.maxsize,
+        mean_flush_seconds=metrics.flush_seconds_total / metrics.flushes if metrics.flushes else 0.0
+    )
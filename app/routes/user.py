@@ -1,33 +1,35 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, Response
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core.timing import TimedRoute
 from app.crud.user import crud_user
-from app.database.models.user import User
-from app.database.session import get_db
-from app.schemes.user import UserBase, UserUpdate
+from app.database.session import get_read_db, get_write_db
+from app.schemes.user import UserBase, UserPrincipal, UserUpdate
+from app.utils.pagination import PageParams, get_page_params, paginate
 from app.utils.user import get_current_user, get_current_superuser
 from app.utils.HTTP_errors import HTTP_404_NOT_FOUND
 
 
-router = APIRouter(tags=["user"])
+router = APIRouter(tags=["user"], route_class=TimedRoute)
 
 @router.get("/users/", response_model=list[UserBase])
 async def all_users(
-    db: Session = Depends(get_db),
-    skip: int = 0,
-    limit: int = 10,
-    current_user: User = Depends(get_current_user)
+    response: Response,
+    db: AsyncSession = Depends(get_read_db),
+    page: PageParams = Depends(get_page_params),
+    current_user: UserPrincipal = Depends(get_current_user)
 ) -> list[UserBase]:
-    return await crud_user.get_multi(db, skip=skip, limit=limit)
+    return await paginate(db, crud_user, page, response)
 
 
 @router.patch("/update/me", response_model=UserBase)
 async def update_user_me(
     user_in: UserUpdate,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_user),
 ) -> UserBase:
-    return await crud_user.update(db, old_obj=current_user, new_obj=user_in)
+    user = await crud_user.get(db, id=current_user.id)
+    return await crud_user.update(db, old_obj=user, new_obj=user_in)
 
 
 @router.patch("/update/{user_id}")
@@ -35,8 +37,8 @@ async def update_superuser_status(
     user_id: int,
     *,
     is_superuser: bool = False,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser),
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser),
 ) -> UserBase:
     user = await crud_user.get(db, id=user_id)
     if not user:
@@ -47,8 +49,8 @@ async def update_superuser_status(
 @router.delete("/user/{user_id}", response_model=UserBase)
 async def delete_user(
     user_id: int,
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_superuser)
+    db: AsyncSession = Depends(get_write_db),
+    current_user: UserPrincipal = Depends(get_current_superuser)
 ):
     user = await crud_user.get(db, id=user_id)
     if not user:
@@ -1,8 +1,8 @@
-from typing import Any
 from datetime import datetime
+from uuid import UUID
 from unicodedata import name
 
-from pydantic import BaseModel, root_validator
+from pydantic import BaseModel, Field, root_validator
 
 
 class UserAnswerRequset(BaseModel):
@@ -13,6 +13,11 @@ class UserAnswerRequset(BaseModel):
 class QuizRequset(BaseModel):
     quiz_id: int
     answers: list[UserAnswerRequset]
+    attempt_id: int | None = None
+
+
+class AttemptProgress(BaseModel):
+    answers: list[UserAnswerRequset] = []
 
 
 class QuestionAnswerVariantResponse(BaseModel):
@@ -33,6 +38,10 @@ class QuizResponse(BaseModel):
     questions: list[QuestionResponse]
 
 
+class QuizAttemptResponse(QuizResponse):
+    attempt_id: int
+
+
 class QuizResultResponse(BaseModel):
     max_score: int
     user_score: int
@@ -45,10 +54,23 @@ class QuizResultResponse(BaseModel):
         return values
 
 
+class QuizBatchItemResponse(BaseModel):
+    quiz_id: int
+    result: QuizResultResponse | None = None
+    error: str | None = None
+
+
+class SamplingRule(BaseModel):
+    # None draws from every question of the quiz
+    category_id: int | None = None
+    question_count: int = Field(gt=0)
+
+
 class QuizCreate(BaseModel):
     title: str
     description: str
     is_active: bool | None = True
+    sampling_rules: list[SamplingRule] | None = None
 
 
 class CategoryCreate(BaseModel):
@@ -72,6 +94,10 @@ class QuizResultCreate(BaseModel):
     quiz_id: int
     user_score: int = 0
     max_score: int = 1
+    # set when the result is written behind; otherwise the database stamps it
+    finished_at: datetime | None = None
+    # set when the result is written behind; a result already written with it is skipped
+    submission_id: UUID | None = None
 
 
 class QuizScheme(BaseModel):
@@ -79,6 +105,16 @@ class QuizScheme(BaseModel):
     title: str
     description: str
     is_active: bool = True
+    sampling_rules: list[SamplingRule] | None = None
+
+    class Config:
+        orm_mode = True
+
+
+class CategoryScheme(BaseModel):
+    id: int
+    name: str
+    description: str | None = None
 
     class Config:
         orm_mode = True
@@ -88,7 +124,7 @@ class QuestionScheme(BaseModel):
     id: int
     question_text: str
     quiz_id: int
-    categories: Any | None = None
+    categories: list[CategoryScheme] | None = None
 
     class Config:
         orm_mode = True
@@ -104,15 +140,6 @@ class AnswerScheme(BaseModel):
         orm_mode = True
 
 
-class CategoryScheme(BaseModel):
-    id: int
-    name: str
-    description: str | None = None
-
-    class Config:
-        orm_mode = True
-
-
 class QuizResultScheme(BaseModel):
     id: int
     user_id: int
@@ -123,3 +150,24 @@ class QuizResultScheme(BaseModel):
 
     class Config:
         orm_mode = True
+
+
+class AnswerDocument(BaseModel):
+    answer_text: str
+    is_correct: bool = False
+
+
+class QuestionDocument(BaseModel):
+    question_text: str
+    categories: list[str] = []
+    answers: list[AnswerDocument] = []
+
+
+class QuizDocument(QuizCreate):
+    questions: list[QuestionDocument] = []
+
+
+class QuizImportResponse(BaseModel):
+    quiz_id: int
+    questions: int
+    answers: int
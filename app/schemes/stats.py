@@ -0,0 +1,57 @@
+from datetime import datetime
+
+from pydantic import BaseModel
+
+
+class QuizUserStatsScheme(BaseModel):
+    user_id: int
+    quiz_id: int
+    attempts: int
+    best_score: float
+    last_score: float
+    max_score: float
+    mean_percentage: float
+    last_finished_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class QuizStatsScheme(BaseModel):
+    quiz_id: int
+    attempts: int
+    users: int
+    best_percentage: float
+    mean_percentage: float
+    last_finished_at: datetime
+
+    class Config:
+        orm_mode = True
+
+
+class LeaderboardEntryScheme(BaseModel):
+    rank: int
+    user_id: int
+    name: str | None = None
+    percentage: float
+
+
+class LeaderboardResponse(BaseModel):
+    quiz_id: int
+    entries: list[LeaderboardEntryScheme]
+    me: LeaderboardEntryScheme | None = None
+
+
+class ResultQueueStatsScheme(BaseModel):
+    running: bool
+    capacity: int
+    depth: int
+    max_depth: int
+    enqueued: int
+    written: int
+    flushes: int
+    failed_flushes: int
+    dropped: int
+    mean_flush_seconds: float
+    last_flush_seconds: float
+    max_flush_seconds: float
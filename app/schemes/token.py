@@ -9,6 +9,7 @@ class TokenResponce(BaseModel):
 class TokenData(BaseModel):
     email: EmailStr
     id: int
+    token_version: int = 0
 
 
 class AccsessTokenData(TokenData):
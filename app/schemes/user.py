@@ -15,6 +15,18 @@ class UserBase(BaseModel):
         orm_mode = True
 
 
+class UserPrincipal(BaseModel):
+    id: int
+    name: str | None = None
+    email: EmailStr
+    is_superuser: bool = False
+    token_version: int = 0
+
+    class Config:
+        orm_mode = True
+        allow_mutation = False
+
+
 class UserSignUp(BaseModel):
     name: str
     email: EmailStr
@@ -1,10 +1,15 @@
 from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.core import config
+from app.core.security import principal_cache
+from app.crud.user import crud_user
 from app.database.models.user import User
 from app.schemes.token import AccsessTokenData
 from app.utils.token import decode_jwt
-from app.tests.utils.utils import random_lower_string, random_email
+from app.tests.utils.quiz import create_random_quiz_graph
+from app.tests.utils.user import create_random_user, get_access_token, get_user_authentication_headers
+from app.tests.utils.utils import record_queries, random_lower_string, random_email
 
 
 async def test_get_access_token(client: AsyncClient, first_superuser: User) -> None:
@@ -55,3 +60,77 @@ async def test_signup(client: AsyncClient):
     assert "email" in response_json
     assert response_json["email"] == email
     assert "password" in response_json
+
+
+async def test_authenticated_request_skips_user_query(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    headers = await superuser_token_headers
+    await client.get("/quizzes", headers=headers)
+
+    with record_queries(db) as queries:
+        response = await client.get("/quizzes", headers=headers)
+    assert response.status_code == 200
+    assert queries
+    assert not [statement for statement, _ in queries if "FROM users" in statement]
+
+async def test_superuser_status_change_is_not_cached(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    email = await random_email()
+    password = await random_lower_string()
+    user_id = (await create_random_user(db, email, password)).id
+    headers = await get_user_authentication_headers(client, email, password)
+
+    response = await client.get("/quizzes", headers=headers)
+    assert response.status_code == 400
+
+    response = await client.patch(f"/update/{user_id}?is_superuser=true", headers=await superuser_token_headers)
+    assert response.status_code == 200
+
+    response = await client.get("/quizzes", headers=headers)
+    assert response.status_code == 200
+
+
+async def test_deleted_user_principal_is_dropped(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    email = await random_email()
+    password = await random_lower_string()
+    user_id = (await create_random_user(db, email, password)).id
+    headers = await get_user_authentication_headers(client, email, password)
+
+    response = await client.post("/test-token", headers=headers)
+    assert response.status_code == 200
+    assert principal_cache.get(user_id) is not None
+
+    response = await client.delete(f"/user/{user_id}", headers=await superuser_token_headers)
+    assert response.status_code == 200
+    assert principal_cache.get(user_id) is None
+
+
+async def test_password_change_revokes_tokens(db: AsyncSession, client: AsyncClient) -> None:
+    email = await random_email()
+    password = await random_lower_string()
+    user = await create_random_user(db, email, password, is_superuser=True)
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    answers = [{"answer_id": answer.id, "is_correct": answer.is_correct} for answer in quiz.questions[0].answers]
+    access_token = await get_access_token(client, email, password)
+    headers = {"Authorization": f"Bearer {access_token}"}
+    response = await client.get(f"/quiz/{quiz.id}/view", headers=headers)
+    assert response.status_code == 200
+
+    new_password = await random_lower_string()
+    await crud_user.update_password(db, user, new_password)
+    for response in [
+        await client.get(f"/quiz/{quiz.id}/view", headers=headers),
+        await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json={"quiz_id": quiz.id, "answers": answers}),
+        await client.get("/quizzes", headers=headers)
+    ]:
+        assert response.status_code == 401
+        assert response.headers["WWW-Authenticate"] == "Bearer"
+
+    token_data: AccsessTokenData = await decode_jwt(access_token, AccsessTokenData)
+    response = await client.post(f"/refresh?refresh_token={token_data.refresh_token}")
+    assert response.status_code == 400
+
+    # a new token caches the user again, and the old one is older than that
+    new_headers = await get_user_authentication_headers(client, email, new_password)
+    response = await client.get("/quizzes", headers=new_headers)
+    assert response.status_code == 200
+    response = await client.get("/quizzes", headers=headers)
+    assert response.status_code == 401
@@ -0,0 +1,69 @@
+import asyncio
+
+from fastapi import FastAPI
+from httpx import AsyncClient
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import sessionmaker
+
+from app.database.session import get_db
+from app.tests.utils.utils import random_lower_string
+
+
+def use_session_per_request(app: FastAPI, session_factory: sessionmaker) -> None:
+    async def _get_db():
+        async with session_factory() as db:
+            yield db
+
+    # every request gets its own session, as it does outside of the tests
+    app.dependency_overrides[get_db] = _get_db
+
+
+async def test_concurrent_requests_overlap(
+    app: FastAPI,
+    client: AsyncClient,
+    engine: AsyncEngine,
+    session_factory: sessionmaker,
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await superuser_token_headers
+    use_session_per_request(app, session_factory)
+
+    in_flight = 0
+    max_in_flight = 0
+
+    def before_cursor_execute(*args):
+        nonlocal in_flight, max_in_flight
+        in_flight += 1
+        max_in_flight = max(max_in_flight, in_flight)
+
+    def after_cursor_execute(*args):
+        nonlocal in_flight
+        in_flight -= 1
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+    try:
+        responses = await asyncio.gather(*(client.get("/quizzes", headers=headers) for _ in range(20)))
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+        event.remove(engine.sync_engine, "after_cursor_execute", after_cursor_execute)
+
+    assert all(response.status_code == 200 for response in responses)
+    # a blocking driver would run one statement at a time on the event loop
+    assert max_in_flight > 1
+
+
+async def test_concurrent_duplicate_creates(
+    app: FastAPI,
+    client: AsyncClient,
+    session_factory: sessionmaker,
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await superuser_token_headers
+    use_session_per_request(app, session_factory)
+
+    category = {"name": await random_lower_string()}
+    responses = await asyncio.gather(*(client.post("/category", headers=headers, json=category) for _ in range(10)))
+
+    assert sorted(response.status_code for response in responses) == [201] + [400] * 9
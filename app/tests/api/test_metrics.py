@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import threading
+
+import pytest
+from fastapi import HTTPException
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core import config
+from app.core.metrics import db_queries_per_request, db_query_seconds, db_slow_queries, instrument_password_hasher, registry
+from app.core.security import PasswordHasherPool
+from app.tests.utils.quiz import create_random_quiz_graph
+
+
+VIEW_ROUTE = "/quiz/{quiz_id}/view"
+
+
+async def test_metrics_attribute_queries_to_routes(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2, answers=2)
+    quiz_id = quiz.id
+
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.status_code == 200
+    response = await client.get("/no-such-route")
+    assert response.status_code == 404
+
+    queries = db_queries_per_request.get("GET", VIEW_ROUTE)
+    assert queries.count == 1
+    assert queries.sum >= 1
+    assert db_query_seconds.get(VIEW_ROUTE).count == queries.sum
+
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    lines = response.text.splitlines()
+    assert "# TYPE db_queries_per_request histogram" in lines
+    assert 'http_requests_total{method="GET",route="/quiz/{quiz_id}/view",status="200"} 1' in lines
+    assert 'http_requests_total{method="GET",route="unmatched",status="404"} 1' in lines
+    assert f'db_queries_per_request_count{{method="GET",route="/quiz/{{quiz_id}}/view"}} 1' in lines
+    assert f'db_queries_per_request_bucket{{method="GET",route="/quiz/{{quiz_id}}/view",le="+Inf"}} 1' in lines
+
+
+async def test_slow_queries_are_logged_with_route(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    monkeypatch: pytest.MonkeyPatch,
+    caplog: pytest.LogCaptureFixture
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    quiz_id = quiz.id
+    monkeypatch.setattr(config, "SLOW_QUERY_SECONDS", 0.0)
+
+    with caplog.at_level(logging.WARNING, logger="app.core.metrics"):
+        response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.status_code == 200
+
+    assert db_slow_queries.get(VIEW_ROUTE) == db_queries_per_request.get("GET", VIEW_ROUTE).sum
+    assert f"Slow query in GET {VIEW_ROUTE}" in caplog.text
+
+
+async def test_server_timing_header(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2, answers=2)
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json={"quiz_id": quiz.id, "answers": answers})
+    assert response.status_code == 200
+
+    phases = {entry.split(";")[0]: entry for entry in response.headers["server-timing"].split(", ")}
+    assert set(phases) == {"auth", "grading", "serialize", "db", "total"}
+    assert all(float(entry.split("dur=")[1].split(";")[0]) >= 0 for entry in phases.values())
+    assert phases["db"].endswith('queries"')
+
+
+async def test_profile(client: AsyncClient, normal_user_token_headers: dict[str: str], superuser_token_headers: dict[str: str]) -> None:
+    response = await client.post("/debug/profile", params={"seconds": 0.1}, headers=await normal_user_token_headers)
+    assert response.status_code == 400
+
+    response = await client.post("/debug/profile", params={"seconds": 0.2}, headers=await superuser_token_headers)
+    assert response.status_code == 200
+    lines = response.text.splitlines()
+    assert lines
+    stack, count = lines[0].rsplit(" ", 1)
+    assert int(count) >= 1
+    # the event loop's thread, waiting for the sampler
+    assert any(line.startswith("MainThread;") for line in lines)
+
+
+async def test_password_hasher_metrics(client: AsyncClient) -> None:
+    pool = PasswordHasherPool(max_workers=1, max_queue=1)
+    instrument_password_hasher(pool)
+    collect = registry.collectors[-1]
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(pool.run(release.wait))
+        queued = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0)
+        with pytest.raises(HTTPException):
+            await pool.run(release.wait)
+
+        response = await client.get("/metrics")
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert "password_hash_in_flight 1" in lines
+        assert "password_hash_queue_depth 1" in lines
+        assert "password_hash_rejected_total 1" in lines
+    finally:
+        registry.collectors.remove(collect)
+        release.set()
+        await asyncio.gather(running, queued)
+        pool.shutdown()
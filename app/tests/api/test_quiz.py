@@ -1,21 +1,27 @@
 from datetime import datetime
 
+import orjson
+import pytest
 from httpx import AsyncClient
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.core import config
 from app.database.models.user import User
 from app.database.models.quiz import (
     Quiz,
     Question,
     Category,
     Answer,
-    QuizResult
+    QuizResult,
+    questions_categories
 )
 from app.tests.utils.quiz import (
     create_random_quiz,
     create_random_question,
     create_random_category,
     create_random_answer,
+    create_random_quiz_graph,
     create_quiz_result
 )
 from app.schemes.quiz import (
@@ -26,9 +32,16 @@ from app.schemes.quiz import (
     QuizScheme,
     QuestionScheme,
     CategoryScheme,
-    AnswerScheme
+    AnswerScheme,
+    QuizAttemptResponse,
+    QuizResponse
 )
-from app.tests.utils.utils import random_lower_string
+from app.crud.quiz import crud_quiz
+from app.utils.attempt_store import attempt_store
+from app.utils.quiz_document import NDJSON_MEDIA_TYPE
+from app.utils.cache import TTLCache, VersionedCache, quiz_snapshot_cache
+from app.utils.quiz import generate_quiz_response
+from app.tests.utils.utils import record_queries, random_lower_string
 
 
 async def test_view_quiz(client: AsyncClient, normal_user_token_headers: dict[str: str], new_active_quiz: Quiz) -> None:
@@ -41,7 +54,17 @@ async def test_view_quiz(client: AsyncClient, normal_user_token_headers: dict[st
     assert "questions" in response_data
 
 
-async def test_submit_quiz(db: Session, client: AsyncClient, normal_user_token_headers: dict[str: str]):
+async def test_view_quiz_payload_matches_response_model(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    quiz = await create_random_quiz_graph(db, questions=3, answers=2)
+    expected = QuizResponse.parse_obj((await generate_quiz_response(quiz)).dict())
+    response = await client.get(f"/quiz/{quiz.id}/view", headers=await normal_user_token_headers)
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/json"
+    assert QuizResponse.parse_raw(response.content) == expected
+    assert [question["question_id"] for question in response.json()["questions"]] == [question.id for question in quiz.questions]
+
+
+async def test_submit_quiz(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]):
     quiz = await create_random_quiz(db, is_active=True)
     question_1 = await create_random_question(db, quiz.id)
     question_2 = await create_random_question(db, quiz.id)
@@ -72,13 +95,469 @@ async def test_submit_quiz(db: Session, client: AsyncClient, normal_user_token_h
     assert response_data["score_percentage"] == 60
 
 
+async def test_submit_quiz_duplicate_answers(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]):
+    quiz = await create_random_quiz(db, is_active=True)
+    question = await create_random_question(db, quiz.id)
+    asnwer_1 = await create_random_answer(db, question.id, is_correct=True)
+    await create_random_answer(db, question.id, is_correct=False)
+    user_ansewers = {
+        "quiz_id": quiz.id,
+        "answers": [
+            {"answer_id": asnwer_1.id, "is_correct": True},
+            {"answer_id": asnwer_1.id, "is_correct": True},
+        ]
+    }
+    response = await client.post(
+        f"/quiz/{quiz.id}/submit",
+        headers=await normal_user_token_headers,
+        json=user_ansewers
+    )
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Duplicate answer id provided"
+
+
+async def test_view_quiz_query_count(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    small_quiz_id = (await create_random_quiz_graph(db, questions=1)).id
+    large_quiz_id = (await create_random_quiz_graph(db, questions=10)).id
+
+    with record_queries(db) as small_quiz_queries:
+        response = await client.get(f"/quiz/{small_quiz_id}/view", headers=headers)
+    assert response.status_code == 200
+
+    with record_queries(db) as large_quiz_queries:
+        response = await client.get(f"/quiz/{large_quiz_id}/view", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["questions"]) == 10
+
+    # the first request also loads the user, after that only the quiz graph
+    assert len(small_quiz_queries) <= 3
+    assert len(large_quiz_queries) <= 2
+
+
+async def test_view_quiz_served_from_cache(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz_id = (await create_random_quiz_graph(db, questions=5)).id
+    await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+
+    with record_queries(db) as queries:
+        response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["questions"]) == 5
+
+    # both the quiz snapshot and the current user are cached
+    assert queries == []
+
+
+async def test_view_quiz_cache_expires(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1)
+    quiz_id = quiz.id
+    question = quiz.questions[0]
+    old_text = question.question_text
+    now = 0.0
+    cache = VersionedCache(TTLCache(maxsize=config.QUIZ_CACHE_SIZE, ttl=config.QUIZ_CACHE_TTL_SECONDS, clock=lambda: now))
+    monkeypatch.setattr("app.utils.quiz.quiz_snapshot_cache", cache)
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.json()["questions"][0]["question_text"] == old_text
+
+    # changed by another worker process, which can't invalidate this one's cache
+    question.question_text = await random_lower_string()
+    await db.commit()
+
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.json()["questions"][0]["question_text"] == old_text
+
+    now += config.QUIZ_CACHE_TTL_SECONDS + 1
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.json()["questions"][0]["question_text"] == question.question_text
+
+
+async def test_view_quiz_cache_invalidated_on_question_create(
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str],
+    new_question: Question
+) -> None:
+    headers = await normal_user_token_headers
+    quiz_id = new_question.quiz_id
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert len(response.json()["questions"]) == 1
+
+    new_question = QuestionCreate(quiz_id=quiz_id, question_text=await random_lower_string())
+    response = await client.post("/question", headers=await superuser_token_headers, json=new_question.dict())
+    assert response.status_code == 201
+
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert len(response.json()["questions"]) == 2
+
+
+async def test_create_question_for_quiz_deleted_meanwhile(
+    db: AsyncSession,
+    client: AsyncClient,
+    superuser_token_headers: dict[str: str],
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = await superuser_token_headers
+    quiz = await create_random_quiz(db)
+    quiz_id = quiz.id
+    await crud_quiz.delete(db, id=quiz_id)
+
+    # the quiz is found, then deleted before the question is inserted
+    async def get_deleted_quiz(db: AsyncSession, id: int) -> Quiz:
+        return quiz
+    monkeypatch.setattr(crud_quiz, "get", get_deleted_quiz)
+
+    new_question = QuestionCreate(quiz_id=quiz_id, question_text=await random_lower_string())
+    response = await client.post("/question", headers=headers, json=new_question.dict())
+    assert response.status_code == 409
+
+
+async def test_view_quiz_not_modified(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2)
+    response = await client.get(f"/quiz/{quiz.id}/view", headers=headers)
+    etag = response.headers["ETag"]
+    assert response.headers["Cache-Control"] == config.CATALOGUE_CACHE_CONTROL
+
+    with record_queries(db) as queries:
+        response = await client.get(f"/quiz/{quiz.id}/view", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.content == b""
+    assert response.headers["ETag"] == etag
+    assert queries == []
+
+    # the tag comes from the content, so a worker that never saw it agrees
+    quiz_snapshot_cache.clear()
+    response = await client.get(f"/quiz/{quiz.id}/view", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    quiz_in = {"id": quiz.id, "title": await random_lower_string(), "description": quiz.description}
+    response = await client.patch(f"/quiz/{quiz.id}", headers=await superuser_token_headers, json=quiz_in)
+    assert response.status_code == 200
+
+    response = await client.get(f"/quiz/{quiz.id}/view", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+    assert response.json()["quiz_title"] == quiz_in["title"]
+
+
+async def test_submit_quiz_cache_invalidated_on_answer_update(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz(db, is_active=True)
+    question = await create_random_question(db, quiz.id)
+    answer = await create_random_answer(db, question.id, is_correct=True)
+    quiz_id, question_id, answer_id, answer_text = quiz.id, question.id, answer.id, answer.answer_text
+    user_answers = {"quiz_id": quiz_id, "answers": [{"answer_id": answer_id, "is_correct": True}]}
+
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=user_answers)
+    assert response.json()["user_score"] == 1
+
+    update_answer = AnswerScheme(id=answer_id, question_id=question_id, answer_text=answer_text, is_correct=False)
+    response = await client.patch(f"/answer/{answer_id}", headers=await superuser_token_headers, json=update_answer.dict())
+    assert response.status_code == 200
+
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=user_answers)
+    assert response.json()["user_score"] == 0
+
+
+async def test_submit_quiz_query_count(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=10)
+    quiz_id = quiz.id
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+
+    with record_queries(db) as queries:
+        response = await client.post(
+            f"/quiz/{quiz_id}/submit",
+            headers=headers,
+            json={"quiz_id": quiz_id, "answers": answers}
+        )
+    assert response.status_code == 200
+    assert response.json()["user_score"] == response.json()["max_score"]
+
+    # user, quiz graph, result insert, its statistics upserts and its refresh
+    assert len(queries) <= 7
+
+
+async def create_sampled_quiz(db: AsyncSession, client: AsyncClient, headers: dict[str: str]) -> tuple[int, list[int]]:
+    categories = [await create_random_category(db) for _ in range(2)]
+    category_ids = [category.id for category in categories]
+    document = {
+        "title": await random_lower_string(),
+        "description": await random_lower_string(),
+        "sampling_rules": [
+            {"category_id": category_ids[0], "question_count": 2},
+            {"category_id": category_ids[1], "question_count": 1}
+        ],
+        "questions": [
+            {
+                "question_text": f"Question {number}?",
+                "categories": [categories[number % 2].name],
+                "answers": [{"answer_text": "Yes", "is_correct": True}, {"answer_text": "No"}]
+            }
+            for number in range(10)
+        ]
+    }
+    response = await client.post("/quiz/import", headers=headers, json=document)
+    assert response.status_code == 201
+    return response.json()["quiz_id"], category_ids
+
+
+async def test_start_sampled_quiz(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz_id, category_ids = await create_sampled_quiz(db, client, await superuser_token_headers)
+
+    response = await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+    assert response.status_code == 400
+
+    response = await client.post(f"/quiz/{quiz_id}/start", headers=headers)
+    assert response.status_code == 201
+    attempt = QuizAttemptResponse.parse_raw(response.content)
+    assert attempt.quiz_id == quiz_id
+    assert len(attempt.questions) == 3
+    assert len({question.question_id for question in attempt.questions}) == 3
+    categories = await db.execute(
+        select(questions_categories.c.category_id)
+        .filter(questions_categories.c.question_id.in_([question.question_id for question in attempt.questions]))
+    )
+    assert sorted(categories.scalars().all()) == sorted([category_ids[0]] * 2 + [category_ids[1]])
+
+    answers = [
+        {"answer_id": variant.answer_id, "is_correct": variant.answer_text == "Yes"}
+        for question in attempt.questions
+        for variant in question.answer_variants
+    ]
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json={"quiz_id": quiz_id, "answers": answers})
+    assert response.status_code == 400
+
+    submission = {"quiz_id": quiz_id, "attempt_id": attempt.attempt_id, "answers": answers}
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=submission)
+    assert response.status_code == 200
+    assert response.json()["max_score"] == 6
+    assert response.json()["user_score"] == 6
+
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=submission)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Attempt already submitted"
+
+
+async def test_start_quiz_without_sampling(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=3, answers=2)
+    response = await client.post(f"/quiz/{quiz.id}/start", headers=headers)
+    assert response.status_code == 201
+    attempt = response.json()
+    assert [question["question_id"] for question in attempt["questions"]] == [question.id for question in quiz.questions]
+
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    submission = {"quiz_id": quiz.id, "attempt_id": attempt["attempt_id"], "answers": answers}
+    # a lost key is rebuilt from the stored attempt
+    await attempt_store.clear()
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=await superuser_token_headers, json=submission)
+    assert response.status_code == 403
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json=submission)
+    assert response.status_code == 200
+    assert response.json()["user_score"] == 6
+
+
+async def test_submit_attempt_grades_frozen_answer_key(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=3, answers=2)
+    quiz_id = quiz.id
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    changed_answer = AnswerScheme.from_orm(quiz.questions[0].answers[0])
+    response = await client.post(f"/quiz/{quiz_id}/start", headers=headers)
+    assert response.status_code == 201
+    attempt_id = response.json()["attempt_id"]
+
+    # edits made while the attempt is running don't change its grading
+    changed_answer.is_correct = not changed_answer.is_correct
+    response = await client.patch(f"/answer/{changed_answer.id}", headers=await superuser_token_headers, json=changed_answer.dict())
+    assert response.status_code == 200
+
+    submission = {"quiz_id": quiz_id, "attempt_id": attempt_id, "answers": answers}
+    with record_queries(db) as queries:
+        response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=submission)
+    assert response.status_code == 200
+    assert response.json()["user_score"] == 6
+    assert not [statement for statement, _ in queries if "FROM quizzes" in statement or "FROM questions" in statement or "FROM answers" in statement]
+
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=submission)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Attempt already submitted"
+
+
+async def test_submit_attempt_lost_from_store_grades_saved_answer_key(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2, answers=2)
+    quiz_id = quiz.id
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    changed_answer = AnswerScheme.from_orm(quiz.questions[0].answers[0])
+    response = await client.post(f"/quiz/{quiz_id}/start", headers=headers)
+    attempt_id = response.json()["attempt_id"]
+
+    changed_answer.is_correct = not changed_answer.is_correct
+    response = await client.patch(f"/answer/{changed_answer.id}", headers=await superuser_token_headers, json=changed_answer.dict())
+    assert response.status_code == 200
+    # e.g. started on a worker that doesn't share the store
+    await attempt_store.clear()
+
+    submission = {"quiz_id": quiz_id, "attempt_id": attempt_id, "answers": answers}
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json=submission)
+    assert response.status_code == 200
+    assert response.json()["user_score"] == 4
+
+
+async def test_attempt_progress(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2, answers=2)
+    quiz_id = quiz.id
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    response = await client.post(f"/quiz/{quiz_id}/start", headers=headers)
+    attempt_id = response.json()["attempt_id"]
+    progress_url = f"/quiz/{quiz_id}/attempt/{attempt_id}/progress"
+
+    response = await client.get(progress_url, headers=headers)
+    assert response.status_code == 200
+    assert response.json() == {"answers": []}
+
+    with record_queries(db) as queries:
+        response = await client.put(progress_url, headers=headers, json={"answers": answers[:2]})
+    assert response.status_code == 204
+    assert queries == []
+    response = await client.get(progress_url, headers=headers)
+    assert response.json() == {"answers": answers[:2]}
+
+    response = await client.put(progress_url, headers=headers, json={"answers": [{"answer_id": 0, "is_correct": True}]})
+    assert response.status_code == 400
+    response = await client.get(progress_url, headers=await superuser_token_headers)
+    assert response.status_code == 403
+    response = await client.get(f"/quiz/{quiz_id + 1}/attempt/{attempt_id}/progress", headers=headers)
+    assert response.status_code == 404
+
+    response = await client.post(f"/quiz/{quiz_id}/submit", headers=headers, json={"quiz_id": quiz_id, "attempt_id": attempt_id, "answers": answers})
+    assert response.status_code == 200
+    response = await client.get(progress_url, headers=headers)
+    assert response.status_code == 400
+
+
+async def test_submit_quiz_batch(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=2, answers=2)
+    inactive_quiz = await create_random_quiz(db, is_active=False)
+    quiz_id, inactive_quiz_id = quiz.id, inactive_quiz.id
+    correct_answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    wrong_answers = [{**answer, "is_correct": not answer["is_correct"]} for answer in correct_answers]
+    quiz_requests = [
+        {"quiz_id": quiz_id, "answers": correct_answers},
+        {"quiz_id": inactive_quiz_id, "answers": correct_answers},
+        {"quiz_id": quiz_id, "answers": wrong_answers},
+        {"quiz_id": quiz_id, "answers": correct_answers[:1]},
+        {"quiz_id": quiz_id, "answers": correct_answers, "attempt_id": 1},
+    ]
+
+    with record_queries(db) as queries:
+        response = await client.post("/quiz/submit/batch", headers=headers, json=quiz_requests)
+    response_data = response.json()
+    assert response.status_code == 200
+    assert [item["quiz_id"] for item in response_data] == [quiz_id, inactive_quiz_id, quiz_id, quiz_id, quiz_id]
+    assert response_data[0]["result"]["user_score"] == 4
+    assert response_data[1]["error"] == "Quiz is not active"
+    assert response_data[2]["result"]["user_score"] == 0
+    assert response_data[3]["error"] == "Incorrect number of answers provided"
+    assert response_data[4]["error"] == "Attempts can't be submitted in a batch, submit them one by one"
+
+    inserts = [statement for statement, _ in queries if statement.startswith("INSERT INTO quiz_results")]
+    assert len(inserts) == 1
+    results = await db.execute(select(QuizResult).filter(QuizResult.quiz_id == quiz_id))
+    assert len(results.scalars().all()) == 2
+
+
+async def test_submit_quiz_batch_too_large(client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    quiz_requests = [{"quiz_id": 1, "answers": []}] * (config.QUIZ_BATCH_MAX_SIZE + 1)
+    response = await client.post("/quiz/submit/batch", headers=await normal_user_token_headers, json=quiz_requests)
+    assert response.status_code == 400
+
+
 async def test_create_quiz(client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
     new_quiz = QuizCreate(title=await random_lower_string(), description=await random_lower_string())
     response = await client.post("/quiz", headers=await superuser_token_headers, json=new_quiz.dict())
     assert response.status_code == 201
 
 
-async def test_get_quizzes(db: Session, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+async def test_create_quiz_duplicate(client: AsyncClient, superuser_token_headers: dict[str: str], new_active_quiz: Quiz) -> None:
+    quiz = QuizCreate(title=new_active_quiz.title, description=new_active_quiz.description)
+    response = await client.post("/quiz", headers=await superuser_token_headers, json=quiz.dict())
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Quiz already exists"
+
+
+async def test_get_quizzes(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
     await create_random_quiz(db)
     await create_random_quiz(db)
     await create_random_quiz(db)
@@ -87,6 +566,80 @@ async def test_get_quizzes(db: Session, client: AsyncClient, superuser_token_hea
     assert len(response.json()) > 1
 
 
+async def test_get_quizzes_cursor_pagination(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    headers = await superuser_token_headers
+    quiz_ids = [(await create_random_quiz(db)).id for _ in range(5)]
+
+    seen_ids = []
+    params = {"limit": 2}
+    while True:
+        response = await client.get("/quizzes", headers=headers, params=params)
+        assert response.status_code == 200
+        seen_ids += [quiz["id"] for quiz in response.json()]
+        if "X-Next-Cursor" not in response.headers:
+            break
+        params = {"limit": 2, "cursor": response.headers["X-Next-Cursor"]}
+
+    assert seen_ids == sorted(quiz_ids)
+
+
+async def test_get_quizzes_after_id(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    quiz_ids = [(await create_random_quiz(db)).id for _ in range(3)]
+    response = await client.get(f"/quizzes?after_id={quiz_ids[0]}", headers=await superuser_token_headers)
+    assert response.status_code == 200
+    assert [quiz["id"] for quiz in response.json()] == quiz_ids[1:]
+    assert "X-Next-Cursor" not in response.headers
+
+
+async def test_get_quizzes_invalid_cursor(client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    response = await client.get("/quizzes?cursor=not-a-cursor", headers=await superuser_token_headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Invalid cursor"
+
+
+async def test_get_quizzes_limit_too_large(client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    response = await client.get(f"/quizzes?limit={config.PAGE_MAX_LIMIT + 1}", headers=await superuser_token_headers)
+    assert response.status_code == 422
+
+
+async def test_get_quizzes_not_modified(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    headers = await superuser_token_headers
+    await create_random_quiz(db)
+    response = await client.get("/quizzes", headers=headers)
+    etag = response.headers["ETag"]
+
+    response = await client.get("/quizzes", headers={**headers, "If-None-Match": f'W/{etag}, "other"'})
+    assert response.status_code == 304
+
+    new_quiz = QuizCreate(title=await random_lower_string(), description=await random_lower_string())
+    await client.post("/quiz", headers=headers, json=new_quiz.dict())
+    response = await client.get("/quizzes", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] != etag
+
+
+async def test_get_quizzes_etag_expires(
+    db: AsyncSession,
+    client: AsyncClient,
+    superuser_token_headers: dict[str: str],
+    monkeypatch: pytest.MonkeyPatch
+) -> None:
+    headers = await superuser_token_headers
+    response = await client.get("/quizzes", headers=headers)
+    etag = response.headers["ETag"]
+
+    # written through another worker process, which can't bump this one's versions
+    db.add(Quiz(title=await random_lower_string(), description=await random_lower_string()))
+    await db.commit()
+    response = await client.get("/quizzes", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 304
+
+    monkeypatch.setattr(config, "CATALOGUE_ETAG_TTL_SECONDS", 1e-9)
+    response = await client.get("/quizzes", headers={**headers, "If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+
+
 async def test_get_quiz(client: AsyncClient, superuser_token_headers: dict[str: str], new_active_quiz: Quiz):
     response = await client.get(f"/quiz/{new_active_quiz.id}", headers=await superuser_token_headers)
     response_data = response.json()
@@ -124,13 +677,104 @@ async def test_delete_quiz(client: AsyncClient, superuser_token_headers: dict[st
     assert response_data["description"] == new_active_quiz.description
 
 
+async def make_quiz_document(questions: int, categories: list[str]) -> dict:
+    return {
+        "title": await random_lower_string(),
+        "description": await random_lower_string(),
+        "questions": [
+            {
+                "question_text": f"Question {number}?",
+                "categories": categories,
+                "answers": [
+                    {"answer_text": "Yes", "is_correct": True},
+                    {"answer_text": "No", "is_correct": False}
+                ]
+            }
+            for number in range(questions)
+        ]
+    }
+
+
+async def test_import_quiz(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str], new_category: Category):
+    headers = await superuser_token_headers
+    await client.post("/test-token", headers=headers)
+    document = await make_quiz_document(50, [new_category.name, "imported"])
+    duplicate_question = {**document["questions"][0], "answers": document["questions"][0]["answers"] * 2}
+    document["questions"].append(duplicate_question)
+
+    with record_queries(db) as queries:
+        response = await client.post("/quiz/import", headers=headers, json=document)
+    assert response.status_code == 201
+    imported = response.json()
+    assert imported["questions"] == 50
+    assert imported["answers"] == 100
+    # independent of the number of questions
+    assert len(queries) <= 10
+
+    response = await client.get(f"/quiz/{imported['quiz_id']}/export", headers=headers)
+    assert response.status_code == 200
+    exported = response.json()
+    document["questions"].pop()
+    for question in document["questions"]:
+        question["categories"] = sorted(question["categories"])
+    assert exported == {**document, "is_active": True, "sampling_rules": None}
+
+    categories = await db.execute(select(Category.id).filter(Category.name == new_category.name))
+    assert categories.scalars().all() == [new_category.id]
+
+    response = await client.post("/quiz/import", headers=headers, json=document)
+    assert response.status_code == 400
+
+
+async def test_import_quiz_ndjson(client: AsyncClient, superuser_token_headers: dict[str: str], monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(config, "QUIZ_IMPORT_BATCH_SIZE", 3)
+    headers = await superuser_token_headers
+    document = await make_quiz_document(10, ["ndjson"])
+    lines = [orjson.dumps({"title": document["title"], "description": document["description"], "is_active": True, "sampling_rules": None})]
+    lines.extend(orjson.dumps(question) for question in document["questions"])
+    content = b"\n".join(lines) + b"\n"
+
+    async def chunks():
+        for start in range(0, len(content), 100):
+            yield content[start:start + 100]
+
+    response = await client.post("/quiz/import", headers={**headers, "Content-Type": NDJSON_MEDIA_TYPE}, content=chunks())
+    assert response.status_code == 201
+    assert response.json()["questions"] == 10
+
+    response = await client.get(
+        f"/quiz/{response.json()['quiz_id']}/export",
+        headers={**headers, "Accept": NDJSON_MEDIA_TYPE}
+    )
+    assert response.status_code == 200
+    assert response.content == content
+
+
+async def test_import_quiz_invalid_line_is_rolled_back(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]):
+    document = await make_quiz_document(3, [])
+    lines = [orjson.dumps({"title": document["title"], "description": document["description"]})]
+    lines.extend(orjson.dumps(question) for question in document["questions"])
+    lines.append(b'{"answers": []}')
+
+    response = await client.post(
+        "/quiz/import",
+        headers={**await superuser_token_headers, "Content-Type": NDJSON_MEDIA_TYPE},
+        content=b"\n".join(lines)
+    )
+    assert response.status_code == 422
+    assert response.json()["detail"][0]["loc"] == ["body", 5, "question_text"]
+
+    result = await db.execute(select(Quiz.id).filter(Quiz.title == document["title"]))
+    assert result.first() is None
+
+
 async def test_create_question(client: AsyncClient, superuser_token_headers: dict[str: str], new_active_quiz: Quiz):
     new_question = QuestionCreate(quiz_id=new_active_quiz.id, question_text=await random_lower_string())
     response = await client.post("/question", headers=await superuser_token_headers, json=new_question.dict())
     assert response.status_code == 201
 
 
-async def test_get_questions(db: Session, client: AsyncClient, superuser_token_headers: dict[str: str], new_active_quiz: Quiz):
+async def test_get_questions(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str], new_active_quiz: Quiz):
     await create_random_question(db, new_active_quiz.id)
     await create_random_question(db, new_active_quiz.id)
     await create_random_question(db, new_active_quiz.id)
@@ -139,6 +783,47 @@ async def test_get_questions(db: Session, client: AsyncClient, superuser_token_h
     assert len(response.json()) > 1
 
 
+async def test_search_questions(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]):
+    headers = await superuser_token_headers
+    categories = [await create_random_category(db) for _ in range(2)]
+    document = await make_quiz_document(0, [])
+    document["questions"] = [
+        {"question_text": "How many vacation days do employees get?", "categories": [categories[0].name], "answers": []},
+        {"question_text": "Who approves a vacation request?", "categories": [categories[1].name], "answers": []},
+        {"question_text": "Where is the office kitchen?", "categories": [categories[0].name, categories[1].name], "answers": []},
+    ]
+    response = await client.post("/quiz/import", headers=headers, json=document)
+    quiz_id = response.json()["quiz_id"]
+    other_quiz = await create_random_quiz(db)
+    await create_random_question(db, other_quiz.id)
+
+    with record_queries(db) as queries:
+        response = await client.get("/questions/search", headers=headers, params={"q": "vacations"})
+    assert response.status_code == 200
+    assert [question["question_text"] for question in response.json()] == [
+        "How many vacation days do employees get?",
+        "Who approves a vacation request?"
+    ]
+    assert response.json()[0]["categories"][0]["name"] == categories[0].name
+    # one query for the categories of all the questions
+    assert len([statement for statement, _ in queries if "JOIN categories" in statement]) == 1
+
+    response = await client.get("/questions/search", headers=headers, params={"category": categories[0].id, "limit": 1})
+    assert [question["question_text"] for question in response.json()] == ["How many vacation days do employees get?"]
+    response = await client.get(
+        "/questions/search",
+        headers=headers,
+        params={"category": categories[0].id, "cursor": response.headers["X-Next-Cursor"]}
+    )
+    assert [question["question_text"] for question in response.json()] == ["Where is the office kitchen?"]
+    assert len(response.json()[0]["categories"]) == 2
+
+    response = await client.get("/questions/search", headers=headers, params={"q": "vacation -approves", "quiz_id": quiz_id})
+    assert [question["question_text"] for question in response.json()] == ["How many vacation days do employees get?"]
+    response = await client.get("/questions/search", headers=headers, params={"quiz_id": other_quiz.id})
+    assert len(response.json()) == 1
+
+
 async def test_get_question(client: AsyncClient, superuser_token_headers: dict[str: str], new_question: Question):
     response = await client.get(f"/question/{new_question.id}", headers=await superuser_token_headers)
     response_data = response.json()
@@ -166,6 +851,18 @@ async def test_update_question(client: AsyncClient, superuser_token_headers: dic
     assert response_data["question_text"] == update_question.question_text
 
 
+async def test_update_question_duplicate(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str], new_question: Question):
+    headers = await superuser_token_headers
+    other_question = QuestionScheme.from_orm(await create_random_question(db, quiz_id=new_question.quiz_id))
+    question_in = {"id": other_question.id, "quiz_id": new_question.quiz_id, "question_text": new_question.question_text}
+    response = await client.patch(f"/question/{other_question.id}", headers=headers, json=question_in)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Question already exists"
+
+    response = await client.get(f"/question/{other_question.id}", headers=headers)
+    assert response.json()["question_text"] == other_question.question_text
+
+
 async def test_delete_question(client: AsyncClient, superuser_token_headers: dict[str: str], new_question: Question):
     response = await client.delete(f"/question/{new_question.id}", headers=await superuser_token_headers)
     assert response.status_code == 200
@@ -181,7 +878,7 @@ async def test_create_category(client: AsyncClient, superuser_token_headers: dic
     assert response.status_code == 201
 
 
-async def test_get_categories(db: Session, client: AsyncClient, superuser_token_headers: dict[str: str]):
+async def test_get_categories(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]):
     await create_random_category(db)
     await create_random_category(db)
     await create_random_category(db)
@@ -236,7 +933,7 @@ async def test_create_answer(client: AsyncClient, superuser_token_headers: dict[
     assert response.status_code == 201
 
 
-async def test_get_answers(db: Session, client: AsyncClient, superuser_token_headers: dict[str: str], new_question: Question):
+async def test_get_answers(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str], new_question: Question):
     await create_random_answer(db, new_question.id)
     await create_random_answer(db, new_question.id)
     await create_random_answer(db, new_question.id)
@@ -284,7 +981,7 @@ async def test_delete_answer(client: AsyncClient, superuser_token_headers: dict[
     assert response_data["answer_text"] == new_correct_answer.answer_text
 
 
-async def test_get_results(db: Session, client: AsyncClient, superuser_token_headers: dict[str: str], new_normal_user: User, new_active_quiz: Quiz):
+async def test_get_results(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str], new_normal_user: User, new_active_quiz: Quiz):
     await create_quiz_result(db, new_normal_user.id, new_active_quiz.id)
     await create_quiz_result(db, new_normal_user.id, new_active_quiz.id)
     await create_quiz_result(db, new_normal_user.id, new_active_quiz.id)
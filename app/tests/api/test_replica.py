@@ -0,0 +1,109 @@
+import time
+
+import pytest
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core import config
+from app.core.metrics import instrument_pool, registry
+from app.database import session
+from app.database.models.user import User
+from app.database.session import PRIMARY_PIN_COOKIE, create_pooled_engine
+from app.schemes.token import AccsessTokenData
+from app.tests.utils.quiz import create_random_quiz_graph
+from app.tests.utils.user import get_access_token
+from app.utils.token import decode_jwt
+
+
+# the test database stands in for the replica; the sessions opened on it tell
+# which reads were routed there
+@pytest.fixture()
+def replica_sessions(session_factory: sessionmaker, monkeypatch: pytest.MonkeyPatch) -> list[AsyncSession]:
+    opened = []
+
+    def replica_session() -> AsyncSession:
+        opened.append(session_factory())
+        return opened[-1]
+
+    monkeypatch.setattr(session, "ReadSessionLocal", replica_session)
+    return opened
+
+
+async def test_reads_go_to_replica_until_a_write_pins_the_primary(
+    db: AsyncSession,
+    client: AsyncClient,
+    superuser_token_headers: dict[str: str],
+    replica_sessions: list[AsyncSession]
+) -> None:
+    headers = await superuser_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    answers = [{"answer_id": answer.id, "is_correct": answer.is_correct} for answer in quiz.questions[0].answers]
+    client.cookies.clear()
+
+    response = await client.get("/results", headers=headers)
+    assert response.status_code == 200
+    assert response.json() == []
+    assert len(replica_sessions) == 1
+    assert PRIMARY_PIN_COOKIE not in response.cookies
+
+    # a rejected write doesn't pin
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json={"quiz_id": quiz.id})
+    assert response.status_code == 422
+    assert PRIMARY_PIN_COOKIE not in client.cookies
+
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json={"quiz_id": quiz.id, "answers": answers})
+    assert response.status_code == 200
+    pinned_until = float(client.cookies[PRIMARY_PIN_COOKIE])
+    # the cookie holds the time rounded to milliseconds
+    assert time.time() < pinned_until <= time.time() + config.PRIMARY_PIN_SECONDS + 0.001
+
+    # the submitter reads its result from the primary
+    response = await client.get("/results", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert len(replica_sessions) == 1
+
+    client.cookies.set(PRIMARY_PIN_COOKIE, str(time.time() - 1))
+    response = await client.get(f"/quiz/{quiz.id}", headers=headers)
+    assert response.status_code == 200
+    assert len(replica_sessions) == 2
+
+
+async def test_signin_does_not_pin(client: AsyncClient, first_superuser: User, replica_sessions: list[AsyncSession]) -> None:
+    client.cookies.clear()
+    access_token = await get_access_token(client, config.FIRST_SUPERUSER_EMAIL, config.FIRST_SUPERUSER_PASSWORD)
+    token_data: AccsessTokenData = await decode_jwt(access_token, AccsessTokenData)
+    response = await client.post(f"/refresh?refresh_token={token_data.refresh_token}")
+    assert response.status_code == 200
+    assert PRIMARY_PIN_COOKIE not in client.cookies
+
+    response = await client.get("/results", headers={"Authorization": f"Bearer {access_token}"})
+    assert response.status_code == 200
+    assert len(replica_sessions) == 1
+
+
+async def test_without_replica_reads_use_primary(client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    headers = await superuser_token_headers
+    assert session.ReadSessionLocal is None
+
+    response = await client.get("/results", headers=headers)
+    assert response.status_code == 200
+    assert PRIMARY_PIN_COOKIE not in client.cookies
+
+
+async def test_replica_pool_metrics_are_labelled(client: AsyncClient) -> None:
+    read_engine = create_pooled_engine(config.TEST_ASYNC_DB_DEFAULT, "replica", pool_size=2)
+    instrument_pool(read_engine)
+    collect = registry.collectors[-1]
+    try:
+        async with read_engine.connect():
+            response = await client.get("/metrics")
+        lines = response.text.splitlines()
+        assert 'db_pool_size{pool="replica"} 2' in lines
+        assert 'db_pool_checked_out{pool="replica"} 1' in lines
+        assert 'db_pool_checkout_wait_seconds_count{pool="replica"} 1' in lines
+        assert f'db_pool_size{{pool="primary"}} {config.DB_POOL_SIZE}' in lines
+    finally:
+        registry.collectors.remove(collect)
+        await read_engine.dispose()
@@ -0,0 +1,179 @@
+from httpx import AsyncClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.database.models.quiz import Quiz
+from app.database.models.user import User
+from app.tests.utils.quiz import create_random_quiz_graph
+from app.tests.utils.user import create_random_user, get_user_authentication_headers
+from app.tests.utils.utils import record_queries, random_email, random_lower_string
+from app.utils.result_queue import result_queue
+
+
+async def submit_answers(client: AsyncClient, headers: dict[str: str], quiz: Quiz, mistakes: int = 0) -> None:
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    for answer in answers[:mistakes]:
+        answer["is_correct"] = not answer["is_correct"]
+    response = await client.post(f"/quiz/{quiz.id}/submit", headers=headers, json={"quiz_id": quiz.id, "answers": answers})
+    assert response.status_code == 200
+
+
+async def test_quiz_and_user_stats(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    superuser_headers = await superuser_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+
+    await submit_answers(client, headers, quiz)
+    await submit_answers(client, headers, quiz, mistakes=1)
+    await submit_answers(client, superuser_headers, quiz, mistakes=2)
+
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=headers)
+    assert response.status_code == 200
+    stats = response.json()
+    assert stats["attempts"] == 3
+    assert stats["users"] == 2
+    assert stats["best_percentage"] == 100
+    assert stats["mean_percentage"] == 50
+
+    user_id = (await client.post("/test-token", headers=headers)).json()["id"]
+    with record_queries(db) as queries:
+        response = await client.get(f"/stats/user/{user_id}", headers=headers)
+    assert response.status_code == 200
+    assert len(queries) == 1
+    [user_stats] = response.json()
+    assert user_stats["quiz_id"] == quiz.id
+    assert user_stats["attempts"] == 2
+    assert user_stats["best_score"] == 2
+    assert user_stats["last_score"] == 1
+    assert user_stats["max_score"] == 2
+    assert user_stats["mean_percentage"] == 75
+
+
+async def test_batch_submission_updates_stats(db: AsyncSession, client: AsyncClient, normal_user_token_headers: dict[str: str]) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    response = await client.post("/quiz/submit/batch", headers=headers, json=[{"quiz_id": quiz.id, "answers": answers}] * 3)
+    assert response.status_code == 200
+
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=headers)
+    assert response.json()["attempts"] == 3
+    assert response.json()["users"] == 1
+
+
+async def test_stats_rebuilt_on_result_delete(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    await submit_answers(client, headers, quiz)
+    await submit_answers(client, headers, quiz, mistakes=1)
+
+    superuser_headers = await superuser_token_headers
+    results = (await client.get("/results", headers=superuser_headers)).json()
+    response = await client.delete(f"/result/{results[-1]['id']}", headers=superuser_headers)
+    assert response.status_code == 200
+
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=headers)
+    assert response.json()["attempts"] == 1
+    assert response.json()["mean_percentage"] == 100
+
+    response = await client.delete(f"/result/{results[0]['id']}", headers=superuser_headers)
+    assert response.status_code == 200
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=headers)
+    assert response.status_code == 404
+
+
+async def test_quiz_stats_drop_deleted_users(db: AsyncSession, client: AsyncClient, superuser_token_headers: dict[str: str]) -> None:
+    superuser_headers = await superuser_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    await submit_answers(client, superuser_headers, quiz)
+    email = await random_email()
+    password = await random_lower_string()
+    user = await create_random_user(db, email, password)
+    await submit_answers(client, await get_user_authentication_headers(client, email, password), quiz, mistakes=2)
+
+    response = await client.delete(f"/user/{user.id}", headers=superuser_headers)
+    assert response.status_code == 200
+
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=superuser_headers)
+    assert response.json()["attempts"] == 1
+    assert response.json()["users"] == 1
+    assert response.json()["mean_percentage"] == 100
+
+
+async def test_user_stats_of_other_user_forbidden(client: AsyncClient, normal_user_token_headers: dict[str: str], new_normal_user: User) -> None:
+    response = await client.get(f"/stats/user/{new_normal_user.id}", headers=await normal_user_token_headers)
+    assert response.status_code == 403
+
+
+async def test_quiz_leaderboard(
+    db: AsyncSession,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    superuser_headers = await superuser_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+
+    await submit_answers(client, headers, quiz, mistakes=1)
+    await submit_answers(client, superuser_headers, quiz)
+    await submit_answers(client, headers, quiz, mistakes=2)
+
+    response = await client.get(f"/stats/quiz/{quiz.id}/leaderboard", headers=headers)
+    assert response.status_code == 200
+    leaderboard = response.json()
+    assert [entry["percentage"] for entry in leaderboard["entries"]] == [100, 50]
+    assert leaderboard["entries"][0]["name"]
+    assert leaderboard["me"]["rank"] == 2
+    assert leaderboard["me"]["percentage"] == 50
+
+    response = await client.get(f"/stats/quiz/{quiz.id}/leaderboard?limit=1", headers=headers)
+    assert len(response.json()["entries"]) == 1
+
+
+async def test_write_behind_submission(
+    db: AsyncSession,
+    session_factory: sessionmaker,
+    client: AsyncClient,
+    normal_user_token_headers: dict[str: str],
+    superuser_token_headers: dict[str: str]
+) -> None:
+    headers = await normal_user_token_headers
+    quiz = await create_random_quiz_graph(db, questions=1, answers=2)
+    await result_queue.start(session_factory)
+    try:
+        with record_queries(db) as queries:
+            await submit_answers(client, headers, quiz)
+        # graded from the cached quiz and queued, nothing is written by the request
+        assert not [statement for statement, _ in queries if statement.startswith("INSERT")]
+        await submit_answers(client, headers, quiz, mistakes=1)
+    finally:
+        await result_queue.stop()
+
+    response = await client.get(f"/stats/quiz/{quiz.id}", headers=headers)
+    assert response.json()["attempts"] == 2
+    response = await client.get("/stats/result-queue", headers=await superuser_token_headers)
+    assert response.status_code == 200
+    metrics = response.json()
+    assert metrics["running"] is False
+    assert metrics["written"] == 2
+    assert metrics["depth"] == 0
+    assert metrics["mean_flush_seconds"] > 0
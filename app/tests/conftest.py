@@ -1,4 +1,4 @@
-from typing import Any, AsyncGenerator, Generator
+from typing import AsyncGenerator
 
 import pytest
 
@@ -6,11 +6,13 @@ from fastapi import FastAPI
 from httpx import AsyncClient
 
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
 
 from app.main import get_application
 from app.core import config
+from app.core.metrics import instrument_engine, registry
+from app.core.security import principal_cache
 from app.database.base_class import Base
 from app.database.models.user import User
 from app.database.models.quiz import (
@@ -31,35 +33,58 @@ from app.tests.utils.quiz import (
     create_random_question,
     create_random_category,
     create_random_answer,
-    create_quiz_result,
-    get_nonexistent_quiz,
-    get_nonexistent_question,
-    get_nonexistent_category,
-    get_nonexistent_answer
+    create_quiz_result
 )
 from app.tests.utils.utils import (
     random_email,
     random_lower_string
 )
+from app.utils.attempt_store import attempt_store
+from app.utils.etag import content_versions
+from app.utils.leaderboard import leaderboards
+from app.utils.cache import quiz_snapshot_cache
+
+
+@pytest.fixture()
+async def engine() -> AsyncGenerator:
+    engine = create_async_engine(config.TEST_ASYNC_DB_DEFAULT)
+    instrument_engine(engine)
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+    quiz_snapshot_cache.clear()
+    principal_cache.clear()
+    leaderboards.clear()
+    content_versions.clear()
+    await attempt_store.clear()
+    registry.clear()
+    try:
+        yield engine
+    finally:
+        async with engine.begin() as connection:
+            await connection.run_sync(Base.metadata.drop_all)
+        await engine.dispose()
 
 
 @pytest.fixture()
-def db() -> Generator:
-    engine = create_engine(config.TEST_DB_DEFAULT)
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    Base.metadata.drop_all(bind=engine)
-    Base.metadata.create_all(bind=engine)
-    try:
-        _db = TestingSessionLocal()
+def session_factory(engine: AsyncEngine) -> sessionmaker:
+    return sessionmaker(
+        engine,
+        class_=AsyncSession,
+        autocommit=False,
+        autoflush=False,
+        expire_on_commit=False
+    )
+
+
+@pytest.fixture()
+async def db(session_factory: sessionmaker) -> AsyncGenerator:
+    async with session_factory() as _db:
         yield _db
-    finally:
-        _db.close()
-        Base.metadata.drop_all(bind=engine)
-        engine.dispose()
 
 
 @pytest.fixture()
-def override_get_db(db: Generator) -> AsyncGenerator:
+def override_get_db(db: AsyncSession) -> AsyncGenerator:
     async def _override_get_db():
         yield db
 
@@ -80,7 +105,7 @@ async def client(app: FastAPI) -> AsyncGenerator:
 
 
 @pytest.fixture()
-async def first_superuser(db: Session) -> User:
+async def first_superuser(db: AsyncSession) -> User:
     return await create_random_user(
         db,
         config.FIRST_SUPERUSER_EMAIL,
@@ -90,12 +115,12 @@ async def first_superuser(db: Session) -> User:
 
 
 @pytest.fixture()
-async def new_superuser(db: Session) -> User:
+async def new_superuser(db: AsyncSession) -> User:
     return await create_random_user(db, is_superuser=True)
 
 
 @pytest.fixture()
-async def superuser_access_token(client: TestClient, db: Session) -> str:
+async def superuser_access_token(client: TestClient, db: AsyncSession) -> str:
     email = await random_email()
     password = await random_lower_string()
     await create_random_user(db, email, password, is_superuser=True)
@@ -103,7 +128,7 @@ async def superuser_access_token(client: TestClient, db: Session) -> str:
 
 
 @pytest.fixture()
-async def superuser_token_headers(client: TestClient, db: Session) -> dict[str: str]:
+async def superuser_token_headers(client: TestClient, db: AsyncSession) -> dict[str: str]:
     email = await random_email()
     password = await random_lower_string()
     await create_random_user(db, email, password, is_superuser=True)
@@ -111,12 +136,12 @@ async def superuser_token_headers(client: TestClient, db: Session) -> dict[str:
 
 
 @pytest.fixture()
-async def new_normal_user(db: Session) -> User:
+async def new_normal_user(db: AsyncSession) -> User:
     return await create_random_user(db)
 
 
 @pytest.fixture()
-async def normal_user_token_headers(client: TestClient, db: Session) -> dict[str: str]:
+async def normal_user_token_headers(client: TestClient, db: AsyncSession) -> dict[str: str]:
     email = await random_email()
     password = await random_lower_string()
     await create_random_user(db, email, password)
@@ -124,55 +149,35 @@ async def normal_user_token_headers(client: TestClient, db: Session) -> dict[str
 
 
 @pytest.fixture()
-async def new_active_quiz(db: Session) -> Quiz:
+async def new_active_quiz(db: AsyncSession) -> Quiz:
     return await create_random_quiz(db, is_active=True)
 
 
 @pytest.fixture()
-async def new_inactive_quiz(db: Session) -> Quiz:
+async def new_inactive_quiz(db: AsyncSession) -> Quiz:
     return await create_random_quiz(db, is_active=False)
 
 
 @pytest.fixture()
-async def nonexistent_quiz() -> Quiz:
-    return await get_nonexistent_quiz()
-
-
-@pytest.fixture()
-async def new_question(db: Session, new_active_quiz: Quiz) -> Question:
+async def new_question(db: AsyncSession, new_active_quiz: Quiz) -> Question:
     return await create_random_question(db, new_active_quiz.id)
 
 
 @pytest.fixture()
-async def nonexistent_question() -> Question:
-    return await get_nonexistent_question()
-
-
-@pytest.fixture()
-async def new_category(db: Session) -> Category:
+async def new_category(db: AsyncSession) -> Category:
     return await create_random_category(db)
 
 
 @pytest.fixture()
-async def nonexistent_category() -> Category:
-    return await get_nonexistent_category()
-
-
-@pytest.fixture()
-async def new_correct_answer(db: Session, new_question: Question) -> Answer:
+async def new_correct_answer(db: AsyncSession, new_question: Question) -> Answer:
     return await create_random_answer(db, new_question.id, is_correct=True)
 
 
 @pytest.fixture()
-async def new_incorrect_answer(db: Session, new_question: Question) -> Answer:
+async def new_incorrect_answer(db: AsyncSession, new_question: Question) -> Answer:
     return await create_random_answer(db, new_question.id, is_correct=False)
 
 
 @pytest.fixture()
-async def nonexistent_answer() -> Answer:
-    return await get_nonexistent_answer()
-
-
-@pytest.fixture()
-async def new_quiz_result(db: Session, new_normal_user: User, new_active_quiz: Quiz) -> QuizResult:
+async def new_quiz_result(db: AsyncSession, new_normal_user: User, new_active_quiz: Quiz) -> QuizResult:
     return await create_quiz_result(db, new_normal_user.id, new_active_quiz.id)
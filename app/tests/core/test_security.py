@@ -0,0 +1,38 @@
+import asyncio
+import threading
+
+import pytest
+from fastapi import HTTPException
+
+from app.core.security import PasswordHasherPool, get_password_hash, verify_password
+from app.tests.utils.utils import random_lower_string
+
+
+async def test_password_hash_roundtrip() -> None:
+    password = await random_lower_string()
+    hashed_password = await get_password_hash(password)
+    assert await verify_password(password, hashed_password)
+    assert not await verify_password(await random_lower_string(), hashed_password)
+
+
+async def test_password_hasher_rejects_when_queue_is_full() -> None:
+    pool = PasswordHasherPool(max_workers=1, max_queue=1)
+    release = threading.Event()
+    try:
+        running = asyncio.create_task(pool.run(release.wait))
+        queued = asyncio.create_task(pool.run(release.wait))
+        await asyncio.sleep(0)
+        assert pool.stats()["in_flight"] == 1
+        assert pool.stats()["queue_depth"] == 1
+
+        with pytest.raises(HTTPException) as e:
+            await pool.run(release.wait)
+        assert e.value.status_code == 503
+        assert pool.stats()["rejected"] == 1
+    finally:
+        release.set()
+        await asyncio.gather(running, queued)
+        pool.shutdown()
+
+    assert pool.stats()["queue_depth"] == 0
+    assert pool.stats()["completed"] == 2
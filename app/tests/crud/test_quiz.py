@@ -1,7 +1,8 @@
 from random import randint
 
+import pytest
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.database.models.quiz import (
     Quiz,
@@ -10,6 +11,7 @@ from app.database.models.quiz import (
     Answer,
     QuizResult
 )
+from app.crud.base import MissingReference
 from app.crud.quiz import (
     crud_quiz,
     crud_question,
@@ -24,19 +26,22 @@ from app.schemes.quiz import (
     AnswerCreate,
     QuizResultCreate
 )
+from app.tests.utils.quiz import create_random_question, create_random_quiz
 from app.tests.utils.utils import random_lower_string
+from app.utils.cache import quiz_snapshot_cache
 
 
-async def test_quiz_exists(db: Session, new_active_quiz: Quiz) -> None:
-    assert await crud_quiz.exists(db, new_active_quiz)
+async def test_get_multi_ordered_by_id(db: AsyncSession) -> None:
+    quiz_ids = [(await create_random_quiz(db)).id for _ in range(4)]
+    quizzes = await crud_quiz.get_multi(db, after_id=quiz_ids[0], limit=2)
+    assert [quiz.id for quiz in quizzes] == quiz_ids[1:3]
 
+    quizzes = await crud_quiz.get_multi(db, skip=1, limit=2)
+    assert [quiz.id for quiz in quizzes] == quiz_ids[1:3]
 
-async def test_quiz_not_exists(db: Session, nonexistent_quiz: Quiz) -> None:
-    assert not await crud_quiz.exists(db, nonexistent_quiz)
 
-
-async def test_create_quiz(db: Session, new_active_quiz: Quiz) -> None:
-    assert await crud_quiz.exists(db, new_active_quiz)
+async def test_create_quiz(db: AsyncSession, new_active_quiz: Quiz) -> None:
+    assert await crud_quiz.get(db, id=new_active_quiz.id)
     assert hasattr(new_active_quiz, "title")
     assert new_active_quiz.title
     assert hasattr(new_active_quiz, "description")
@@ -44,17 +49,17 @@ async def test_create_quiz(db: Session, new_active_quiz: Quiz) -> None:
 
 
 
-async def test_create_quiz_is_active(db: Session, new_active_quiz: Quiz) -> None:
-    assert await crud_quiz.exists(db, new_active_quiz)
+async def test_create_quiz_is_active(db: AsyncSession, new_active_quiz: Quiz) -> None:
+    assert await crud_quiz.get(db, id=new_active_quiz.id)
     assert new_active_quiz.is_active
 
 
-async def test_create_quiz_is_active(db: Session, new_inactive_quiz: Quiz) -> None:
-    assert await crud_quiz.exists(db, new_inactive_quiz)
+async def test_create_quiz_is_active(db: AsyncSession, new_inactive_quiz: Quiz) -> None:
+    assert await crud_quiz.get(db, id=new_inactive_quiz.id)
     assert not new_inactive_quiz.is_active
 
 
-async def test_get_quiz(db: Session, new_active_quiz: Quiz) -> None:
+async def test_get_quiz(db: AsyncSession, new_active_quiz: Quiz) -> None:
     same_quiz = await crud_quiz.get(db, id=new_active_quiz.id)
     assert same_quiz
     assert new_active_quiz.title == same_quiz.title
@@ -62,7 +67,7 @@ async def test_get_quiz(db: Session, new_active_quiz: Quiz) -> None:
     assert jsonable_encoder(new_active_quiz) == jsonable_encoder(same_quiz)
 
 
-async def test_update_quiz_title_and_description(db: Session, new_active_quiz: Quiz) -> None:
+async def test_update_quiz_title_and_description(db: AsyncSession, new_active_quiz: Quiz) -> None:
     new_title = await random_lower_string()
     new_description = await random_lower_string()
     await crud_quiz.update(
@@ -80,35 +85,27 @@ async def test_update_quiz_title_and_description(db: Session, new_active_quiz: Q
     assert same_quiz.description == new_description
 
 
-async def test_delete_quiz(db: Session, new_active_quiz: Quiz) -> None:
+async def test_delete_quiz(db: AsyncSession, new_active_quiz: Quiz) -> None:
     await crud_quiz.delete(db, id=new_active_quiz.id)
-    assert not await crud_quiz.exists(db, new_active_quiz)
-
-
-async def test_question_exists(db: Session, new_question: Question) -> None:
-    assert await crud_question.exists(db, new_question)
+    assert not await crud_quiz.get(db, id=new_active_quiz.id)
 
 
-async def test_question_not_exists(db: Session, nonexistent_question: Question) -> None:
-    assert not await crud_question.exists(db, nonexistent_question)
-
-
-async def test_create_question(db: Session, new_question: Question) -> None:
-    assert await crud_question.exists(db, new_question)
+async def test_create_question(db: AsyncSession, new_question: Question) -> None:
+    assert await crud_question.get(db, id=new_question.id)
     assert hasattr(new_question, "question_text")
     assert new_question.question_text
     assert hasattr(new_question, "quiz_id")
     assert new_question.quiz_id
 
 
-async def test_get_question(db: Session, new_question: Question) -> None:
+async def test_get_question(db: AsyncSession, new_question: Question) -> None:
     same_question = await crud_question.get(db, id=new_question.id)
     assert same_question
     assert new_question.question_text == same_question.question_text
     assert jsonable_encoder(new_question) == jsonable_encoder(same_question)
 
 
-async def test_update_question_text(db: Session, new_question: Question) -> None:
+async def test_update_question_text(db: AsyncSession, new_question: Question) -> None:
     new_question_text = await random_lower_string()
     await crud_question.update(
         db,
@@ -124,28 +121,31 @@ async def test_update_question_text(db: Session, new_question: Question) -> None
     assert same_question.question_text == new_question_text
 
 
-async def test_delete_question(db: Session, new_question: Question) -> None:
-    await crud_question.delete(db, id=new_question.id)
-    assert not await crud_question.exists(db, new_question)
+async def test_question_of_deleted_quiz_is_missing_reference(db: AsyncSession, new_question: Question) -> None:
+    quiz = await create_random_quiz(db)
+    quiz_id = quiz.id
+    await crud_quiz.delete(db, id=quiz_id)
 
+    with pytest.raises(MissingReference):
+        await crud_question.update_unique(db, old_obj=new_question, new_obj={"quiz_id": quiz_id})
+    with pytest.raises(MissingReference):
+        await crud_question.create_unique(db, new_obj=QuestionCreate(quiz_id=quiz_id, question_text=await random_lower_string()))
 
-async def test_category_exists(db: Session, new_category: Category) -> None:
-    assert await crud_category.exists(db, new_category)
 
-
-async def test_category_not_exists(db: Session, nonexistent_category: Category) -> None:
-    assert not await crud_category.exists(db, nonexistent_category)
+async def test_delete_question(db: AsyncSession, new_question: Question) -> None:
+    await crud_question.delete(db, id=new_question.id)
+    assert not await crud_question.get(db, id=new_question.id)
 
 
-async def test_create_category(db: Session, new_category: Category) -> None:
-    assert await crud_category.exists(db, new_category)
+async def test_create_category(db: AsyncSession, new_category: Category) -> None:
+    assert await crud_category.get(db, id=new_category.id)
     assert hasattr(new_category, "name")
     assert new_category.name
     assert hasattr(new_category, "description")
     assert new_category.description
 
 
-async def test_get_category(db: Session, new_category: Category) -> None:
+async def test_get_category(db: AsyncSession, new_category: Category) -> None:
     same_category = await crud_category.get(db, id=new_category.id)
     assert same_category
     assert new_category.name == same_category.name
@@ -153,7 +153,7 @@ async def test_get_category(db: Session, new_category: Category) -> None:
     assert jsonable_encoder(new_category) == jsonable_encoder(same_category)
 
 
-async def test_update_category(db: Session, new_category: Category) -> None:
+async def test_update_category(db: AsyncSession, new_category: Category) -> None:
     new_category_name = await random_lower_string()
     new_category_description = await random_lower_string()
     await crud_category.update(
@@ -171,37 +171,47 @@ async def test_update_category(db: Session, new_category: Category) -> None:
     assert same_category.description == new_category_description
 
 
-async def test_delete_category(db: Session, new_category: Category) -> None:
+async def test_delete_category(db: AsyncSession, new_category: Category) -> None:
     await crud_category.delete(db, id=new_category.id)
-    assert not await crud_category.exists(db, new_category)
-
+    assert not await crud_category.get(db, id=new_category.id)
 
-async def test_answer_exists(db: Session, new_correct_answer: Answer) -> None:
-    assert await crud_answer.exists(db, new_correct_answer)
 
+async def test_delete_category_invalidates_sampling_quizzes(db: AsyncSession, new_category: Category) -> None:
+    category_id = new_category.id
+    sampling_quiz = await crud_quiz.create(
+        db,
+        new_obj=QuizCreate(
+            title=await random_lower_string(),
+            description=await random_lower_string(),
+            sampling_rules=[{"category_id": category_id, "question_count": 1}]
+        )
+    )
+    other_quiz = await create_random_quiz(db)
+    versions = quiz_snapshot_cache.version(sampling_quiz.id), quiz_snapshot_cache.version(other_quiz.id)
 
-async def test_answer_not_exists(db: Session, nonexistent_answer: Answer) -> None:
-    assert not await crud_answer.exists(db, nonexistent_answer)
+    await crud_category.delete(db, id=category_id)
+    assert quiz_snapshot_cache.version(sampling_quiz.id) == versions[0] + 1
+    assert quiz_snapshot_cache.version(other_quiz.id) == versions[1]
 
 
-async def test_create_correct_answer(db: Session, new_correct_answer: Answer) -> None:
-    assert await crud_answer.exists(db, new_correct_answer)
+async def test_create_correct_answer(db: AsyncSession, new_correct_answer: Answer) -> None:
+    assert await crud_answer.get(db, id=new_correct_answer.id)
     assert new_correct_answer.is_correct
 
 
-async def test_create_incorrect_answer(db: Session, new_incorrect_answer: Answer) -> None:
-    assert await crud_answer.exists(db, new_incorrect_answer)
+async def test_create_incorrect_answer(db: AsyncSession, new_incorrect_answer: Answer) -> None:
+    assert await crud_answer.get(db, id=new_incorrect_answer.id)
     assert not new_incorrect_answer.is_correct
 
 
-async def test_get_answer(db: Session, new_correct_answer: Answer) -> None:
+async def test_get_answer(db: AsyncSession, new_correct_answer: Answer) -> None:
     same_answer = await crud_answer.get(db, id=new_correct_answer.id)
     assert same_answer
     assert same_answer.id == new_correct_answer.id
     assert jsonable_encoder(same_answer) == jsonable_encoder(new_correct_answer)
 
 
-async def test_update_answer_text(db: Session, new_correct_answer: Answer) -> None:
+async def test_update_answer_text(db: AsyncSession, new_correct_answer: Answer) -> None:
     new_answer_text = await random_lower_string()
     await crud_answer.update(
         db,
@@ -218,12 +228,39 @@ async def test_update_answer_text(db: Session, new_correct_answer: Answer) -> No
     assert same_answer.answer_text == new_answer_text
 
 
-async def test_delete_answer(db: Session, new_correct_answer: Answer) -> None:
+async def test_answer_writes_invalidate_quiz_snapshots(db: AsyncSession) -> None:
+    first_quiz = await create_random_quiz(db)
+    second_quiz = await create_random_quiz(db)
+    first_question = await create_random_question(db, first_quiz.id)
+    second_question = await create_random_question(db, second_quiz.id)
+    start = (quiz_snapshot_cache.version(first_quiz.id), quiz_snapshot_cache.version(second_quiz.id))
+
+    def changes() -> tuple[int, int]:
+        return (
+            quiz_snapshot_cache.version(first_quiz.id) - start[0],
+            quiz_snapshot_cache.version(second_quiz.id) - start[1]
+        )
+
+    answer = await crud_answer.create(
+        db,
+        new_obj=AnswerCreate(question_id=first_question.id, answer_text=await random_lower_string(), is_correct=True)
+    )
+    assert changes() == (1, 0)
+
+    # moved to the other quiz, so both snapshots change
+    await crud_answer.update(db, old_obj=answer, new_obj={"question_id": second_question.id})
+    assert changes() == (2, 1)
+
+    await crud_answer.delete(db, id=answer.id)
+    assert changes() == (2, 2)
+
+
+async def test_delete_answer(db: AsyncSession, new_correct_answer: Answer) -> None:
     await crud_answer.delete(db, id=new_correct_answer.id)
-    assert not await crud_answer.exists(db, new_correct_answer)
+    assert not await crud_answer.get(db, id=new_correct_answer.id)
 
 
-async def test_create_quiz_result(db: Session, new_quiz_result: QuizResult) -> None:
+async def test_create_quiz_result(db: AsyncSession, new_quiz_result: QuizResult) -> None:
     assert new_quiz_result
     assert new_quiz_result.user_id
     assert new_quiz_result.quiz_id
@@ -231,14 +268,14 @@ async def test_create_quiz_result(db: Session, new_quiz_result: QuizResult) -> N
     assert new_quiz_result.max_score
 
 
-async def test_get_quiz_result(db: Session, new_quiz_result: QuizResult) -> None:
+async def test_get_quiz_result(db: AsyncSession, new_quiz_result: QuizResult) -> None:
     same_quiz_result = await crud_quiz_result.get(db, id=new_quiz_result.id)
     assert same_quiz_result
     assert same_quiz_result.id == new_quiz_result.id
     assert jsonable_encoder(same_quiz_result) == jsonable_encoder(new_quiz_result)
 
 
-async def test_update_answer_text(db: Session, new_quiz_result: QuizResult) -> None:
+async def test_update_answer_text(db: AsyncSession, new_quiz_result: QuizResult) -> None:
     new_user_score = randint(0, 100)
     new_max_score = new_user_score + randint(0, 100)
     await crud_quiz_result.update(
@@ -258,6 +295,6 @@ async def test_update_answer_text(db: Session, new_quiz_result: QuizResult) -> N
     assert same_quiz_result.max_score == new_max_score
 
 
-async def test_delete_answer(db: Session, new_quiz_result: QuizResult) -> None:
+async def test_delete_answer(db: AsyncSession, new_quiz_result: QuizResult) -> None:
     await crud_quiz_result.delete(db, id=new_quiz_result.id)
     assert not await crud_quiz_result.get(db, id=new_quiz_result.id)
@@ -1,5 +1,5 @@
 from fastapi.encoders import jsonable_encoder
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from app.crud.user import crud_user
 from app.core.security import verify_password
@@ -25,7 +25,7 @@ async def test_create_superuser(new_superuser: User) -> None:
     assert new_superuser.is_superuser
 
 
-async def test_authenticate_user(db: Session) -> None:
+async def test_authenticate_user(db: AsyncSession) -> None:
     email = await random_email()
     password = await random_lower_string()
     user = await create_random_user(db, email, password)
@@ -34,7 +34,7 @@ async def test_authenticate_user(db: Session) -> None:
     assert user.email == authenticated_user.email
 
 
-async def test_not_authenticate_user(db: Session) -> None:
+async def test_not_authenticate_user(db: AsyncSession) -> None:
     email = "unique." + await random_email()
     password = await random_lower_string()
     user = await crud_user.authenticate(db, email, password)
@@ -49,14 +49,14 @@ async def test_check_if_normal_user_is_superuser(new_normal_user: User) -> None:
     assert not await crud_user.is_superuser(new_normal_user)
 
 
-async def test_get_user(db: Session, new_normal_user: User) -> None:
+async def test_get_user(db: AsyncSession, new_normal_user: User) -> None:
     same_user = await crud_user.get(db, id=new_normal_user.id)
     assert same_user
     assert new_normal_user.email == same_user.email
     assert jsonable_encoder(new_normal_user) == jsonable_encoder(same_user)
 
 
-async def test_update_user_name_and_email(db: Session, new_normal_user: User) -> None:
+async def test_update_user_name_and_email(db: AsyncSession, new_normal_user: User) -> None:
     new_name = await random_lower_string()
     new_email = await random_email()
     user_in_update = UserUpdate(name=new_name, email=new_email)
@@ -68,7 +68,7 @@ async def test_update_user_name_and_email(db: Session, new_normal_user: User) ->
     assert same_user.email == new_email
 
 
-async def test_update_user_password(db: Session, new_normal_user: User) -> None:
+async def test_update_user_password(db: AsyncSession, new_normal_user: User) -> None:
     new_password = await random_lower_string()
     await crud_user.update_password(db, new_normal_user, new_password)
     user_2 = await crud_user.get(db, id=new_normal_user.id)
@@ -77,6 +77,13 @@ async def test_update_user_password(db: Session, new_normal_user: User) -> None:
     assert await verify_password(new_password, user_2.password)
 
 
-async def test_delete_user(db: Session, new_normal_user: User) -> None:
+async def test_demotion_bumps_token_version(db: AsyncSession, new_normal_user: User) -> None:
+    user = await crud_user.set_superuser(db, new_normal_user, True)
+    assert user.token_version == 0
+    user = await crud_user.set_superuser(db, user, False)
+    assert user.token_version == 1
+
+
+async def test_delete_user(db: AsyncSession, new_normal_user: User) -> None:
     deleted_user = await crud_user.delete(db, id=new_normal_user.id)
     assert not await crud_user.get(db, id=deleted_user.id)
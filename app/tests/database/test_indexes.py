@@ -0,0 +1,35 @@
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.crud.quiz import crud_question, crud_quiz
+from app.database.models.quiz import Answer, Question, QuizResult
+from app.tests.utils.utils import explain, record_queries
+
+
+async def test_quiz_graph_uses_foreign_key_indexes(db: AsyncSession, new_correct_answer: Answer) -> None:
+    quiz_id = (await crud_question.get(db, id=new_correct_answer.question_id)).quiz_id
+    with record_queries(db) as queries:
+        await crud_quiz.get_graph_rows(db, ids=[quiz_id])
+        await crud_quiz.get_category_links(db, quiz_ids=[quiz_id])
+    _, graph_plan, links_plan = [await explain(db, *query) for query in queries]
+    assert "uq_questions_quiz_id_question_text" in graph_plan
+    assert "uq_answers_question_id_answer_text" in graph_plan
+    assert "uq_questions_quiz_id_question_text" in links_plan
+    assert "questions_categories_pkey" in links_plan
+
+
+async def test_question_search_uses_indexes(db: AsyncSession, new_question: Question) -> None:
+    query = crud_question.search_query(text="office", category_id=1)
+    statement = str(query.compile(db.bind, compile_kwargs={"literal_binds": True}))
+    plan = await explain(db, statement)
+    assert "ix_questions_question_text_search" in plan
+    assert "ix_questions_categories_category_id_question_id" in plan
+
+
+async def test_latest_results_use_index(db: AsyncSession) -> None:
+    query = (
+        select(QuizResult.quiz_id, QuizResult.user_id, func.max(QuizResult.finished_at))
+        .group_by(QuizResult.quiz_id, QuizResult.user_id)
+    )
+    statement = str(query.compile(db.bind))
+    assert "ix_quiz_results_quiz_id_user_id_finished_at" in await explain(db, statement)
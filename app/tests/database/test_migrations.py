@@ -0,0 +1,44 @@
+from pathlib import Path
+
+from alembic import command
+from alembic.autogenerate import compare_metadata
+from alembic.config import Config
+from alembic.runtime.migration import MigrationContext
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.database.base_class import Base
+
+
+ALEMBIC_INI = Path(__file__).parents[3] / "alembic.ini"
+
+
+def run_migrations(connection: Connection, revision: str, downgrade: bool = False) -> None:
+    alembic_config = Config(str(ALEMBIC_INI))
+    alembic_config.attributes["connection"] = connection
+    if downgrade:
+        command.downgrade(alembic_config, revision)
+    else:
+        command.upgrade(alembic_config, revision)
+
+
+def schema_diff(connection: Connection) -> list:
+    return compare_metadata(MigrationContext.configure(connection), Base.metadata)
+
+
+async def test_migrations_match_models(engine: AsyncEngine) -> None:
+    async with engine.connect() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.commit()
+        try:
+            await connection.run_sync(run_migrations, "head")
+            assert await connection.run_sync(schema_diff) == []
+            await connection.commit()
+
+            await connection.run_sync(run_migrations, "base", downgrade=True)
+            table_names = await connection.run_sync(lambda conn: inspect(conn).get_table_names())
+            assert table_names == ["alembic_version"]
+        finally:
+            await connection.execute(text("DROP TABLE IF EXISTS alembic_version"))
+            await connection.commit()
@@ -0,0 +1,58 @@
+import asyncio
+
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core import config
+from app.core.metrics import (
+    InstrumentedQueuePool,
+    db_pool_checked_out,
+    db_pool_checkout_seconds,
+    db_pool_overflow,
+    db_pool_timeouts,
+    instrument_pool,
+    registry
+)
+
+
+async def test_pool_checkout_wait_and_gauges() -> None:
+    engine = create_async_engine(
+        config.TEST_ASYNC_DB_DEFAULT,
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+        pool_timeout=0.2,
+        pool_logging_name="test"
+    )
+    instrument_pool(engine)
+    collect = registry.collectors[-1]
+    registry.clear()
+    try:
+        async with engine.connect() as first, engine.connect() as second:
+            await first.execute(text("SELECT 1"))
+            collect()
+            assert db_pool_checked_out.get("test") == 2
+            assert db_pool_overflow.get("test") == 1
+
+            # both connections are taken, so the third checkout waits and gives up
+            with pytest.raises(PoolTimeoutError):
+                async with engine.connect():
+                    pass
+            assert db_pool_timeouts.get("test") == 1
+
+        async def hold() -> None:
+            async with engine.connect() as connection:
+                await connection.execute(text("SELECT pg_sleep(0.1)"))
+
+        before = db_pool_checkout_seconds.get("test")
+        checkouts, waited = before.count, before.sum
+        # the third one waits for one of the others to finish
+        await asyncio.gather(hold(), hold(), hold())
+        after = db_pool_checkout_seconds.get("test")
+        assert after.count == checkouts + 3
+        assert after.sum - waited >= 0.09
+    finally:
+        registry.collectors.remove(collect)
+        await engine.dispose()
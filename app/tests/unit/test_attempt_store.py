@@ -0,0 +1,66 @@
+import fnmatch
+
+from app.utils.attempt_store import AttemptRecord, MemoryAttemptStore, RedisAttemptStore
+from app.utils.scoring import AnswerKey
+
+
+async def test_attempt_record_round_trip() -> None:
+    record = AttemptRecord(
+        user_id=7,
+        quiz_id=3,
+        answer_key=AnswerKey.from_answers([(15, True), (2, False), (2 ** 40, True)])
+    )
+    assert AttemptRecord.loads(record.dumps()) == record
+
+
+async def test_memory_attempt_store_expires_keys() -> None:
+    store = MemoryAttemptStore(maxsize=10, ttl=-1)
+    await store.set("1:key", b"data")
+    assert await store.get("1:key") is None
+
+    store = MemoryAttemptStore(maxsize=10, ttl=60)
+    await store.set("1:key", b"data")
+    await store.set("1:progress", b"progress")
+    assert await store.get("1:key") == b"data"
+    await store.delete("1:key", "1:progress")
+    assert await store.get("1:key") is None
+    assert await store.get("1:progress") is None
+
+
+# the part of redis.asyncio.Redis the store uses
+class FakeRedis:
+
+    def __init__(self):
+        self.data: dict[str, bytes] = {}
+        self.expiry: dict[str, int] = {}
+
+    async def get(self, key: str) -> bytes | None:
+        return self.data.get(key)
+
+    async def set(self, key: str, value: bytes, ex: int | None = None) -> None:
+        self.data[key] = value
+        self.expiry[key] = ex
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.data.pop(key, None)
+
+    async def scan_iter(self, match: str):
+        for key in [key for key in self.data if fnmatch.fnmatchcase(key, match)]:
+            yield key
+
+
+async def test_redis_attempt_store() -> None:
+    client = FakeRedis()
+    client.data["other:1"] = b"kept"
+    store = RedisAttemptStore(client, ttl=59.5)
+
+    await store.set("1:key", b"data")
+    await store.set("1:progress", b"progress")
+    assert client.expiry["attempt:1:key"] == 60
+    assert await store.get("1:key") == b"data"
+
+    await store.delete("1:key")
+    assert await store.get("1:key") is None
+    await store.clear()
+    assert client.data == {"other:1": b"kept"}
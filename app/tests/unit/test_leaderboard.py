@@ -0,0 +1,76 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.tests.utils.quiz import create_quiz_result, create_random_quiz
+from app.tests.utils.user import create_random_user
+from app.utils.leaderboard import Leaderboard, LeaderboardEntry, LeaderboardIndex
+
+
+async def test_top_orders_by_percentage_and_shares_ranks() -> None:
+    board = Leaderboard({1: 50.0, 2: 100.0, 3: 75.0, 4: 100.0})
+    assert board.top(3) == [
+        LeaderboardEntry(rank=1, user_id=2, percentage=100.0),
+        LeaderboardEntry(rank=1, user_id=4, percentage=100.0),
+        LeaderboardEntry(rank=3, user_id=3, percentage=75.0),
+    ]
+    assert board.rank(3) == LeaderboardEntry(rank=3, user_id=3, percentage=75.0)
+    assert board.rank(4).rank == 1
+    assert board.rank(5) is None
+
+
+async def test_set_moves_and_removes_users() -> None:
+    board = Leaderboard({1: 50.0, 2: 60.0})
+    board.set(1, 90.0)
+    assert board.rank(1).rank == 1
+    assert board.rank(2).rank == 2
+
+    board.set(1, None)
+    assert len(board) == 1
+    assert board.rank(1) is None
+    assert board.top(10) == [LeaderboardEntry(rank=1, user_id=2, percentage=60.0)]
+
+
+async def test_index_drops_empty_boards() -> None:
+    index = LeaderboardIndex()
+    index.set(1, 1, 50.0)
+    index.set(1, 2, 40.0)
+    index.drop_user(1)
+    assert index.get(1).top(10) == [LeaderboardEntry(rank=1, user_id=2, percentage=40.0)]
+    index.set(1, 2, None)
+    assert len(index.get(1)) == 0
+
+
+async def test_warm_from_database(db: AsyncSession, session_factory: sessionmaker) -> None:
+    quiz = await create_random_quiz(db)
+    first_user = await create_random_user(db)
+    second_user = await create_random_user(db)
+    await create_quiz_result(db, user_id=first_user.id, quiz_id=quiz.id, user_score=5, max_score=10)
+    await create_quiz_result(db, user_id=first_user.id, quiz_id=quiz.id, user_score=8, max_score=10)
+    await create_quiz_result(db, user_id=second_user.id, quiz_id=quiz.id, user_score=9, max_score=10)
+
+    index = LeaderboardIndex()
+    await index.warm(session_factory)
+    assert index.get(quiz.id).top(10) == [
+        LeaderboardEntry(rank=1, user_id=second_user.id, percentage=90.0),
+        LeaderboardEntry(rank=2, user_id=first_user.id, percentage=80.0),
+    ]
+
+
+async def test_load_reloads_stale_boards(db: AsyncSession) -> None:
+    quiz = await create_random_quiz(db)
+    first_user = await create_random_user(db)
+    second_user = await create_random_user(db)
+    await create_quiz_result(db, user_id=first_user.id, quiz_id=quiz.id, user_score=5, max_score=10)
+
+    index = LeaderboardIndex(ttl=60)
+    assert len(await index.load(db, quiz.id)) == 1
+
+    # written through another worker, so only the database sees it
+    await create_quiz_result(db, user_id=second_user.id, quiz_id=quiz.id, user_score=9, max_score=10)
+    assert len(await index.load(db, quiz.id)) == 1
+
+    index.ttl = 0
+    assert (await index.load(db, quiz.id)).top(10) == [
+        LeaderboardEntry(rank=1, user_id=second_user.id, percentage=90.0),
+        LeaderboardEntry(rank=2, user_id=first_user.id, percentage=50.0),
+    ]
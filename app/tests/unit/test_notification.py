@@ -0,0 +1,184 @@
+from datetime import datetime, time, timedelta
+from pathlib import Path
+
+import httpx
+import pytest
+from sqlalchemy import update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+
+from app.database.models.stats import QuizUserStats
+from app.tests.utils.quiz import create_quiz_result, create_random_quiz
+from app.tests.utils.user import create_random_user
+from app.utils.notification import (
+    MailSender,
+    NotificationCheckpoint,
+    NotificationRun,
+    send_expired_quiz_notifications
+)
+
+
+MAIL_URL = "http://mail.test/v3/mail/send"
+
+
+class FakeMailServer:
+    def __init__(self, fail_first: int = 0, crash_on: str | None = None, reject: str | None = None):
+        self.fail_first = fail_first
+        self.crash_on = crash_on
+        self.reject = reject
+        self.requests = 0
+        self.delivered: list[str] = []
+        self.app = Starlette(routes=[Route("/v3/mail/send", self.send, methods=["POST"])])
+
+    async def send(self, request: Request) -> Response:
+        self.requests += 1
+        to_email = (await request.json())["personalizations"][0]["to"][0]["email"]
+        if to_email == self.crash_on:
+            raise RuntimeError("mail server went away")
+        if to_email == self.reject:
+            return Response(status_code=400)
+        if self.requests <= self.fail_first:
+            return Response(status_code=503)
+        self.delivered.append(to_email)
+        return Response(status_code=202)
+
+    def client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(app=self.app)
+
+
+async def create_expired_results(db: AsyncSession, count: int) -> list[str]:
+    quiz = await create_random_quiz(db)
+    emails = []
+    for _ in range(count):
+        user = await create_random_user(db)
+        emails.append(user.email)
+        await create_quiz_result(db, user_id=user.id, quiz_id=quiz.id)
+    await db.execute(
+        update(QuizUserStats)
+        .filter(QuizUserStats.quiz_id == quiz.id)
+        .values(last_finished_at=datetime.utcnow() - timedelta(days=30))
+    )
+    await db.commit()
+    return emails
+
+
+async def test_sends_expired_quiz_notifications(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    emails = await create_expired_results(db, 3)
+    recent_user = await create_random_user(db)
+    await create_quiz_result(db, user_id=recent_user.id, quiz_id=(await create_random_quiz(db)).id)
+
+    server = FakeMailServer(fail_first=2)
+    checkpoint = NotificationCheckpoint(tmp_path / "checkpoint")
+    async with server.client() as client:
+        stats = await send_expired_quiz_notifications(
+            session_factory,
+            MailSender(client, url=MAIL_URL, backoff=0),
+            checkpoint,
+            batch_size=2
+        )
+
+    assert sorted(server.delivered) == sorted(emails)
+    assert stats.sent == 3
+    assert stats.failed == 0
+    assert not checkpoint.path.exists()
+
+
+async def test_gives_up_after_max_retries(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    emails = await create_expired_results(db, 2)
+
+    server = FakeMailServer(fail_first=3)
+    async with server.client() as client:
+        stats = await send_expired_quiz_notifications(
+            session_factory,
+            MailSender(client, url=MAIL_URL, max_retries=2, backoff=0),
+            NotificationCheckpoint(tmp_path / "checkpoint"),
+            concurrency=1
+        )
+
+    assert server.delivered == emails[1:]
+    assert stats.sent == 1
+    assert stats.failed == 1
+
+
+async def test_resumes_from_checkpoint(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    emails = await create_expired_results(db, 5)
+    checkpoint = NotificationCheckpoint(tmp_path / "checkpoint")
+    started_at = datetime.combine(datetime.utcnow().date(), time(23, 50))
+
+    crashing_server = FakeMailServer(crash_on=emails[2])
+    with pytest.raises(RuntimeError):
+        async with crashing_server.client() as client:
+            await send_expired_quiz_notifications(
+                session_factory,
+                MailSender(client, url=MAIL_URL, backoff=0),
+                checkpoint,
+                batch_size=2,
+                now=started_at
+            )
+    assert checkpoint.path.exists()
+
+    # resumed after midnight
+    server = FakeMailServer()
+    async with server.client() as client:
+        await send_expired_quiz_notifications(
+            session_factory,
+            MailSender(client, url=MAIL_URL, backoff=0),
+            checkpoint,
+            batch_size=2,
+            now=started_at + timedelta(minutes=20)
+        )
+
+    assert crashing_server.delivered[:2] == emails[:2]
+    assert server.delivered == emails[2:]
+    assert not checkpoint.path.exists()
+
+
+async def test_resumed_run_retries_failed_recipients(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    emails = await create_expired_results(db, 4)
+    checkpoint = NotificationCheckpoint(tmp_path / "checkpoint")
+
+    crashing_server = FakeMailServer(crash_on=emails[2], reject=emails[0])
+    with pytest.raises(RuntimeError):
+        async with crashing_server.client() as client:
+            await send_expired_quiz_notifications(
+                session_factory,
+                MailSender(client, url=MAIL_URL, backoff=0),
+                checkpoint,
+                batch_size=2
+            )
+    assert crashing_server.delivered[:1] == emails[1:2]
+
+    server = FakeMailServer()
+    async with server.client() as client:
+        stats = await send_expired_quiz_notifications(
+            session_factory,
+            MailSender(client, url=MAIL_URL, backoff=0),
+            checkpoint,
+            batch_size=2
+        )
+
+    assert server.delivered == [emails[0]] + emails[2:]
+    assert stats.sent == 3
+    assert not checkpoint.path.exists()
+
+
+async def test_stale_checkpoint_is_ignored(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    emails = await create_expired_results(db, 2)
+    checkpoint = NotificationCheckpoint(tmp_path / "checkpoint")
+    now = datetime.utcnow()
+    checkpoint.save(NotificationRun(started_at=now - timedelta(days=2), after=(2 ** 31 - 1, 0)))
+
+    server = FakeMailServer()
+    async with server.client() as client:
+        await send_expired_quiz_notifications(
+            session_factory,
+            MailSender(client, url=MAIL_URL, backoff=0),
+            checkpoint,
+            now=now
+        )
+
+    assert sorted(server.delivered) == sorted(emails)
@@ -0,0 +1,141 @@
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from uuid import uuid4
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.quiz import crud_quiz, crud_quiz_result
+from app.crud.stats import crud_stats
+from app.database.models.quiz import QuizResult
+from app.schemes.quiz import QuizResultCreate
+from app.tests.utils.quiz import create_random_quiz
+from app.tests.utils.user import create_random_user
+from app.utils.result_queue import ResultQueue, ResultSpool
+
+
+async def count_results(db: AsyncSession, quiz_id: int) -> int:
+    result = await db.execute(select(func.count()).select_from(QuizResult).filter(QuizResult.quiz_id == quiz_id))
+    return result.scalar_one()
+
+
+async def test_queue_writes_results_in_batches(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    user = await create_random_user(db)
+    quiz = await create_random_quiz(db)
+    queue = ResultQueue(maxsize=4, batch_size=3, spool_path=str(tmp_path / "results.spool"))
+    await queue.start(session_factory)
+    for score in range(7):
+        await queue.put(QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=score, max_score=10))
+    await queue.stop()
+
+    assert await count_results(db, quiz.id) == 7
+    stats = await crud_stats.get_quiz_stats(db, quiz_id=quiz.id)
+    assert stats.attempts == 7
+    assert queue.metrics.written == 7
+    assert queue.metrics.depth == 0
+    assert 3 <= queue.metrics.flushes <= 7
+    # a full queue plus the batch being written
+    assert queue.metrics.max_depth <= 4 + 3
+    assert (tmp_path / "results.spool").read_bytes() == b""
+
+
+async def test_spool_replays_unwritten_results(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    user = await create_random_user(db)
+    quiz = await create_random_quiz(db)
+    finished_at = datetime.now(timezone.utc) - timedelta(hours=1)
+    spool = ResultSpool(tmp_path / "results.spool")
+    spool.open([])
+    for seq in range(1, 4):
+        spool.append(seq, QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=seq, finished_at=finished_at))
+    spool.mark_flushed(1, drained=False)
+    spool.close()
+    # the process died in the middle of a line
+    with spool.path.open("ab") as file:
+        file.write(b'{"seq": 4, "user_')
+
+    queue = ResultQueue(spool_path=str(spool.path))
+    await queue.start(session_factory)
+    await queue.put(QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=5))
+    await queue.stop()
+
+    result = await db.execute(select(QuizResult.user_score, QuizResult.finished_at).filter(QuizResult.quiz_id == quiz.id).order_by(QuizResult.id))
+    rows = result.all()
+    assert [row.user_score for row in rows] == [2, 3, 5]
+    assert rows[0].finished_at == finished_at
+    assert spool.path.read_bytes() == b""
+
+
+async def test_spool_replay_after_commit_writes_results_once(db: AsyncSession, session_factory: sessionmaker, tmp_path: Path) -> None:
+    user = await create_random_user(db)
+    quiz = await create_random_quiz(db)
+    result = QuizResultCreate(
+        user_id=user.id,
+        quiz_id=quiz.id,
+        user_score=1,
+        max_score=2,
+        finished_at=datetime.now(timezone.utc),
+        submission_id=uuid4()
+    )
+    # the batch committed, then the process died before its flushed marker
+    async with session_factory() as db_session:
+        await crud_quiz_result.create_multi(db_session, new_objs=[result])
+    spool = ResultSpool(tmp_path / "results.spool")
+    spool.open([(1, result)])
+    spool.close()
+
+    queue = ResultQueue(spool_path=str(spool.path))
+    await queue.start(session_factory)
+    await queue.stop()
+
+    assert await count_results(db, quiz.id) == 1
+    stats = await crud_stats.get_quiz_stats(db, quiz_id=quiz.id)
+    assert stats.attempts == 1
+    assert spool.path.read_bytes() == b""
+
+
+async def test_queue_drops_results_of_deleted_quizzes(db: AsyncSession, session_factory: sessionmaker) -> None:
+    user = await create_random_user(db)
+    quiz = await create_random_quiz(db)
+    deleted_quiz = await create_random_quiz(db)
+    deleted_quiz_id = deleted_quiz.id
+    # deleted after its result was graded, before the result is written
+    await crud_quiz.delete(db, id=deleted_quiz_id)
+
+    queue = ResultQueue(batch_size=10, retry_seconds=0)
+    await queue.start(session_factory)
+    await queue.put(QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=1, max_score=2))
+    await queue.put(QuizResultCreate(user_id=user.id, quiz_id=deleted_quiz_id, user_score=1, max_score=2))
+    await queue.put(QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=2, max_score=2))
+    await queue.stop(timeout=5)
+
+    assert await count_results(db, quiz.id) == 2
+    assert queue.metrics.written == 2
+    assert queue.metrics.dropped == 1
+    assert queue.metrics.depth == 0
+    # the queue keeps going after the bad result
+    await queue.start(session_factory)
+    await queue.put(QuizResultCreate(user_id=user.id, quiz_id=quiz.id, user_score=0, max_score=2))
+    await queue.stop(timeout=5)
+    assert await count_results(db, quiz.id) == 3
+
+
+async def test_spool_drops_torn_line_on_open(tmp_path: Path) -> None:
+    spool = ResultSpool(tmp_path / "results.spool")
+    spool.open([])
+    for seq in range(1, 3):
+        spool.append(seq, QuizResultCreate(user_id=1, quiz_id=1, user_score=seq))
+    spool.close()
+    with spool.path.open("ab") as file:
+        file.write(b'{"seq": 3, "user_')
+
+    # restarted, then died again before anything was written
+    pending, last_seq = spool.pending()
+    spool.open(pending)
+    spool.append(last_seq + 1, QuizResultCreate(user_id=1, quiz_id=1, user_score=4))
+    spool.mark_flushed(1, drained=False)
+    spool.close()
+
+    pending, last_seq = ResultSpool(spool.path).pending()
+    assert [(seq, result.user_score) for seq, result in pending] == [(2, 2), (3, 4)]
+    assert last_seq == 3
@@ -0,0 +1,34 @@
+import random
+
+from app.utils.sampling import QuestionSampler
+
+
+sampler = QuestionSampler.build(
+    rules=[(10, 3), (20, 2), (None, 4)],
+    question_ids=range(1, 101),
+    category_links=[(question_id, 10) for question_id in range(1, 6)] + [(question_id, 20) for question_id in range(4, 9)]
+)
+
+
+async def test_sample_draws_per_category() -> None:
+    drawn = sampler.sample(random.Random(1))
+    assert len(drawn) == 9
+    assert len(set(drawn)) == 9
+    assert set(drawn[:3]) <= set(range(1, 6))
+    assert set(drawn[3:5]) <= set(range(4, 9))
+
+
+async def test_sample_never_repeats_overlapping_categories() -> None:
+    overlapping = QuestionSampler.build(
+        rules=[(10, 3), (20, 3)],
+        question_ids=range(1, 5),
+        category_links=[(question_id, category_id) for question_id in range(1, 5) for category_id in (10, 20)]
+    )
+    for seed in range(20):
+        drawn = overlapping.sample(random.Random(seed))
+        assert sorted(drawn) == [1, 2, 3, 4]
+
+
+async def test_sample_short_or_unknown_pool() -> None:
+    short = QuestionSampler.build(rules=[(10, 5), (30, 5)], question_ids=[1, 2, 3], category_links=[(1, 10), (2, 10)])
+    assert sorted(short.sample()) == [1, 2]
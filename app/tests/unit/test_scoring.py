@@ -0,0 +1,51 @@
+import pytest
+
+from app.schemes.quiz import UserAnswerRequset
+from app.utils.scoring import AnswerKey, InvalidSubmission
+
+
+answer_key = AnswerKey.from_answers([(1, True), (2, False), (3, True)])
+
+
+async def test_grade_all_correct() -> None:
+    user_answers = [
+        UserAnswerRequset(answer_id=3, is_correct=True),
+        UserAnswerRequset(answer_id=1, is_correct=True),
+        UserAnswerRequset(answer_id=2, is_correct=False),
+    ]
+    assert answer_key.max_score == 3
+    assert answer_key.grade(user_answers) == 3
+
+
+async def test_grade_counts_mistakes() -> None:
+    user_answers = [
+        UserAnswerRequset(answer_id=1, is_correct=False),
+        UserAnswerRequset(answer_id=2, is_correct=True),
+        UserAnswerRequset(answer_id=3, is_correct=True),
+    ]
+    assert answer_key.grade(user_answers) == 1
+
+
+async def test_grade_rejects_wrong_number_of_answers() -> None:
+    with pytest.raises(InvalidSubmission, match="Incorrect number of answers provided"):
+        answer_key.grade([UserAnswerRequset(answer_id=1, is_correct=True)])
+
+
+async def test_grade_rejects_unknown_answer_id() -> None:
+    user_answers = [
+        UserAnswerRequset(answer_id=1, is_correct=True),
+        UserAnswerRequset(answer_id=2, is_correct=False),
+        UserAnswerRequset(answer_id=4, is_correct=True),
+    ]
+    with pytest.raises(InvalidSubmission, match="Incorrect answer id provided"):
+        answer_key.grade(user_answers)
+
+
+async def test_grade_rejects_duplicate_answer_id() -> None:
+    user_answers = [
+        UserAnswerRequset(answer_id=1, is_correct=True),
+        UserAnswerRequset(answer_id=1, is_correct=True),
+        UserAnswerRequset(answer_id=3, is_correct=True),
+    ]
+    with pytest.raises(InvalidSubmission, match="Duplicate answer id provided"):
+        answer_key.grade(user_answers)
@@ -1,4 +1,6 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
 from app.crud.quiz import (
     crud_quiz,
@@ -23,7 +25,7 @@ from app.schemes.quiz import (
 from app.tests.utils.utils import random_lower_string
 
 
-async def create_random_quiz(db: Session, title: str = None, description: str = None, is_active: bool = True) -> Quiz:
+async def create_random_quiz(db: AsyncSession, title: str = None, description: str = None, is_active: bool = True) -> Quiz:
     return await crud_quiz.create(
         db=db,
         new_obj=QuizCreate(
@@ -34,15 +36,7 @@ async def create_random_quiz(db: Session, title: str = None, description: str =
     )
 
 
-async def get_nonexistent_quiz() -> Quiz:
-    return Quiz(
-        title=await random_lower_string(),
-        description=await random_lower_string(),
-        is_active=False
-    )
-
-
-async def create_random_question(db: Session, quiz_id: int) -> Question:
+async def create_random_question(db: AsyncSession, quiz_id: int) -> Question:
     return await crud_question.create(
         db=db,
         new_obj=QuestionCreate(
@@ -52,14 +46,7 @@ async def create_random_question(db: Session, quiz_id: int) -> Question:
     )
 
 
-async def get_nonexistent_question(nonexistent_quiz_id: int = -1) -> Question:
-    return Question(
-        question_text=await random_lower_string(),
-        quiz_id=nonexistent_quiz_id
-    )
-
-
-async def create_random_category(db: Session) -> Category:
+async def create_random_category(db: AsyncSession) -> Category:
     return await crud_category.create(
         db=db,
         new_obj=CategoryCreate(
@@ -69,14 +56,7 @@ async def create_random_category(db: Session) -> Category:
     )
 
 
-async def get_nonexistent_category() -> Category:
-    return Category(
-        name=await random_lower_string(),
-        description=await random_lower_string()
-    )
-
-
-async def create_random_answer(db: Session, question_id: int, is_correct: bool = False) -> Answer:
+async def create_random_answer(db: AsyncSession, question_id: int, is_correct: bool = False) -> Answer:
     return await crud_answer.create(
         db=db,
         new_obj=AnswerCreate(
@@ -87,14 +67,7 @@ async def create_random_answer(db: Session, question_id: int, is_correct: bool =
     )
 
 
-async def get_nonexistent_answer(nonexistent_question_id: int = -1) -> Answer:
-    return Answer(
-        question_id=nonexistent_question_id,
-        answer_text=await random_lower_string()
-    )
-
-
-async def create_quiz_result(db: Session, user_id: int, quiz_id: int, user_score: int = 10, max_score: int = 10) -> Quiz:
+async def create_quiz_result(db: AsyncSession, user_id: int, quiz_id: int, user_score: int = 10, max_score: int = 10) -> Quiz:
     return await crud_quiz_result.create(
         db=db,
         new_obj=QuizResultCreate(
@@ -104,3 +77,18 @@ async def create_quiz_result(db: Session, user_id: int, quiz_id: int, user_score
             max_score=max_score
         )
     )
+
+
+async def create_random_quiz_graph(db: AsyncSession, questions: int = 3, answers: int = 3) -> Quiz:
+    quiz = await create_random_quiz(db, is_active=True)
+    for _ in range(questions):
+        question = await create_random_question(db, quiz.id)
+        for answer_number in range(answers):
+            await create_random_answer(db, question.id, is_correct=answer_number == 0)
+    result = await db.execute(
+        select(Quiz)
+        .options(selectinload(Quiz.questions).selectinload(Question.answers))
+        .execution_options(populate_existing=True)
+        .filter(Quiz.id == quiz.id)
+    )
+    return result.scalars().one()
@@ -1,4 +1,4 @@
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from httpx import AsyncClient
 
 from app.crud.user import crud_user
@@ -7,7 +7,7 @@ from app.schemes.user import UserCreate
 from app.tests.utils.utils import random_email, random_lower_string
 
 
-async def create_random_user(db: Session, email: str = None, password: str = None, is_superuser: bool = False) -> User:
+async def create_random_user(db: AsyncSession, email: str = None, password: str = None, is_superuser: bool = False) -> User:
     return await crud_user.create(
         db=db,
         obj_in=UserCreate(
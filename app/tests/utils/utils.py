@@ -1,5 +1,10 @@
 import random
 import string
+from contextlib import contextmanager
+from typing import Any, Generator
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 async def random_lower_string() -> str:
@@ -8,3 +13,26 @@ async def random_lower_string() -> str:
 
 async def random_email() -> str:
     return f"{await random_lower_string()}@{await random_lower_string()}.com"
+
+
+@contextmanager
+def record_queries(db: AsyncSession) -> Generator[list[tuple[str, Any]], None, None]:
+    queries: list[tuple[str, Any]] = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        queries.append((statement, parameters))
+
+    engine = db.bind.sync_engine
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield queries
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def explain(db: AsyncSession, statement: str, parameters: Any = ()) -> str:
+    # planner costs on tiny test tables favour sequential scans, so rule them out
+    connection = await db.connection()
+    await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+    result = await connection.exec_driver_sql(f"EXPLAIN {statement}", parameters)
+    return "\n".join(row[0] for row in result)
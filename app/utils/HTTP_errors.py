@@ -25,3 +25,16 @@ def HTTP_404_NOT_FOUND(detail: str = "Not found"):
         status_code=status.HTTP_404_NOT_FOUND,
         detail=detail
     )
+
+def HTTP_409_CONFLICT(detail: str = "Conflict"):
+    return HTTPException(
+        status_code=status.HTTP_409_CONFLICT,
+        detail=detail
+    )
+
+def HTTP_503_SERVICE_UNAVAILABLE(detail: str = "Service unavailable", retry_after: int = 1):
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail=detail,
+        headers={"Retry-After": str(retry_after)}
+    )
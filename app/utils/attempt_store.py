@@ -0,0 +1,123 @@
+import math
+import struct
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+
+from app.core import config
+from app.utils.cache import TTLCache
+from app.utils.scoring import AnswerKey
+
+
+# user id, quiz id
+ATTEMPT_HEADER = struct.Struct("<qq")
+
+
+@dataclass(frozen=True)
+class AttemptRecord:
+    user_id: int
+    quiz_id: int
+    # frozen when the attempt starts, so later edits of the quiz don't change grading
+    answer_key: AnswerKey
+
+    def dumps(self) -> bytes:
+        return ATTEMPT_HEADER.pack(self.user_id, self.quiz_id) + self.answer_key.dumps()
+
+    @classmethod
+    def loads(cls, data: bytes) -> "AttemptRecord":
+        user_id, quiz_id = ATTEMPT_HEADER.unpack_from(data)
+        return cls(user_id=user_id, quiz_id=quiz_id, answer_key=AnswerKey.loads(data[ATTEMPT_HEADER.size:]))
+
+
+class AttemptStore(ABC):
+    # Bytes in, bytes out, and every key expires `ttl` seconds after it was
+    # written. Small enough to be backed by Redis or anything speaking its
+    # protocol when several workers have to share attempts.
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        ...
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes) -> None:
+        ...
+
+    @abstractmethod
+    async def delete(self, *keys: str) -> None:
+        ...
+
+    @abstractmethod
+    async def clear(self) -> None:
+        ...
+
+
+class MemoryAttemptStore(AttemptStore):
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    async def get(self, key: str) -> bytes | None:
+        return self._cache.get(key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        self._cache.set(key, value)
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self._cache.pop(key)
+
+    async def clear(self) -> None:
+        self._cache.clear()
+
+
+class RedisAttemptStore(AttemptStore):
+
+    def __init__(self, client, ttl: float, prefix: str = "attempt:"):
+        self.client = client
+        self.ttl = math.ceil(ttl)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> bytes | None:
+        return await self.client.get(self.prefix + key)
+
+    async def set(self, key: str, value: bytes) -> None:
+        await self.client.set(self.prefix + key, value, ex=self.ttl)
+
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.client.delete(*(self.prefix + key for key in keys))
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=self.prefix + "*"):
+            await self.client.delete(key)
+
+
+def create_attempt_store() -> AttemptStore:
+    if not config.ATTEMPT_STORE_URL:
+        return MemoryAttemptStore(maxsize=config.ATTEMPT_STORE_SIZE, ttl=config.ATTEMPT_TTL_SECONDS)
+    # the client is only needed when a shared store is configured
+    from redis import asyncio as redis
+    return RedisAttemptStore(redis.from_url(config.ATTEMPT_STORE_URL), ttl=config.ATTEMPT_TTL_SECONDS)
+
+
+attempt_store = create_attempt_store()
+
+
+async def save_attempt(attempt_id: int, record: AttemptRecord) -> None:
+    await attempt_store.set(f"{attempt_id}:key", record.dumps())
+
+
+async def load_attempt(attempt_id: int) -> AttemptRecord | None:
+    data = await attempt_store.get(f"{attempt_id}:key")
+    return AttemptRecord.loads(data) if data is not None else None
+
+
+async def save_progress(attempt_id: int, progress: bytes) -> None:
+    await attempt_store.set(f"{attempt_id}:progress", progress)
+
+
+async def load_progress(attempt_id: int) -> bytes | None:
+    return await attempt_store.get(f"{attempt_id}:progress")
+
+
+async def discard_attempt(attempt_id: int) -> None:
+    await attempt_store.delete(f"{attempt_id}:key", f"{attempt_id}:progress")
@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from app.core import config
+
+
+class LRUCache:
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._data: OrderedDict[Hashable, Any] = OrderedDict()
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        try:
+            self._data.move_to_end(key)
+        except KeyError:
+            return default
+        return self._data[key]
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        return self._data.pop(key, default)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._data
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class TTLCache(LRUCache):
+
+    def __init__(self, maxsize: int, ttl: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__(maxsize)
+        self.ttl = ttl
+        self.clock = clock
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        item = super().get(key)
+        if item is None:
+            return default
+        expires_at, value = item
+        if expires_at < self.clock():
+            self.pop(key)
+            return default
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        super().set(key, (self.clock() + self.ttl, value))
+
+
+class VersionedCache:
+    # entries are keyed by (key, version); invalidate() bumps the version, so a value
+    # computed from data read before the invalidation is never stored as current
+
+    def __init__(self, cache: LRUCache):
+        self._cache = cache
+        self._versions: dict[Hashable, int] = {}
+
+    def version(self, key: Hashable) -> int:
+        return self._versions.get(key, 0)
+
+    def get(self, key: Hashable) -> Any:
+        return self._cache.get((key, self.version(key)))
+
+    def set(self, key: Hashable, version: int, value: Any) -> None:
+        if version == self.version(key):
+            self._cache.set((key, version), value)
+
+    def invalidate(self, key: Hashable | None) -> None:
+        if key is None:
+            return
+        self._cache.pop((key, self.version(key)))
+        self._versions[key] = self.version(key) + 1
+
+    def clear(self) -> None:
+        self._cache.clear()
+        self._versions.clear()
+
+
+# quiz snapshots (app/utils/quiz.py) by quiz id; the CRUD writes invalidate them
+# in this process, the TTL bounds how long writes made through other worker
+# processes go unseen
+quiz_snapshot_cache = VersionedCache(
+    TTLCache(maxsize=config.QUIZ_CACHE_SIZE, ttl=config.QUIZ_CACHE_TTL_SECONDS)
+)
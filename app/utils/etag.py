@@ -0,0 +1,69 @@
+import hashlib
+import secrets
+import time
+from typing import Hashable
+
+from fastapi import Request, Response, status
+
+from app.core import config
+
+
+# counters restart with the process, so the boot id keeps ETags handed out
+# by an earlier process from matching the new counters by accident
+BOOT_ID = secrets.token_hex(4)
+
+
+class ContentVersions:
+
+    def __init__(self):
+        self._versions: dict[Hashable, int] = {}
+
+    def get(self, *keys: Hashable) -> tuple[int, ...]:
+        return tuple(self._versions.get(key, 0) for key in keys)
+
+    def bump(self, *keys: Hashable) -> None:
+        for key in keys:
+            self._versions[key] = self._versions.get(key, 0) + 1
+
+    def clear(self) -> None:
+        self._versions.clear()
+
+
+content_versions = ContentVersions()
+
+
+def make_etag(*parts: Hashable) -> str:
+    return '"' + "-".join([BOOT_ID, *map(str, parts)]) + '"'
+
+
+# The versions only count this process's writes, so the tags also change every
+# CATALOGUE_ETAG_TTL_SECONDS: that is how long a write made through another
+# worker process can go on being answered with 304 Not Modified.
+def table_etag(*tables: str) -> str:
+    period = int(time.monotonic() // config.CATALOGUE_ETAG_TTL_SECONDS)
+    return make_etag(*tables, *content_versions.get(*tables), period)
+
+
+# the same content gets the same tag from every worker process
+def content_etag(content: bytes) -> str:
+    return '"' + hashlib.blake2b(content, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return etag in (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+
+
+def set_cache_headers(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = config.CATALOGUE_CACHE_CONTROL
+
+
+def not_modified(etag: str) -> Response:
+    response = Response(status_code=status.HTTP_304_NOT_MODIFIED)
+    set_cache_headers(response, etag)
+    return response
@@ -0,0 +1,124 @@
+import time
+from dataclasses import dataclass
+from itertools import islice
+
+from sortedcontainers import SortedList
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core import config
+from app.database.models.stats import QuizUserStats
+
+
+@dataclass(frozen=True)
+class LeaderboardEntry:
+    rank: int
+    user_id: int
+    percentage: float
+
+
+# Each user's best percentage on one quiz, kept sorted best first. Equal
+# percentages share a rank and are listed by user id.
+class Leaderboard:
+    def __init__(self, scores: dict[int, float] | None = None):
+        self._scores: dict[int, float] = dict(scores or {})
+        self._entries = SortedList((-percentage, user_id) for user_id, percentage in self._scores.items())
+
+    def __len__(self) -> int:
+        return len(self._scores)
+
+    def set(self, user_id: int, percentage: float | None) -> None:
+        old_percentage = self._scores.pop(user_id, None)
+        if old_percentage is not None:
+            self._entries.remove((-old_percentage, user_id))
+        if percentage is not None:
+            self._scores[user_id] = percentage
+            self._entries.add((-percentage, user_id))
+
+    def top(self, k: int) -> list[LeaderboardEntry]:
+        entries: list[LeaderboardEntry] = []
+        rank = 0
+        for position, (negative_percentage, user_id) in enumerate(islice(self._entries, k), start=1):
+            if not entries or entries[-1].percentage != -negative_percentage:
+                rank = position
+            entries.append(LeaderboardEntry(rank=rank, user_id=user_id, percentage=-negative_percentage))
+        return entries
+
+    def rank(self, user_id: int) -> LeaderboardEntry | None:
+        percentage = self._scores.get(user_id)
+        if percentage is None:
+            return None
+        # (-percentage,) sorts before every entry with that percentage
+        rank = self._entries.bisect_left((-percentage,)) + 1
+        return LeaderboardEntry(rank=rank, user_id=user_id, percentage=percentage)
+
+
+# Boards by quiz id. Results written in this process update them at once;
+# results written through other worker processes or instances show up when a
+# board older than `ttl` seconds is loaded again from quiz_user_stats.
+class LeaderboardIndex:
+    def __init__(self, ttl: float = config.LEADERBOARD_TTL_SECONDS):
+        self.ttl = ttl
+        self._boards: dict[int, Leaderboard] = {}
+        self._loaded_at: dict[int, float] = {}
+
+    def get(self, quiz_id: int) -> Leaderboard:
+        return self._boards.get(quiz_id) or Leaderboard()
+
+    async def load(self, db: AsyncSession, quiz_id: int) -> Leaderboard:
+        loaded_at = self._loaded_at.get(quiz_id)
+        if loaded_at is not None and loaded_at + self.ttl > time.monotonic():
+            return self.get(quiz_id)
+        rows = await db.execute(
+            select(QuizUserStats.user_id, QuizUserStats.best_percentage).where(QuizUserStats.quiz_id == quiz_id)
+        )
+        board = Leaderboard(dict(rows.all()))
+        if board:
+            self._boards[quiz_id] = board
+        else:
+            self._boards.pop(quiz_id, None)
+        self._loaded_at[quiz_id] = time.monotonic()
+        return board
+
+    def set(self, quiz_id: int, user_id: int, percentage: float | None) -> None:
+        board = self._boards.get(quiz_id)
+        if board is None:
+            if percentage is None:
+                return
+            board = self._boards[quiz_id] = Leaderboard()
+        board.set(user_id, percentage)
+        if not board:
+            del self._boards[quiz_id]
+
+    def record(self, best_percentages: dict[tuple[int, int], float]) -> None:
+        for (user_id, quiz_id), percentage in best_percentages.items():
+            self.set(quiz_id, user_id, percentage)
+
+    def drop_quiz(self, quiz_id: int) -> None:
+        self._boards.pop(quiz_id, None)
+        self._loaded_at.pop(quiz_id, None)
+
+    def drop_user(self, user_id: int) -> None:
+        for quiz_id in list(self._boards):
+            self.set(quiz_id, user_id, None)
+
+    def clear(self) -> None:
+        self._boards.clear()
+        self._loaded_at.clear()
+
+    async def warm(self, session_factory: sessionmaker) -> None:
+        scores: dict[int, dict[int, float]] = {}
+        async with session_factory() as db:
+            result = await db.stream(
+                select(QuizUserStats.quiz_id, QuizUserStats.user_id, QuizUserStats.best_percentage)
+            )
+            async for rows in result.partitions(config.LEADERBOARD_WARM_BATCH_SIZE):
+                for quiz_id, user_id, percentage in rows:
+                    scores.setdefault(quiz_id, {})[user_id] = percentage
+        self._boards = {quiz_id: Leaderboard(quiz_scores) for quiz_id, quiz_scores in scores.items()}
+        loaded_at = time.monotonic()
+        self._loaded_at = {quiz_id: loaded_at for quiz_id in self._boards}
+
+
+leaderboards = LeaderboardIndex()
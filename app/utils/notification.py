@@ -0,0 +1,204 @@
+import asyncio
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import httpx
+from sendgrid.helpers.mail import Mail, Email, To, Content, Subject
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.sql import Select
+
+from app.core import config
+from app.database.models.quiz import Quiz
+from app.database.models.stats import QuizUserStats
+from app.database.models.user import User
+
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+@dataclass
+class NotificationStats:
+    sent: int = 0
+    failed: int = 0
+
+
+# A run in progress: when it started, the last (quiz_id, user_id) whose batch
+# was fully handled, and the recipients it failed to reach so far
+@dataclass
+class NotificationRun:
+    started_at: datetime
+    after: tuple[int, int] | None = None
+    failed: list[tuple[int, int]] = field(default_factory=list)
+
+
+class NotificationCheckpoint:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+
+    def load(self, now: datetime) -> NotificationRun | None:
+        try:
+            data = json.loads(self.path.read_text())
+            run = NotificationRun(
+                started_at=datetime.fromisoformat(data["started_at"]),
+                after=tuple(data["after"]) if data["after"] else None,
+                failed=[tuple(key) for key in data["failed"]]
+            )
+        except (FileNotFoundError, KeyError, TypeError, ValueError):
+            return None
+        # a run left unfinished for a day has been superseded by the next one
+        if run.started_at <= now - timedelta(days=1):
+            return None
+        return run
+
+    def save(self, run: NotificationRun) -> None:
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        tmp_path.write_text(json.dumps({
+            "started_at": run.started_at.isoformat(),
+            "after": run.after,
+            "failed": run.failed
+        }))
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        self.path.unlink(missing_ok=True)
+
+
+class MailSender:
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        url: str = config.SENDGRID_API_URL,
+        max_retries: int = config.NOTIFICATION_MAX_RETRIES,
+        backoff: float = config.NOTIFICATION_RETRY_BACKOFF_SECONDS
+    ):
+        self.client = client
+        self.url = url
+        self.max_retries = max_retries
+        self.backoff = backoff
+
+    def retry_delay(self, attempt: int, retry_after: str | None) -> float:
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after)
+        return self.backoff * 2 ** attempt
+
+    async def send(self, to_email: str, subject: str, content: str) -> bool:
+        mail = Mail(
+            from_email=Email(config.FROM_EMAIL),
+            to_emails=To(to_email),
+            subject=Subject(subject),
+            plain_text_content=Content("text/plain", content)
+        )
+        mail_json = mail.get()
+
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                response = await self.client.post(self.url, json=mail_json)
+            except httpx.TransportError as e:
+                error = repr(e)
+            else:
+                if response.is_success:
+                    return True
+                error = f"HTTP {response.status_code}"
+                if response.status_code not in RETRY_STATUS_CODES:
+                    break
+                retry_after = response.headers.get("Retry-After")
+
+            if attempt < self.max_retries:
+                await asyncio.sleep(self.retry_delay(attempt, retry_after))
+
+        logger.warning("Failed to send notification to %s: %s", to_email, error)
+        return False
+
+
+def create_mail_client(concurrency: int = config.NOTIFICATION_CONCURRENCY) -> httpx.AsyncClient:
+    return httpx.AsyncClient(
+        headers={"Authorization": f"Bearer {config.SENDGRID_API_KEY}"},
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        timeout=httpx.Timeout(10.0)
+    )
+
+
+def expired_quiz_results_query(
+    expired_before: datetime,
+    after: tuple[int, int] | None = None,
+    keys: list[tuple[int, int]] | None = None
+) -> Select:
+    query = (
+        select(
+            QuizUserStats.quiz_id,
+            QuizUserStats.user_id,
+            QuizUserStats.last_finished_at.label("finished_at"),
+            Quiz.title,
+            User.name,
+            User.email
+        )
+        .join(User, QuizUserStats.user_id == User.id)
+        .join(Quiz, QuizUserStats.quiz_id == Quiz.id)
+        .filter(QuizUserStats.last_finished_at <= expired_before)
+        # a total order on the key is what lets a run resume from a checkpoint
+        .order_by(QuizUserStats.quiz_id, QuizUserStats.user_id)
+    )
+    if after is not None:
+        query = query.filter(tuple_(QuizUserStats.quiz_id, QuizUserStats.user_id) > after)
+    if keys is not None:
+        query = query.filter(tuple_(QuizUserStats.quiz_id, QuizUserStats.user_id).in_(keys))
+    return query
+
+
+# A run interrupted midway is resumed by the next one started within a day,
+# with the same cutoff, retrying the recipients it failed to reach before going
+# on from its checkpoint. Recipients still failing when a run completes are
+# reached by the next run, which covers every expired result again.
+async def send_expired_quiz_notifications(
+    session_factory: sessionmaker,
+    sender: MailSender,
+    checkpoint: NotificationCheckpoint,
+    batch_size: int = config.NOTIFICATION_BATCH_SIZE,
+    concurrency: int = config.NOTIFICATION_CONCURRENCY,
+    now: datetime | None = None
+) -> NotificationStats:
+    now = now or datetime.utcnow()
+    run = checkpoint.load(now) or NotificationRun(started_at=now)
+    expired_before = run.started_at - timedelta(days=config.NOTIFICATION_EXPIRE_DAYS)
+    stats = NotificationStats()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def notify(row) -> bool:
+        async with semaphore:
+            sent = await sender.send(
+                to_email=row.email,
+                subject=f"Quiz \"{row.title}\" expired",
+                content=f"Dear {row.name}, Quiz \"{row.title}\" is expired. Please, finish it as soon as possible."
+            )
+        if sent:
+            stats.sent += 1
+        else:
+            stats.failed += 1
+        return sent
+
+    async def notify_batch(rows) -> list[tuple[int, int]]:
+        sent = await asyncio.gather(*(notify(row) for row in rows))
+        return [(row.quiz_id, row.user_id) for row, row_sent in zip(rows, sent) if not row_sent]
+
+    async with session_factory() as db:
+        if run.failed:
+            rows = (await db.execute(expired_quiz_results_query(expired_before, keys=run.failed))).all()
+            run.failed = await notify_batch(rows)
+            checkpoint.save(run)
+
+        result = await db.stream(expired_quiz_results_query(expired_before, after=run.after))
+        async for rows in result.partitions(batch_size):
+            run.failed += await notify_batch(rows)
+            run.after = (rows[-1].quiz_id, rows[-1].user_id)
+            checkpoint.save(run)
+
+    checkpoint.clear()
+    return stats
@@ -0,0 +1,56 @@
+import binascii
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+
+from fastapi import Query, Response
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.sql import Select
+
+from app.core import config
+from app.crud.base import CRUDBase
+from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST
+
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+
+@dataclass(frozen=True)
+class PageParams:
+    after_id: int | None
+    skip: int
+    limit: int
+
+
+def encode_cursor(last_id: int) -> str:
+    return urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        raw = urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        prefix, last_id = raw.split(":", 1)
+        if prefix != "id":
+            raise ValueError(raw)
+        return int(last_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise HTTP_400_BAD_REQUEST("Invalid cursor")
+
+
+async def get_page_params(
+    cursor: str | None = None,
+    after_id: int | None = Query(None, ge=0),
+    skip: int = Query(0, ge=0, deprecated=True),
+    limit: int = Query(10, ge=1, le=config.PAGE_MAX_LIMIT)
+) -> PageParams:
+    if cursor is not None:
+        after_id = decode_cursor(cursor)
+    return PageParams(after_id=after_id, skip=skip, limit=limit)
+
+
+async def paginate(db: AsyncSession, crud: CRUDBase, page: PageParams, response: Response, query: Select | None = None) -> list:
+    # one extra row tells whether there is a next page without a count query
+    items = await crud.get_multi(db, after_id=page.after_id, skip=page.skip, limit=page.limit + 1, query=query)
+    if len(items) > page.limit:
+        items = items[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(items[-1].id)
+    return items
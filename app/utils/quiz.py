@@ -1,9 +1,65 @@
-from app.database.models.quiz import Quiz, Answer
+from dataclasses import dataclass, field
+from types import MappingProxyType
+from typing import Iterable, Mapping, Sequence
+
+import orjson
+from sqlalchemy.engine import Row
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.timing import timed
+from app.crud.quiz import QuestionRow, crud_quiz, crud_quiz_attempt
+from app.database.models.quiz import Quiz
 from app.schemes.quiz import (
+    QuizRequset,
     QuizResponse,
     QuestionResponse,
     QuestionAnswerVariantResponse
 )
+from app.utils.attempt_store import AttemptRecord, load_attempt, save_attempt
+from app.utils.cache import quiz_snapshot_cache
+from app.utils.etag import content_etag
+from app.utils.sampling import QuestionSampler
+from app.utils.scoring import AnswerKey, InvalidSubmission
+from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST, HTTP_403_FORBIDDEN, HTTP_404_NOT_FOUND
+
+
+@dataclass(frozen=True)
+class QuizSnapshot:
+    quiz_id: int
+    version: int
+    is_active: bool
+    question_ids: tuple[int, ...]
+    answer_key: AnswerKey
+    # answer ids of every question
+    question_answers: Mapping[int, tuple[int, ...]]
+    # the view payload, validated and serialized once per quiz version; for
+    # sampled quizzes it has no questions, those are serialized one by one
+    body: bytes
+    etag: str
+    sampler: QuestionSampler | None = None
+    question_bodies: Mapping[int, bytes] = field(default_factory=dict)
+
+    @property
+    def max_score(self) -> int:
+        return self.answer_key.max_score
+
+    def answer_key_for(self, question_ids: Sequence[int]) -> AnswerKey:
+        return AnswerKey.from_answers(
+            (answer_id, self.answer_key.is_correct(answer_id))
+            for question_id in question_ids
+            for answer_id in self.question_answers.get(question_id, ())
+        )
+
+    def attempt_body(self, attempt_id: int, question_ids: Sequence[int]) -> bytes:
+        body = self.body
+        if self.sampler is not None:
+            # body ends with `"questions":[]}`; splice the drawn questions in
+            body = body[:-2] + b",".join(
+                self.question_bodies[question_id]
+                for question_id in question_ids
+                if question_id in self.question_bodies
+            ) + b"]}"
+        return body[:-1] + b',"attempt_id":%d}' % attempt_id
 
 
 async def generate_quiz_response(quiz: Quiz) -> QuizResponse:
@@ -33,29 +89,156 @@ async def generate_quiz_response(quiz: Quiz) -> QuizResponse:
     )
 
 
-async def get_quiz_max_score(quiz: Quiz) -> int | None:
-    max_score: int = 0
-    for question in quiz.questions:
-        max_score += len(question.answers)
-    return max_score or None
+def build_quiz_snapshot(
+    quiz: Quiz | Row,
+    questions: Sequence[QuestionRow],
+    version: int = 0,
+    category_links: Iterable[tuple[int, int]] = ()
+) -> QuizSnapshot:
+    answer_key = AnswerKey.from_answers(
+        (answer_id, is_correct)
+        for _, _, answers in questions
+        for answer_id, _, is_correct in answers
+    )
+    question_ids = tuple(question_id for question_id, _, _ in questions)
+    # plain dicts shaped like QuestionResponse; building the models for a
+    # large bank costs more than the rest of the snapshot
+    question_payloads = [
+        {
+            "question_id": question_id,
+            "question_text": question_text,
+            "answer_variants": [
+                {"answer_id": answer_id, "answer_text": answer_text}
+                for answer_id, answer_text, _ in answers
+            ]
+        }
+        for question_id, question_text, answers in questions
+    ]
+    payload = {
+        "quiz_id": quiz.id,
+        "quiz_title": quiz.title,
+        "quiz_description": quiz.description,
+        "questions": question_payloads,
+    }
+    sampler = None
+    question_bodies = {}
+    if quiz.sampling_rules:
+        sampler = QuestionSampler.build(
+            ((rule["category_id"], rule["question_count"]) for rule in quiz.sampling_rules),
+            question_ids,
+            category_links
+        )
+        question_bodies = {question["question_id"]: orjson.dumps(question) for question in question_payloads}
+        payload["questions"] = []
+    body = orjson.dumps(payload)
+    return QuizSnapshot(
+        quiz_id=quiz.id,
+        version=version,
+        is_active=quiz.is_active,
+        question_ids=question_ids,
+        answer_key=answer_key,
+        question_answers=MappingProxyType({
+            question_id: tuple(answer_id for answer_id, _, _ in answers)
+            for question_id, _, answers in questions
+        }),
+        body=body,
+        etag=content_etag(body),
+        sampler=sampler,
+        question_bodies=MappingProxyType(question_bodies)
+    )
 
 
-async def get_question_ids(quiz: Quiz) -> list[int] | None:
-    questions_ids: list[int] = [question.id for question in quiz.questions]
-    return questions_ids or None
+async def compile_quiz_snapshot(
+    quiz: Quiz,
+    version: int = 0,
+    category_links: Iterable[tuple[int, int]] = ()
+) -> QuizSnapshot:
+    questions = [
+        (question.id, question.question_text, [(answer.id, answer.answer_text, answer.is_correct) for answer in question.answers])
+        for question in quiz.questions
+    ]
+    return build_quiz_snapshot(quiz, questions, version, category_links)
 
 
-async def get_answers_ids(quiz: Quiz) -> list[int] | None:
-    answers_ids: list[int] = []
-    for question in quiz.questions:
-        for answer in question.answers:
-            answers_ids.append(answer.id)
-    return answers_ids or None
+async def get_quiz_snapshot(db: AsyncSession, quiz_id: int) -> QuizSnapshot | None:
+    snapshot = quiz_snapshot_cache.get(quiz_id)
+    if snapshot is not None:
+        return snapshot
+    return (await get_quiz_snapshots(db, {quiz_id})).get(quiz_id)
 
 
-async def get_real_answers(quiz: Quiz) -> list[Answer]:
-    answers: list[Answer] = []
-    for question in quiz.questions:
-        for answer in question.answers:
-            answers.append(answer)
-    return answers
+async def get_quiz_snapshots(db: AsyncSession, quiz_ids: set[int]) -> dict[int, QuizSnapshot]:
+    snapshots: dict[int, QuizSnapshot] = {}
+    versions: dict[int, int] = {}
+    for quiz_id in quiz_ids:
+        snapshot = quiz_snapshot_cache.get(quiz_id)
+        if snapshot is not None:
+            snapshots[quiz_id] = snapshot
+        else:
+            versions[quiz_id] = quiz_snapshot_cache.version(quiz_id)
+
+    if versions:
+        graphs = await crud_quiz.get_graph_rows(db, ids=list(versions))
+        sampled_quiz_ids = [quiz.id for quiz, _ in graphs if quiz.sampling_rules]
+        category_links = await crud_quiz.get_category_links(db, quiz_ids=sampled_quiz_ids) if sampled_quiz_ids else {}
+        for quiz, questions in graphs:
+            snapshot = build_quiz_snapshot(quiz, questions, versions[quiz.id], category_links.get(quiz.id, []))
+            quiz_snapshot_cache.set(quiz.id, snapshot.version, snapshot)
+            snapshots[quiz.id] = snapshot
+    return snapshots
+
+
+async def grade_quiz(snapshot: QuizSnapshot | None, quiz_request: QuizRequset) -> int:
+    if not snapshot:
+        raise HTTP_404_NOT_FOUND("Quiz not found")
+
+    if not snapshot.is_active:
+        raise HTTP_404_NOT_FOUND("Quiz is not active")
+
+    if snapshot.sampler is not None:
+        raise HTTP_400_BAD_REQUEST("Quiz questions are drawn per attempt, start an attempt first")
+
+    if not snapshot.question_ids:
+        raise HTTP_400_BAD_REQUEST("Quiz has no questions or answers")
+
+    return grade_answers(snapshot.answer_key, quiz_request)
+
+
+def grade_answers(answer_key: AnswerKey, quiz_request: QuizRequset) -> int:
+    if not answer_key:
+        raise HTTP_400_BAD_REQUEST("Quiz has no questions or answers")
+
+    if not answer_key.max_score:
+        raise HTTP_400_BAD_REQUEST("Quiz don't have any correct questions")
+
+    try:
+        with timed("grading"):
+            return answer_key.grade(quiz_request.answers)
+    except InvalidSubmission as e:
+        raise HTTP_400_BAD_REQUEST(str(e))
+
+
+# The answer key frozen when the attempt started. If the attempt store lost it
+# (expired, or started on a worker that doesn't share the store), it is read
+# back from the saved attempt and put back.
+async def get_attempt_record(db: AsyncSession, *, attempt_id: int, quiz_id: int, user_id: int) -> AttemptRecord:
+    record = await load_attempt(attempt_id)
+    if record is None:
+        attempt = await crud_quiz_attempt.get(db, id=attempt_id)
+        if not attempt or attempt.quiz_id != quiz_id:
+            raise HTTP_404_NOT_FOUND("Attempt not found")
+        if attempt.user_id != user_id:
+            raise HTTP_403_FORBIDDEN("Attempt belongs to another user")
+        if attempt.submitted_at is not None:
+            raise HTTP_400_BAD_REQUEST("Attempt already submitted")
+        # saved before answer keys were, so there is nothing to grade it against
+        if attempt.answer_key is None:
+            raise HTTP_400_BAD_REQUEST("Attempt has expired, start a new one")
+        record = AttemptRecord(user_id=attempt.user_id, quiz_id=quiz_id, answer_key=AnswerKey.loads(attempt.answer_key))
+        await save_attempt(attempt_id, record)
+
+    if record.quiz_id != quiz_id:
+        raise HTTP_404_NOT_FOUND("Attempt not found")
+    if record.user_id != user_id:
+        raise HTTP_403_FORBIDDEN("Attempt belongs to another user")
+    return record
@@ -0,0 +1,99 @@
+from typing import AsyncIterable, AsyncIterator, Iterator, TypeVar
+
+import orjson
+from fastapi.exceptions import RequestValidationError
+from pydantic import BaseModel, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+
+from app.database.models.quiz import Quiz
+from app.schemes.quiz import (
+    AnswerDocument,
+    QuestionDocument,
+    QuizCreate,
+    QuizDocument
+)
+from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST
+
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+ModelType = TypeVar("ModelType", bound=BaseModel)
+
+
+def parse_document(model: type[ModelType], data: bytes, loc: tuple = ("body",)) -> ModelType:
+    try:
+        return model.parse_raw(data)
+    except ValidationError as e:
+        raise RequestValidationError([ErrorWrapper(e, loc=loc)])
+
+
+async def iter_lines(chunks: AsyncIterable[bytes]) -> AsyncIterator[tuple[int, bytes]]:
+    buffer = b""
+    line_number = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        for line in lines:
+            line_number += 1
+            if line.strip():
+                yield line_number, line
+    if buffer.strip():
+        yield line_number + 1, buffer
+
+
+async def batched(items: list, size: int) -> AsyncIterator[list]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+# An NDJSON quiz document is the quiz itself on the first line followed by
+# one question per line. Questions are parsed lazily, batch by batch, while
+# the request body is still being received.
+async def read_ndjson_document(
+    chunks: AsyncIterable[bytes],
+    batch_size: int
+) -> tuple[QuizCreate, AsyncIterator[list[QuestionDocument]]]:
+    lines = iter_lines(chunks)
+    first_line = await anext(lines, None)
+    if first_line is None:
+        raise HTTP_400_BAD_REQUEST("Quiz document is empty")
+    line_number, line = first_line
+    quiz_in = parse_document(QuizCreate, line, loc=("body", line_number))
+
+    async def batches() -> AsyncIterator[list[QuestionDocument]]:
+        batch: list[QuestionDocument] = []
+        async for line_number, line in lines:
+            batch.append(parse_document(QuestionDocument, line, loc=("body", line_number)))
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    return quiz_in, batches()
+
+
+def quiz_document(quiz: Quiz) -> QuizDocument:
+    return QuizDocument(
+        title=quiz.title,
+        description=quiz.description,
+        is_active=quiz.is_active,
+        sampling_rules=quiz.sampling_rules,
+        questions=[
+            QuestionDocument(
+                question_text=question.question_text,
+                categories=sorted(category.name for category in question.categories),
+                answers=[
+                    AnswerDocument(answer_text=answer.answer_text, is_correct=answer.is_correct)
+                    for answer in question.answers
+                ]
+            )
+            for question in quiz.questions
+        ]
+    )
+
+
+def ndjson_lines(document: QuizDocument) -> Iterator[bytes]:
+    yield orjson.dumps(document.dict(exclude={"questions"})) + b"\n"
+    for question in document.questions:
+        yield orjson.dumps(question.dict()) + b"\n"
@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO
+from uuid import uuid4
+
+import orjson
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import sessionmaker
+
+from app.core import config
+from app.crud.quiz import crud_quiz_result
+from app.schemes.quiz import QuizResultCreate
+
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class ResultQueueMetrics:
+    enqueued: int = 0
+    written: int = 0
+    flushes: int = 0
+    failed_flushes: int = 0
+    # results that can never be written, such as ones for a quiz deleted while they were queued
+    dropped: int = 0
+    flush_seconds_total: float = 0.0
+    last_flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+    # results in the queue, including the batch being written
+    depth: int = 0
+    max_depth: int = 0
+
+
+# Append-only NDJSON log of queued results: `{"seq": n, ...result}` lines,
+# and `{"flushed": n}` markers once everything up to n is in the database.
+# Every line is fsynced before the submission gets its response, so queued
+# results survive a crash of the process or the host; the log is emptied
+# whenever the queue drains. A crash after a batch commits but before its
+# marker replays the batch, which its results' submission ids turn into a no-op.
+class ResultSpool:
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self._file: BinaryIO | None = None
+
+    # Results that were queued but not written, with the last sequence number used.
+    def pending(self) -> tuple[list[tuple[int, QuizResultCreate]], int]:
+        results: list[tuple[int, QuizResultCreate]] = []
+        last_seq = 0
+        try:
+            lines = self.path.read_bytes().splitlines()
+        except FileNotFoundError:
+            return results, last_seq
+        for line in lines:
+            try:
+                entry = orjson.loads(line)
+            except orjson.JSONDecodeError:
+                # a line cut short by a crash; nothing after it was acknowledged
+                logger.warning("Skipping a damaged line in %s", self.path)
+                continue
+            if "flushed" in entry:
+                results = [(seq, result) for seq, result in results if seq > entry["flushed"]]
+            else:
+                seq = entry.pop("seq")
+                results.append((seq, QuizResultCreate.parse_obj(entry)))
+                last_seq = max(last_seq, seq)
+        return results, last_seq
+
+    # Starts a new log holding just the given results, so nothing is appended
+    # to a line left half-written by a crash.
+    def open(self, pending: list[tuple[int, QuizResultCreate]]) -> None:
+        temporary = self.path.with_name(self.path.name + ".tmp")
+        with temporary.open("wb") as file:
+            file.write(b"".join(self._line(seq, result) for seq, result in pending))
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.path)
+        self._file = self.path.open("ab")
+
+    def append(self, seq: int, result: QuizResultCreate) -> None:
+        self._write(self._line(seq, result))
+
+    def mark_flushed(self, seq: int, drained: bool) -> None:
+        if drained:
+            self._file.truncate(0)
+            self._write(b"")
+        else:
+            self._write(orjson.dumps({"flushed": seq}) + b"\n")
+
+    def _line(self, seq: int, result: QuizResultCreate) -> bytes:
+        return orjson.dumps({"seq": seq, **result.dict()}) + b"\n"
+
+    def _write(self, data: bytes) -> None:
+        self._file.write(data)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+# Write-behind for graded results. Submissions only wait for a place in the
+# bounded queue; one background task writes whatever has queued up while the
+# previous batch was committing, so a spike of submissions turns into a few
+# large inserts instead of one commit each. Results reach the database, the
+# statistics and the leaderboards a moment after the response.
+class ResultQueue:
+    def __init__(
+        self,
+        maxsize: int = config.RESULT_QUEUE_SIZE,
+        batch_size: int = config.RESULT_FLUSH_BATCH_SIZE,
+        spool_path: str | None = config.RESULT_SPOOL_FILE or None,
+        retry_seconds: float = config.RESULT_FLUSH_RETRY_SECONDS
+    ):
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.spool = ResultSpool(spool_path) if spool_path else None
+        self.retry_seconds = retry_seconds
+        self.metrics = ResultQueueMetrics()
+        self._queue: asyncio.Queue[tuple[int, QuizResultCreate]] | None = None
+        self._task: asyncio.Task | None = None
+        self._seq = 0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    async def start(self, session_factory: sessionmaker) -> None:
+        self.metrics = ResultQueueMetrics()
+        self._queue = asyncio.Queue(self.maxsize)
+        pending: list[tuple[int, QuizResultCreate]] = []
+        if self.spool is not None:
+            pending, self._seq = self.spool.pending()
+            self.spool.open(pending)
+            if pending:
+                logger.info("Replaying %d quiz results from %s", len(pending), self.spool.path)
+        self._task = asyncio.create_task(self._run(session_factory))
+        # already in the spool, so they are queued without being appended again
+        for item in pending:
+            await self._enqueue(item)
+
+    async def stop(self, timeout: float = config.RESULT_QUEUE_DRAIN_SECONDS) -> None:
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._queue.join(), timeout)
+        except asyncio.TimeoutError:
+            # whatever is left stays in the spool for the next start
+            logger.warning("Stopped with %d quiz results still queued", self._queue.qsize())
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        if self.spool is not None:
+            self.spool.close()
+
+    async def put(self, result: QuizResultCreate) -> None:
+        if result.finished_at is None:
+            result = result.copy(update={"finished_at": datetime.now(timezone.utc)})
+        if result.submission_id is None:
+            result = result.copy(update={"submission_id": uuid4()})
+        self._seq += 1
+        seq = self._seq
+        await self._enqueue((seq, result))
+        # no await between entering the queue and reaching the spool, so the
+        # writer can't mark the spool drained while the result is missing from it
+        if self.spool is not None:
+            self.spool.append(seq, result)
+        self.metrics.enqueued += 1
+
+    async def _enqueue(self, item: tuple[int, QuizResultCreate]) -> None:
+        await self._queue.put(item)
+        self.metrics.depth += 1
+        self.metrics.max_depth = max(self.metrics.max_depth, self.metrics.depth)
+
+    async def _run(self, session_factory: sessionmaker) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._write(session_factory, batch)
+            self.metrics.depth -= len(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    async def _write(self, session_factory: sessionmaker, batch: list[tuple[int, QuizResultCreate]]) -> None:
+        started = time.perf_counter()
+        results = [result for _, result in batch]
+        written = len(results)
+        try:
+            await self._insert(session_factory, results)
+        except IntegrityError:
+            # some result refers to a quiz or user that is gone; write the
+            # others one by one rather than retrying the batch for ever
+            written = 0
+            for result in results:
+                try:
+                    await self._insert(session_factory, [result])
+                    written += 1
+                except IntegrityError:
+                    self.metrics.dropped += 1
+                    logger.error("Dropping a quiz result that can't be written: %s", result.json(), exc_info=True)
+        seconds = time.perf_counter() - started
+        self.metrics.flushes += 1
+        self.metrics.written += written
+        self.metrics.flush_seconds_total += seconds
+        self.metrics.last_flush_seconds = seconds
+        self.metrics.max_flush_seconds = max(self.metrics.max_flush_seconds, seconds)
+        if self.spool is not None:
+            self.spool.mark_flushed(batch[-1][0], drained=self._queue.empty())
+
+    # Retries other errors (a lost connection, a database restart) until the
+    # results are written; the queue fills up behind them and then holds back
+    # submissions, instead of dropping results. Integrity errors would only
+    # repeat, so they are left to the caller.
+    async def _insert(self, session_factory: sessionmaker, results: list[QuizResultCreate]) -> None:
+        while True:
+            try:
+                async with session_factory() as db:
+                    await crud_quiz_result.create_multi(db, new_objs=results)
+                return
+            except IntegrityError:
+                raise
+            except Exception:
+                self.metrics.failed_flushes += 1
+                logger.exception("Failed to write %d quiz results, retrying", len(results))
+                await asyncio.sleep(self.retry_seconds)
+
+
+result_queue = ResultQueue()
@@ -0,0 +1,43 @@
+import random
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping
+
+
+@dataclass(frozen=True)
+class QuestionSampler:
+    # (category id or None for any question, number of questions to draw)
+    rules: tuple[tuple[int | None, int], ...]
+    # question ids per category, and every question of the quiz under None
+    pools: Mapping[int | None, tuple[int, ...]]
+
+    @classmethod
+    def build(
+        cls,
+        rules: Iterable[tuple[int | None, int]],
+        question_ids: Iterable[int],
+        category_links: Iterable[tuple[int, int]]
+    ) -> "QuestionSampler":
+        pools: dict[int | None, list[int]] = {None: list(question_ids)}
+        for question_id, category_id in category_links:
+            pools.setdefault(category_id, []).append(question_id)
+        return cls(
+            rules=tuple(rules),
+            pools=MappingProxyType({category_id: tuple(ids) for category_id, ids in pools.items()})
+        )
+
+    # Draws each rule's questions from its pool without replacement, skipping
+    # questions an earlier rule already drew. Rules whose pool runs short
+    # yield fewer questions. Costs O(questions drawn), not O(pool size).
+    def sample(self, rng: random.Random | None = None) -> list[int]:
+        rng = rng or random
+        drawn: list[int] = []
+        seen: set[int] = set()
+        for category_id, count in self.rules:
+            pool = self.pools.get(category_id, ())
+            # at most len(seen) candidates can be repeats
+            candidates = rng.sample(pool, min(len(pool), count + len(seen)))
+            fresh = [question_id for question_id in candidates if question_id not in seen][:count]
+            drawn.extend(fresh)
+            seen.update(fresh)
+        return drawn
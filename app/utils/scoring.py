@@ -0,0 +1,78 @@
+import struct
+from array import array
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Iterable, Mapping, Sequence
+
+from app.schemes.quiz import UserAnswerRequset
+
+
+# number of answers
+ANSWER_KEY_HEADER = struct.Struct("<I")
+
+
+class InvalidSubmission(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    # answer id -> position in `correct`; the flags are packed one byte per answer
+    positions: Mapping[int, int]
+    correct: bytes
+
+    @classmethod
+    def from_answers(cls, answers: Iterable[tuple[int, bool]]) -> "AnswerKey":
+        positions: dict[int, int] = {}
+        correct = bytearray()
+        for answer_id, is_correct in answers:
+            positions[answer_id] = len(correct)
+            correct.append(bool(is_correct))
+        return cls(positions=MappingProxyType(positions), correct=bytes(correct))
+
+    # the header, the answer ids as int64 in key order, then one flag byte per answer
+    def dumps(self) -> bytes:
+        answer_ids = array("q", self.positions)
+        return ANSWER_KEY_HEADER.pack(len(answer_ids)) + answer_ids.tobytes() + self.correct
+
+    @classmethod
+    def loads(cls, data: bytes) -> "AnswerKey":
+        count, = ANSWER_KEY_HEADER.unpack_from(data)
+        answer_ids = array("q")
+        answer_ids.frombytes(data[ANSWER_KEY_HEADER.size:ANSWER_KEY_HEADER.size + count * answer_ids.itemsize])
+        correct = data[ANSWER_KEY_HEADER.size + count * answer_ids.itemsize:]
+        return cls.from_answers(zip(answer_ids, correct))
+
+    @property
+    def max_score(self) -> int:
+        return len(self.correct)
+
+    def __len__(self) -> int:
+        return len(self.correct)
+
+    def __contains__(self, answer_id: int) -> bool:
+        return answer_id in self.positions
+
+    def is_correct(self, answer_id: int) -> bool:
+        return bool(self.correct[self.positions[answer_id]])
+
+    def grade(self, user_answers: Sequence[UserAnswerRequset]) -> int:
+        if not user_answers or len(user_answers) != len(self.correct):
+            raise InvalidSubmission("Incorrect number of answers provided")
+
+        positions = self.positions
+        correct = self.correct
+        seen = bytearray(len(correct))
+        mistakes = 0
+
+        for user_answer in user_answers:
+            position = positions.get(user_answer.answer_id)
+            if position is None:
+                raise InvalidSubmission("Incorrect answer id provided")
+            if seen[position]:
+                raise InvalidSubmission("Duplicate answer id provided")
+            seen[position] = 1
+            if correct[position] != user_answer.is_correct:
+                mistakes += 1
+
+        return len(correct) - mistakes
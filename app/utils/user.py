@@ -1,36 +1,57 @@
 from datetime import datetime
 
-from fastapi import Depends, status
-from fastapi.responses import RedirectResponse
-from sqlalchemy.orm import Session
+from fastapi import Depends
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.security import reusable_oauth2
+from app.core.security import principal_cache, reusable_oauth2
+from app.core.timing import timed
 from app.crud.user import crud_user
 from app.database.session import get_db
-from app.database.models.user import User
 from app.schemes.token import AccsessTokenData
+from app.schemes.user import UserPrincipal
 from app.utils.token import decode_jwt
-from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST
+from app.utils.HTTP_errors import HTTP_400_BAD_REQUEST, HTTP_401_UNAUTHORIZED
+
+
+async def get_user_principal(db: AsyncSession, token_data: AccsessTokenData) -> UserPrincipal | None:
+    principal: UserPrincipal | None = principal_cache.get(token_data.id)
+    if principal is not None and principal.email == token_data.email:
+        if principal.token_version == token_data.token_version:
+            return principal
+        # a token issued after the principal was cached may be newer than it
+        if principal.token_version > token_data.token_version:
+            return None
+
+    version = principal_cache.version(token_data.id)
+    user = await crud_user.get_by_email(db, email=token_data.email)
+    if not user or user.id != token_data.id or user.token_version != token_data.token_version:
+        return None
+
+    principal = UserPrincipal.from_orm(user)
+    principal_cache.set(user.id, version, principal)
+    return principal
 
 
 async def get_current_user(
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     token: str = Depends(reusable_oauth2)
-) -> User:
-    token_data: AccsessTokenData = await decode_jwt(token, AccsessTokenData)
-    token_expired = datetime.utcfromtimestamp(token_data.exp) < datetime.utcnow()
-    user = await crud_user.get_by_email(db, email=token_data.email)
+) -> UserPrincipal:
+    with timed("auth"):
+        token_data: AccsessTokenData = await decode_jwt(token, AccsessTokenData)
+        token_expired = datetime.utcfromtimestamp(token_data.exp) < datetime.utcnow()
 
-    if not token_expired and user:
-        return user
+        if not token_expired:
+            user = await get_user_principal(db, token_data)
+            if user:
+                return user
 
-    query = f"?refresh_token={token_data.refresh_token}"
-    return RedirectResponse("/refresh" + query, status_code=status.HTTP_303_SEE_OTHER)
+    # expired tokens are renewed through /refresh, revoked ones by signing in again
+    raise HTTP_401_UNAUTHORIZED("Token is expired or revoked")
 
 
 async def get_current_superuser(
-    current_user: User = Depends(get_current_user),
-) -> User:
+    current_user: UserPrincipal = Depends(get_current_user),
+) -> UserPrincipal:
     if not await crud_user.is_superuser(current_user):
         raise HTTP_400_BAD_REQUEST("Only superusers can access this endpoint")
     return current_user
@@ -0,0 +1,154 @@
+import random
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import sessionmaker
+
+from app.core.security import get_password_hash
+from app.crud.quiz import insert_rows
+from app.database.models.quiz import Answer, Category, Question, Quiz, QuizResult, questions_categories
+from app.database.models.user import User
+
+
+PASSWORD = "benchmark-password"
+
+PERCENTAGE = "CASE WHEN max_score > 0 THEN 100.0 * user_score / max_score ELSE 0.0 END"
+
+WORDS = (
+    "vacation", "security", "office", "payroll", "travel", "expense", "laptop", "badge",
+    "meeting", "privacy", "onboarding", "benefits", "parking", "holiday", "training", "policy"
+)
+
+
+@dataclass(frozen=True)
+class Scale:
+    quizzes: int
+    questions: int
+    answers: int
+    users: int
+    results: int
+    categories: int = 20
+
+
+SCALES = {
+    "small": Scale(quizzes=100, questions=5, answers=4, users=1_000, results=10_000),
+    "full": Scale(quizzes=10_000, questions=5, answers=4, users=10_000, results=1_000_000),
+}
+
+
+@dataclass
+class Dataset:
+    tag: str
+    scale: Scale
+    quiz_ids: list[int]
+    category_ids: list[int]
+    # (id, email) of every benchmark user; the first one is a superuser
+    users: list[tuple[int, str]] = field(repr=False)
+
+    @property
+    def superuser(self) -> tuple[int, str]:
+        return self.users[0]
+
+
+def dataset_tag(scale: Scale, seed: int) -> str:
+    return f"bench-{seed}-{scale.quizzes}q-{scale.users}u-{scale.results}r"
+
+
+# Bulk versions of the factories in app/tests/utils: the same rows, but
+# written with one unnest INSERT per batch and drawn from a seeded generator
+# so that every run measures the same data. An existing dataset with the
+# same tag is reused rather than written again.
+async def ensure_dataset(session_factory: sessionmaker, scale: Scale, seed: int = 1, batch_size: int = 20_000) -> Dataset:
+    tag = dataset_tag(scale, seed)
+    async with session_factory() as db:
+        quiz_ids = (await db.execute(select(Quiz.id).filter(Quiz.description == tag).order_by(Quiz.id))).scalars().all()
+        if len(quiz_ids) == scale.quizzes:
+            users = (await db.execute(select(User.id, User.email).filter(User.email.like(f"{tag}-%")).order_by(User.id))).all()
+            category_ids = (await db.execute(select(Category.id).filter(Category.name.like(f"{tag} %")).order_by(Category.id))).scalars().all()
+            return Dataset(tag=tag, scale=scale, quiz_ids=list(quiz_ids), category_ids=list(category_ids), users=[tuple(user) for user in users])
+
+    rng = random.Random(seed)
+    started = time.perf_counter()
+    async with session_factory() as db:
+        password = await get_password_hash(PASSWORD)
+        users = await insert_rows(db, User.__table__, [
+            {"name": f"Benchmark user {number}", "email": f"{tag}-{number}@example.com", "password": password, "is_superuser": number == 0}
+            for number in range(scale.users)
+        ], User.id, User.email)
+        users = sorted(tuple(user) for user in users)
+
+        category_ids = sorted(row.id for row in await insert_rows(db, Category.__table__, [
+            {"name": f"{tag} {WORDS[number % len(WORDS)]} {number}"} for number in range(scale.categories)
+        ], Category.id))
+
+        quiz_ids = sorted(row.id for row in await insert_rows(db, Quiz.__table__, [
+            {"title": f"Benchmark quiz {number}", "description": tag, "is_active": True}
+            for number in range(scale.quizzes)
+        ], Quiz.id))
+
+        for start in range(0, len(quiz_ids), max(1, batch_size // scale.questions)):
+            batch_quiz_ids = quiz_ids[start:start + max(1, batch_size // scale.questions)]
+            questions = await insert_rows(db, Question.__table__, [
+                {"quiz_id": quiz_id, "question_text": f"Question {number} about {' and '.join(rng.sample(WORDS, 2))}?"}
+                for quiz_id in batch_quiz_ids
+                for number in range(scale.questions)
+            ], Question.id)
+            question_ids = [row.id for row in questions]
+            await insert_rows(db, questions_categories, [
+                {"question_id": question_id, "category_id": rng.choice(category_ids)}
+                for question_id in question_ids
+            ])
+            await insert_rows(db, Answer.__table__, [
+                {"question_id": question_id, "answer_text": f"Answer {number}", "is_correct": number == correct}
+                for question_id in question_ids
+                for correct in [rng.randrange(scale.answers)]
+                for number in range(scale.answers)
+            ])
+
+        max_score = scale.questions * scale.answers
+        now = datetime.now(timezone.utc)
+        for start in range(0, scale.results, batch_size):
+            await insert_rows(db, QuizResult.__table__, [
+                {
+                    "user_id": rng.choice(users)[0],
+                    "quiz_id": rng.choice(quiz_ids),
+                    "user_score": rng.randint(0, max_score),
+                    "max_score": max_score,
+                    "finished_at": now - timedelta(seconds=rng.randrange(30 * 24 * 60 * 60)),
+                }
+                for _ in range(min(batch_size, scale.results - start))
+            ])
+        await rebuild_statistics(db, quiz_ids)
+        await db.commit()
+
+    async with session_factory() as db:
+        # fresh planner statistics for the new rows
+        await db.execute(text("ANALYZE"))
+        await db.commit()
+    print(f"seeded {tag} in {time.perf_counter() - started:.1f} s")
+    return Dataset(tag=tag, scale=scale, quiz_ids=quiz_ids, category_ids=category_ids, users=users)
+
+
+# the aggregates the results would have produced had they been submitted one by one
+async def rebuild_statistics(db: AsyncSession, quiz_ids: list[int]) -> None:
+    await db.execute(text(f"""
+        INSERT INTO quiz_user_stats
+            (user_id, quiz_id, attempts, best_score, last_score, max_score, best_percentage, total_percentage, last_finished_at)
+        SELECT DISTINCT ON (user_id, quiz_id)
+            user_id,
+            quiz_id,
+            count(*) OVER results,
+            max(user_score) OVER results,
+            user_score,
+            max_score,
+            max({PERCENTAGE}) OVER results,
+            sum({PERCENTAGE}) OVER results,
+            finished_at
+        FROM quiz_results
+        WHERE quiz_id = ANY(:quiz_ids) AND user_id IS NOT NULL
+        WINDOW results AS (PARTITION BY user_id, quiz_id)
+        ORDER BY user_id, quiz_id, finished_at DESC, id DESC
+    """), {"quiz_ids": quiz_ids})
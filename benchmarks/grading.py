@@ -0,0 +1,65 @@
+import argparse
+import random
+import timeit
+
+from app.schemes.quiz import UserAnswerRequset
+from app.utils.scoring import AnswerKey
+
+
+QUIZ_SIZES = (10, 100, 1_000, 10_000)
+
+
+def legacy_grade(quiz_answers: list[tuple[int, bool]], user_answers: list[UserAnswerRequset]) -> int:
+    # the list scan and nested loop submit_quiz used before AnswerKey
+    quiz_answers_ids = [answer_id for answer_id, _ in quiz_answers]
+    for user_answer in user_answers:
+        if user_answer.answer_id not in quiz_answers_ids:
+            raise ValueError("Incorrect answer id provided")
+
+    user_score = len(quiz_answers)
+    for user_answer in user_answers:
+        for answer_id, is_correct in quiz_answers:
+            if user_answer.answer_id == answer_id:
+                if is_correct != user_answer.is_correct:
+                    user_score -= 1
+    return user_score
+
+
+def make_quiz(size: int, seed: int) -> tuple[list[tuple[int, bool]], list[UserAnswerRequset]]:
+    rng = random.Random(seed)
+    quiz_answers = [(answer_id, rng.random() < 0.3) for answer_id in range(1, size + 1)]
+    user_answers = [
+        UserAnswerRequset(answer_id=answer_id, is_correct=rng.random() < 0.3)
+        for answer_id, _ in quiz_answers
+    ]
+    rng.shuffle(user_answers)
+    return quiz_answers, user_answers
+
+
+def measure(func) -> float:
+    number, total = timeit.Timer(func).autorange()
+    return total / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare legacy and AnswerKey grading")
+    parser.add_argument("--sizes", type=int, nargs="+", default=QUIZ_SIZES)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--legacy-limit", type=int, default=10_000, help="skip the legacy loop above this size")
+    args = parser.parse_args()
+
+    print(f"{'answers':>8} {'legacy ms':>12} {'answer key ms':>14} {'speedup':>9}")
+    for size in args.sizes:
+        quiz_answers, user_answers = make_quiz(size, args.seed)
+        answer_key = AnswerKey.from_answers(quiz_answers)
+        key_time = measure(lambda: answer_key.grade(user_answers))
+        if size > args.legacy_limit:
+            print(f"{size:>8} {'-':>12} {key_time * 1000:>14.3f} {'-':>9}")
+            continue
+        assert legacy_grade(quiz_answers, user_answers) == answer_key.grade(user_answers)
+        legacy_time = measure(lambda: legacy_grade(quiz_answers, user_answers))
+        print(f"{size:>8} {legacy_time * 1000:>12.3f} {key_time * 1000:>14.3f} {legacy_time / key_time:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+from httpx import AsyncClient, Response
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+# one request as a scenario issues it
+Call = Callable[[AsyncClient], Awaitable[Response]]
+
+# statements executed on behalf of the current request; the app runs in the
+# caller's task, so the context (and this list) follows the request through
+request_statements: ContextVar[list[str] | None] = ContextVar("request_statements", default=None)
+
+
+def count_request_queries(engine: AsyncEngine) -> None:
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements = request_statements.get()
+        if statements is not None:
+            statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    requests: int
+    concurrency: int
+    errors: int
+    requests_per_second: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    queries_per_request: float
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    # nearest rank
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(fraction * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+async def run_calls(name: str, client: AsyncClient, calls: list[Call], concurrency: int) -> ScenarioResult:
+    latencies: list[float] = []
+    queries: list[int] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def timed(call: Call) -> None:
+        nonlocal errors
+        async with semaphore:
+            statements: list[str] = []
+            request_statements.set(statements)
+            started = time.perf_counter()
+            response = await call(client)
+            latencies.append(time.perf_counter() - started)
+            queries.append(len(statements))
+            if not response.is_success:
+                errors += 1
+
+    started = time.perf_counter()
+    # every call runs in its own task, and so with its own statement list
+    await asyncio.gather(*(timed(call) for call in calls))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return ScenarioResult(
+        name=name,
+        requests=len(calls),
+        concurrency=concurrency,
+        errors=errors,
+        requests_per_second=len(calls) / elapsed if elapsed else 0.0,
+        p50_ms=percentile(latencies, 0.50) * 1000,
+        p95_ms=percentile(latencies, 0.95) * 1000,
+        p99_ms=percentile(latencies, 0.99) * 1000,
+        max_ms=latencies[-1] * 1000 if latencies else 0.0,
+        queries_per_request=sum(queries) / len(queries) if queries else 0.0
+    )
+
+
+def save_baseline(path: str | Path, metadata: dict, results: list[ScenarioResult]) -> None:
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    Path(path).write_text(json.dumps(
+        {**metadata, "results": {result.name: asdict(result) for result in results}},
+        indent=2
+    ) + "\n")
+
+
+def load_baseline(path: str | Path) -> dict:
+    return json.loads(Path(path).read_text())
+
+
+@dataclass
+class Regression:
+    scenario: str
+    metric: str
+    baseline: float
+    current: float
+
+
+# Latency may drift by `tolerance` before it counts as a regression; query
+# counts are deterministic, so any extra query per request does.
+def compare(baseline: dict, results: list[ScenarioResult], tolerance: float) -> tuple[list[str], list[Regression]]:
+    lines: list[str] = []
+    regressions: list[Regression] = []
+    for result in results:
+        previous = baseline["results"].get(result.name)
+        if previous is None:
+            lines.append(f"{result.name:<18} no baseline")
+            continue
+        changes = []
+        for metric in ("p50_ms", "p95_ms", "p99_ms", "requests_per_second", "queries_per_request"):
+            before, after = previous[metric], getattr(result, metric)
+            change = (after - before) / before * 100 if before else 0.0
+            changes.append(f"{metric} {before:.1f} -> {after:.1f} ({change:+.0f}%)")
+        lines.append(f"{result.name:<18} " + ", ".join(changes))
+        if result.p95_ms > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(Regression(result.name, "p95_ms", previous["p95_ms"], result.p95_ms))
+        if result.queries_per_request > previous["queries_per_request"] + 0.01:
+            regressions.append(Regression(result.name, "queries_per_request", previous["queries_per_request"], result.queries_per_request))
+    return lines, regressions
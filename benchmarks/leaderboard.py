@@ -0,0 +1,72 @@
+import argparse
+import random
+import time
+import timeit
+
+from app.utils.leaderboard import Leaderboard
+
+
+def make_results(count: int, users: int, seed: int) -> list[tuple[int, float]]:
+    rng = random.Random(seed)
+    return [(rng.randrange(users), rng.randrange(0, 10_001) / 100) for _ in range(count)]
+
+
+def legacy_top(results: list[tuple[int, float]], k: int) -> list[tuple[int, float]]:
+    # what a page view costs without an index: sort every attempt, keep each user's best
+    top: list[tuple[int, float]] = []
+    seen: set[int] = set()
+    for user_id, percentage in sorted(results, key=lambda result: (-result[1], result[0])):
+        if user_id not in seen:
+            seen.add(user_id)
+            top.append((user_id, percentage))
+            if len(top) == k:
+                break
+    return top
+
+
+def measure(func) -> float:
+    number, total = timeit.Timer(func).autorange()
+    return total / number
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare sorting every result with the leaderboard index")
+    parser.add_argument("--results", type=int, default=1_000_000)
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--top", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    results = make_results(args.results, args.users, args.seed)
+
+    started = time.perf_counter()
+    board = Leaderboard()
+    best: dict[int, float] = {}
+    for user_id, percentage in results:
+        if percentage > best.get(user_id, -1.0):
+            best[user_id] = percentage
+            board.set(user_id, percentage)
+    build_time = time.perf_counter() - started
+
+    started = time.perf_counter()
+    Leaderboard(best)
+    warm_time = time.perf_counter() - started
+
+    assert [(entry.user_id, entry.percentage) for entry in board.top(args.top)] == legacy_top(results, args.top)
+
+    probe_users = random.Random(args.seed).sample(sorted(best), min(1000, len(best)))
+    legacy_time = measure(lambda: legacy_top(results, args.top))
+    top_time = measure(lambda: board.top(args.top))
+    rank_time = measure(lambda: [board.rank(user_id) for user_id in probe_users]) / len(probe_users)
+
+    print(f"results: {args.results}, users: {len(best)}, top: {args.top}")
+    print(f"{'incremental build (all submits)':<34} {build_time * 1000:>12.1f} ms")
+    print(f"{'warm from best scores':<34} {warm_time * 1000:>12.1f} ms")
+    print(f"{'legacy top-k (sort every result)':<34} {legacy_time * 1000:>12.3f} ms")
+    print(f"{'leaderboard top-k':<34} {top_time * 1000:>12.3f} ms")
+    print(f"{'leaderboard rank':<34} {rank_time * 1_000_000:>12.3f} us")
+    print(f"{'top-k speedup':<34} {legacy_time / top_time:>11.0f}x")
+
+
+if __name__ == "__main__":
+    main()
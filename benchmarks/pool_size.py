@@ -0,0 +1,61 @@
+import argparse
+import asyncio
+import random
+
+from httpx import AsyncClient
+
+from app.core import config
+from app.core.metrics import db_pool_checkout_seconds, db_pool_timeouts
+from app.database.session import SessionLocal, create_pooled_engine, create_session_factory, engine, get_db
+from app.main import get_application
+from app.utils.leaderboard import leaderboards
+from benchmarks.data import SCALES, ensure_dataset
+from benchmarks.harness import run_calls
+from benchmarks.scenarios import SCENARIOS
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Throughput of the API across connection pool sizes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 2, 5, 10, 20, 40])
+    parser.add_argument("--scale", choices=sorted(SCALES), default="small")
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="default: submit_quiz and list_results")
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    dataset = await ensure_dataset(SessionLocal, SCALES[args.scale])
+    await leaderboards.warm(SessionLocal)
+    app = get_application()
+
+    print(f"{'pool':>4} {'scenario':<16} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'wait ms':>8} {'timeouts':>8}")
+    for size in args.sizes:
+        # no overflow, so the pool size is the only limit
+        sized_engine = create_pooled_engine(config.ASYNC_DB_DEFAULT, "benchmark", pool_size=size, max_overflow=0)
+        session_factory = create_session_factory(sized_engine)
+
+        async def get_sized_db():
+            async with session_factory() as db:
+                yield db
+
+        app.dependency_overrides[get_db] = get_sized_db
+        async with AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+            for name in args.scenario or ["submit_quiz", "list_results"]:
+                calls = await SCENARIOS[name].prepare(dataset, session_factory, random.Random(size), args.requests + 100)
+                # opens the pool's connections
+                await run_calls(name, client, calls[:100], args.concurrency)
+                db_pool_checkout_seconds.clear()
+                db_pool_timeouts.clear()
+                result = await run_calls(name, client, calls[100:], args.concurrency)
+                waits = db_pool_checkout_seconds.get("benchmark")
+                mean_wait = waits.sum / waits.count * 1000 if waits else 0.0
+                print(
+                    f"{size:>4} {name:<16} {result.requests_per_second:>7.0f} {result.p50_ms:>8.1f} "
+                    f"{result.p95_ms:>8.1f} {mean_wait:>8.2f} {db_pool_timeouts.get('benchmark'):>8.0f}"
+                )
+        await sized_engine.dispose()
+
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+import argparse
+import asyncio
+import time
+import timeit
+
+from httpx import AsyncClient
+from sqlalchemy import func, select, text
+
+from app.crud.quiz import crud_category, crud_quiz
+from app.database.models.quiz import Question, questions_categories
+from app.database.session import SessionLocal, engine
+from app.main import get_application
+from app.schemes.quiz import CategoryCreate, QuestionDocument, QuizCreate, SamplingRule
+from app.tests.utils.user import create_random_user, get_user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
+from app.utils.quiz_document import batched
+from app.utils.quiz import get_quiz_snapshot
+
+
+async def create_bank(questions: int, categories: list[str], rules: list[SamplingRule]) -> int:
+    quiz_in = QuizCreate(title=f"Benchmark bank {time.time_ns()}", description="Question bank used to measure sampling", sampling_rules=rules)
+    documents = [
+        QuestionDocument(
+            question_text=f"Question number {number}?",
+            categories=[categories[number % len(categories)]],
+            answers=[{"answer_text": "Yes", "is_correct": True}, {"answer_text": "No"}]
+        )
+        for number in range(questions)
+    ]
+    async with SessionLocal() as db:
+        imported = await crud_quiz.create_graph(db, quiz_in=quiz_in, batches=batched(documents, 1000))
+    return imported.quiz_id
+
+
+async def create_categories(count: int) -> dict[str, int]:
+    categories = {}
+    async with SessionLocal() as db:
+        for number in range(count):
+            category = await crud_category.create_unique(db, new_obj=CategoryCreate(name=f"Sampling category {number} {time.time_ns()}"))
+            categories[category.name] = category.id
+    return categories
+
+
+# what drawing questions costs without precomputed pools
+async def order_by_random(quiz_id: int, rules: list[SamplingRule], repeat: int) -> float:
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for rule in rules:
+                await db.execute(
+                    select(Question.id)
+                    .join(questions_categories, questions_categories.c.question_id == Question.id)
+                    .filter(Question.quiz_id == quiz_id, questions_categories.c.category_id == rule.category_id)
+                    .order_by(func.random())
+                    .limit(rule.question_count)
+                )
+        return (time.perf_counter() - started) / repeat
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Per-attempt question sampling on a large question bank")
+    parser.add_argument("--questions", type=int, default=100_000)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--per-category", type=int, default=10, help="questions drawn from each of three categories")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    categories = await create_categories(args.categories)
+    rules = [SamplingRule(category_id=category_id, question_count=args.per_category) for category_id in list(categories.values())[:3]]
+    quiz_id = await create_bank(args.questions, list(categories), rules)
+    async with engine.begin() as connection:
+        # fresh statistics, so the planner sees the new bank
+        await connection.execute(text("ANALYZE questions, questions_categories"))
+
+    sql_seconds = await order_by_random(quiz_id, rules, args.repeat)
+
+    async with SessionLocal() as db:
+        started = time.perf_counter()
+        snapshot = await get_quiz_snapshot(db, quiz_id)
+        compile_seconds = time.perf_counter() - started
+    number, total = timeit.Timer(snapshot.sampler.sample).autorange()
+    sample_seconds = total / number
+
+    app = get_application()
+    email, password = await random_email(), await random_lower_string()
+    async with SessionLocal() as db:
+        await create_random_user(db, email, password)
+    async with AsyncClient(app=app, base_url="http://benchmark") as client:
+        headers = await get_user_authentication_headers(client, email, password)
+        starts = 0
+        started = time.perf_counter()
+        while time.perf_counter() - started < args.duration:
+            response = await client.post(f"/quiz/{quiz_id}/start", headers=headers)
+            assert response.status_code == 201, response.text
+            starts += 1
+        start_rps = starts / (time.perf_counter() - started)
+
+    await engine.dispose()
+    print(f"bank:                 {args.questions} questions, {len(rules)} x {args.per_category} drawn")
+    print(f"ORDER BY random():    {sql_seconds * 1000:.1f} ms per attempt")
+    print(f"sampler:              {sample_seconds * 1_000_000:.1f} us per attempt")
+    print(f"snapshot compile:     {compile_seconds:.2f} s once per quiz version")
+    print(f"/start:               {start_rps:.0f} req/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,94 @@
+import argparse
+import asyncio
+import time
+
+import orjson
+from httpx import AsyncClient
+
+from app.database.session import SessionLocal, engine
+from app.main import get_application
+from app.tests.utils.user import create_random_user, get_user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
+from app.utils.quiz_document import NDJSON_MEDIA_TYPE
+
+
+def make_document(questions: int, answers: int, categories: int, title: str) -> dict:
+    return {
+        "title": title,
+        "description": "Quiz bank used to measure imports",
+        "questions": [
+            {
+                "question_text": f"Question number {number}?",
+                "categories": [f"Benchmark category {number % categories}"],
+                "answers": [
+                    {"answer_text": f"Answer variant {variant}", "is_correct": variant == 0}
+                    for variant in range(answers)
+                ]
+            }
+            for number in range(questions)
+        ]
+    }
+
+
+async def import_json(client: AsyncClient, headers: dict[str, str], document: dict) -> float:
+    started = time.perf_counter()
+    response = await client.post("/quiz/import", headers=headers, json=document)
+    assert response.status_code == 201, response.text
+    return time.perf_counter() - started
+
+
+async def import_ndjson(client: AsyncClient, headers: dict[str, str], document: dict) -> float:
+    async def lines():
+        yield orjson.dumps({"title": document["title"], "description": document["description"]}) + b"\n"
+        for question in document["questions"]:
+            yield orjson.dumps(question) + b"\n"
+
+    started = time.perf_counter()
+    response = await client.post("/quiz/import", headers={**headers, "Content-Type": NDJSON_MEDIA_TYPE}, content=lines())
+    assert response.status_code == 201, response.text
+    return time.perf_counter() - started
+
+
+# how a quiz was authored before: one request per quiz, question and answer
+async def import_per_item(client: AsyncClient, headers: dict[str, str], document: dict) -> float:
+    started = time.perf_counter()
+    response = await client.post("/quiz", headers=headers, json={"title": document["title"], "description": document["description"]})
+    quiz_id = response.json()["id"]
+    for question in document["questions"]:
+        response = await client.post("/question", headers=headers, json={"quiz_id": quiz_id, "question_text": question["question_text"]})
+        question_id = response.json()["id"]
+        for answer in question["answers"]:
+            await client.post("/answer", headers=headers, json={"question_id": question_id, **answer})
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Quiz bank import: nested document vs one request per item")
+    parser.add_argument("--questions", type=int, default=10_000)
+    parser.add_argument("--answers", type=int, default=4)
+    parser.add_argument("--categories", type=int, default=20)
+    parser.add_argument("--per-item-questions", type=int, default=200, help="questions authored one request at a time, extrapolated")
+    args = parser.parse_args()
+
+    app = get_application()
+    email, password = await random_email(), await random_lower_string()
+    async with SessionLocal() as db:
+        await create_random_user(db, email, password, is_superuser=True)
+
+    async with AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+        headers = await get_user_authentication_headers(client, email, password)
+        new_document = lambda questions: make_document(questions, args.answers, args.categories, f"Benchmark {time.time_ns()}")
+        json_seconds = await import_json(client, headers, new_document(args.questions))
+        ndjson_seconds = await import_ndjson(client, headers, new_document(args.questions))
+        per_item_seconds = await import_per_item(client, headers, new_document(args.per_item_questions))
+
+    await engine.dispose()
+    per_item_estimate = per_item_seconds * args.questions / args.per_item_questions
+    print(f"questions:          {args.questions} x {args.answers} answers")
+    print(f"json import:        {json_seconds:.2f} s")
+    print(f"ndjson import:      {ndjson_seconds:.2f} s")
+    print(f"per-item requests:  {per_item_estimate:.2f} s (extrapolated from {args.per_item_questions} questions)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Response
+from httpx import AsyncClient
+
+from app.database import base
+from app.database.models.quiz import Answer, Question, Quiz
+from app.schemes.quiz import QuizResponse
+from app.utils.quiz import compile_quiz_snapshot, generate_quiz_response
+
+
+QUIZ_SIZES = (10, 50, 200)
+
+
+def make_quiz(questions: int, answers: int) -> Quiz:
+    return Quiz(
+        id=1,
+        title="Benchmark quiz",
+        description="Quiz used to measure view serialization",
+        is_active=True,
+        questions=[
+            Question(
+                id=question_id,
+                question_text=f"Question number {question_id}?",
+                answers=[
+                    Answer(id=question_id * answers + answer_id, answer_text=f"Answer variant {answer_id}", is_correct=answer_id == 0)
+                    for answer_id in range(answers)
+                ]
+            )
+            for question_id in range(1, questions + 1)
+        ]
+    )
+
+
+async def build_app(quiz: Quiz) -> FastAPI:
+    app = FastAPI()
+    response = await generate_quiz_response(quiz)
+    snapshot = await compile_quiz_snapshot(quiz)
+
+    # how view_quiz served a cached snapshot before: validated and encoded on every request
+    @app.get("/model", response_model=QuizResponse)
+    async def view_model():
+        return response
+
+    @app.get("/bytes", response_model=QuizResponse)
+    async def view_bytes():
+        return Response(content=snapshot.body, media_type="application/json")
+
+    return app
+
+
+async def requests_per_second(client: AsyncClient, path: str, duration: float) -> float:
+    requests = 0
+    started = time.perf_counter()
+    while time.perf_counter() - started < duration:
+        response = await client.get(path)
+        assert response.status_code == 200
+        requests += 1
+    return requests / (time.perf_counter() - started)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Quiz view throughput: response model vs pre-serialized bytes")
+    parser.add_argument("--sizes", type=int, nargs="+", default=QUIZ_SIZES, help="questions per quiz")
+    parser.add_argument("--answers", type=int, default=4)
+    parser.add_argument("--duration", type=float, default=3.0)
+    args = parser.parse_args()
+
+    print(f"{'questions':>9} {'model req/s':>12} {'bytes req/s':>12} {'speedup':>8}")
+    for size in args.sizes:
+        app = await build_app(make_quiz(size, args.answers))
+        async with AsyncClient(app=app, base_url="http://benchmark") as client:
+            assert (await client.get("/model")).json() == (await client.get("/bytes")).json()
+            model_rps = await requests_per_second(client, "/model", args.duration)
+            bytes_rps = await requests_per_second(client, "/bytes", args.duration)
+        print(f"{size:>9} {model_rps:>12.0f} {bytes_rps:>12.0f} {bytes_rps / model_rps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,73 @@
+import argparse
+import asyncio
+import time
+
+from httpx import AsyncClient
+
+from app.database.session import SessionLocal, engine
+from app.main import get_application
+from app.tests.utils.quiz import create_random_quiz_graph
+from app.tests.utils.user import create_random_user
+from app.utils.result_queue import result_queue
+from app.utils.token import create_new_jwt
+
+
+async def submit_all(client: AsyncClient, submissions: list[tuple[dict[str, str], dict]], concurrency: int) -> float:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def submit(headers: dict[str, str], body: dict) -> None:
+        async with semaphore:
+            response = await client.post(f"/quiz/{body['quiz_id']}/submit", headers=headers, json=body)
+            assert response.status_code == 200, response.text
+
+    started = time.perf_counter()
+    await asyncio.gather(*(submit(headers, body) for headers, body in submissions))
+    return time.perf_counter() - started
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Quiz submissions under a spike: one commit each vs written behind")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--submissions", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    args = parser.parse_args()
+
+    async with SessionLocal() as db:
+        quiz = await create_random_quiz_graph(db, questions=5, answers=3)
+        users = [await create_random_user(db) for _ in range(args.users)]
+    answers = [
+        {"answer_id": answer.id, "is_correct": answer.is_correct}
+        for question in quiz.questions
+        for answer in question.answers
+    ]
+    headers = [
+        {"Authorization": f"Bearer {(await create_new_jwt({'email': user.email, 'id': user.id})).access_token}"}
+        for user in users
+    ]
+    submissions = [
+        (headers[number % len(headers)], {"quiz_id": quiz.id, "answers": answers})
+        for number in range(args.submissions)
+    ]
+
+    app = get_application()
+    async with AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+        # warms the quiz snapshot and the principal cache for both runs
+        await submit_all(client, submissions[:len(headers)], args.concurrency)
+        direct_seconds = await submit_all(client, submissions, args.concurrency)
+
+        await result_queue.start(SessionLocal)
+        queued_seconds = await submit_all(client, submissions, args.concurrency)
+        await result_queue.stop()
+        metrics = result_queue.metrics
+
+    await engine.dispose()
+    print(f"submissions:          {args.submissions} from {args.users} users, {args.concurrency} at a time")
+    print(f"commit per submit:    {args.submissions / direct_seconds:.0f} req/s")
+    print(f"written behind:       {args.submissions / queued_seconds:.0f} req/s")
+    print(f"flushes:              {metrics.flushes}, {metrics.written / metrics.flushes:.0f} results each, "
+          f"{metrics.flush_seconds_total / metrics.flushes * 1000:.1f} ms mean, {metrics.max_flush_seconds * 1000:.1f} ms max")
+    print(f"queue depth:          {metrics.max_depth} max")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,78 @@
+import argparse
+import asyncio
+import platform
+import random
+import sys
+
+from httpx import AsyncClient
+
+from app.database.session import SessionLocal, engine
+from app.main import get_application
+from app.utils.leaderboard import leaderboards
+from benchmarks.data import SCALES, ensure_dataset
+from benchmarks.harness import ScenarioResult, compare, count_request_queries, load_baseline, run_calls, save_baseline
+from benchmarks.scenarios import SCENARIOS
+
+
+def print_results(results: list[ScenarioResult]) -> None:
+    print(f"{'scenario':<18} {'requests':>8} {'errors':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8} {'queries':>7}")
+    for result in results:
+        print(
+            f"{result.name:<18} {result.requests:>8} {result.errors:>6} {result.requests_per_second:>8.0f} "
+            f"{result.p50_ms:>8.1f} {result.p95_ms:>8.1f} {result.p99_ms:>8.1f} {result.max_ms:>8.1f} {result.queries_per_request:>7.2f}"
+        )
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Seeded load test of the quiz API, with JSON baselines to diff against")
+    parser.add_argument("--scale", choices=sorted(SCALES), default="full")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--scenario", action="append", choices=sorted(SCENARIOS), help="run only these (repeatable)")
+    parser.add_argument("--requests", type=int, help="requests per scenario instead of each scenario's default")
+    parser.add_argument("--warmup", type=int, default=100, help="unmeasured requests before each scenario")
+    parser.add_argument("--save", metavar="PATH", help="write the results as a baseline")
+    parser.add_argument("--compare", metavar="PATH", help="diff the results against a baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed p95 increase over the baseline")
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    scale = SCALES[args.scale]
+    dataset = await ensure_dataset(SessionLocal, scale, seed=args.seed)
+    count_request_queries(engine)
+    await leaderboards.warm(SessionLocal)
+
+    results: list[ScenarioResult] = []
+    app = get_application()
+    async with AsyncClient(app=app, base_url="http://benchmark", timeout=None) as client:
+        for name in args.scenario or SCENARIOS:
+            scenario = SCENARIOS[name]
+            rng = random.Random(args.seed)
+            calls = await scenario.prepare(dataset, SessionLocal, rng, args.warmup + (args.requests or scenario.requests))
+            await run_calls(name, client, calls[:args.warmup], scenario.concurrency)
+            results.append(await run_calls(name, client, calls[args.warmup:], scenario.concurrency))
+    await engine.dispose()
+
+    print_results(results)
+    metadata = {
+        "scale": args.scale,
+        "seed": args.seed,
+        "dataset": dataset.tag,
+        "python": platform.python_version(),
+    }
+    if args.save:
+        save_baseline(args.save, metadata, results)
+    if args.compare:
+        baseline = load_baseline(args.compare)
+        if baseline.get("dataset") != dataset.tag:
+            print(f"baseline was measured on {baseline.get('dataset')}, not {dataset.tag}")
+        lines, regressions = compare(baseline, results, args.tolerance)
+        print("\n".join(lines))
+        for regression in regressions:
+            print(f"REGRESSION {regression.scenario} {regression.metric}: {regression.baseline:.2f} -> {regression.current:.2f}")
+        if regressions and args.fail_on_regression:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,114 @@
+import random
+from dataclasses import dataclass
+from typing import Awaitable, Callable
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.crud.quiz import crud_quiz
+from app.database.models.quiz import QuizResult
+from app.utils.token import create_new_jwt
+from benchmarks.data import PASSWORD, WORDS, Dataset
+from benchmarks.harness import Call
+
+
+def get(path: str, headers: dict[str, str], params: dict | None = None) -> Call:
+    return lambda client: client.get(path, headers=headers, params=params)
+
+
+def post(path: str, headers: dict[str, str] | None = None, **kwargs) -> Call:
+    return lambda client: client.post(path, headers=headers, **kwargs)
+
+
+async def auth_headers(user: tuple[int, str]) -> dict[str, str]:
+    token = await create_new_jwt({"email": user[1], "id": user[0]})
+    return {"Authorization": f"Bearer {token.access_token}"}
+
+
+async def some_users_headers(dataset: Dataset, rng: random.Random, count: int = 50) -> list[dict[str, str]]:
+    return [await auth_headers(user) for user in rng.sample(dataset.users, min(count, len(dataset.users)))]
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    requests: int
+    concurrency: int
+    # builds the calls of one run, outside of the measurement
+    prepare: Callable[[Dataset, sessionmaker, random.Random, int], Awaitable[list[Call]]]
+
+
+async def view_quiz(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await some_users_headers(dataset, rng)
+    return [get(f"/quiz/{rng.choice(dataset.quiz_ids)}/view", rng.choice(headers)) for _ in range(requests)]
+
+
+async def submit_quiz(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await some_users_headers(dataset, rng)
+    async with session_factory() as db:
+        graphs = await crud_quiz.get_graph_rows(db, ids=rng.sample(dataset.quiz_ids, min(100, len(dataset.quiz_ids))))
+    bodies = [
+        {
+            "quiz_id": quiz.id,
+            "answers": [
+                {"answer_id": answer_id, "is_correct": is_correct if rng.random() < 0.8 else not is_correct}
+                for _, _, answers in questions
+                for answer_id, _, is_correct in answers
+            ]
+        }
+        for quiz, questions in graphs
+    ]
+    calls = []
+    for _ in range(requests):
+        body = rng.choice(bodies)
+        calls.append(post(f"/quiz/{body['quiz_id']}/submit", rng.choice(headers), json=body))
+    return calls
+
+
+async def signin(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    return [post("/signin", data={"username": rng.choice(dataset.users)[1], "password": PASSWORD}) for _ in range(requests)]
+
+
+# keyset pages starting anywhere in the table, as get_multi serves them
+def page_calls(path: str, headers: dict[str, str], first_id: int, last_id: int, rng: random.Random, requests: int) -> list[Call]:
+    return [get(path, headers, {"after_id": rng.randint(first_id, last_id), "limit": 100}) for _ in range(requests)]
+
+
+async def list_quizzes(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await auth_headers(dataset.superuser)
+    return page_calls("/quizzes", headers, dataset.quiz_ids[0], dataset.quiz_ids[-1], rng, requests)
+
+
+async def list_results(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await auth_headers(dataset.superuser)
+    async with session_factory() as db:
+        first_id, last_id = (await db.execute(select(func.min(QuizResult.id), func.max(QuizResult.id)))).one()
+    return page_calls("/results", headers, first_id, last_id, rng, requests)
+
+
+async def search_questions(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await auth_headers(dataset.superuser)
+    return [
+        get("/questions/search", headers, {"q": rng.choice(WORDS), "category": rng.choice(dataset.category_ids), "limit": 20})
+        for _ in range(requests)
+    ]
+
+
+async def quiz_leaderboard(dataset: Dataset, session_factory: sessionmaker, rng: random.Random, requests: int) -> list[Call]:
+    headers = await some_users_headers(dataset, rng)
+    return [get(f"/stats/quiz/{rng.choice(dataset.quiz_ids)}/leaderboard", rng.choice(headers)) for _ in range(requests)]
+
+
+SCENARIOS = {
+    scenario.name: scenario
+    for scenario in (
+        Scenario("view_quiz", requests=2000, concurrency=50, prepare=view_quiz),
+        Scenario("submit_quiz", requests=1000, concurrency=50, prepare=submit_quiz),
+        # bounded by password hashing, so fewer requests
+        Scenario("signin", requests=100, concurrency=20, prepare=signin),
+        Scenario("list_quizzes", requests=1000, concurrency=20, prepare=list_quizzes),
+        Scenario("list_results", requests=1000, concurrency=20, prepare=list_results),
+        Scenario("search_questions", requests=1000, concurrency=20, prepare=search_questions),
+        Scenario("quiz_leaderboard", requests=2000, concurrency=50, prepare=quiz_leaderboard),
+    )
+}
@@ -0,0 +1,77 @@
+import argparse
+import asyncio
+import statistics
+import time
+
+from httpx import AsyncClient
+
+from app.core.security import password_hasher
+from app.database.base_class import Base
+from app.database.session import SessionLocal, engine
+from app.main import get_application
+from app.tests.utils.quiz import create_random_quiz_graph
+from app.tests.utils.user import create_random_user, get_user_authentication_headers
+from app.tests.utils.utils import random_email, random_lower_string
+
+
+def percentile(samples: list[float], percent: float) -> float:
+    samples = sorted(samples)
+    return samples[min(int(len(samples) * percent / 100), len(samples) - 1)]
+
+
+async def quiz_traffic(client: AsyncClient, quiz_id: int, headers: dict[str, str], stop: asyncio.Event) -> int:
+    requests = 0
+    while not stop.is_set():
+        await client.get(f"/quiz/{quiz_id}/view", headers=headers)
+        requests += 1
+    return requests
+
+
+async def signin_traffic(client: AsyncClient, email: str, password: str, stop: asyncio.Event) -> list[float]:
+    latencies: list[float] = []
+    login_data = {"username": email, "password": password}
+    while not stop.is_set():
+        started = time.perf_counter()
+        response = await client.post("/signin", data=login_data)
+        if response.status_code == 200:
+            latencies.append(time.perf_counter() - started)
+    return latencies
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Signin latency while quiz views run concurrently")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--signin-clients", type=int, default=8)
+    parser.add_argument("--quiz-clients", type=int, default=16)
+    args = parser.parse_args()
+
+    async with engine.begin() as connection:
+        await connection.run_sync(Base.metadata.create_all)
+
+    app = get_application()
+    email, password = await random_email(), await random_lower_string()
+    async with SessionLocal() as db:
+        await create_random_user(db, email, password)
+        quiz = await create_random_quiz_graph(db, questions=20, answers=4)
+
+    async with AsyncClient(app=app, base_url="http://benchmark") as client:
+        headers = await get_user_authentication_headers(client, email, password)
+        stop = asyncio.Event()
+        quiz_tasks = [asyncio.create_task(quiz_traffic(client, quiz.id, headers, stop)) for _ in range(args.quiz_clients)]
+        signin_tasks = [asyncio.create_task(signin_traffic(client, email, password, stop)) for _ in range(args.signin_clients)]
+        await asyncio.sleep(args.duration)
+        stop.set()
+        quiz_requests = sum(await asyncio.gather(*quiz_tasks))
+        latencies = [latency for task in await asyncio.gather(*signin_tasks) for latency in task]
+
+    await engine.dispose()
+    print(f"hash workers:      {password_hasher.max_workers}")
+    print(f"quiz views/s:      {quiz_requests / args.duration:.1f}")
+    print(f"signins:           {len(latencies)} ok, {password_hasher.rejected} rejected")
+    if latencies:
+        print(f"signin p50:        {statistics.median(latencies) * 1000:.1f} ms")
+        print(f"signin p99:        {percentile(latencies, 99) * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
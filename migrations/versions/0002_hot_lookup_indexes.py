@@ -0,0 +1,39 @@
+"""hot lookup indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 16:08:02.325166
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002'
+down_revision = '0001'
+branch_labels = None
+depends_on = None
+
+
+INDEXES = [
+    ('ix_quizzes_title', 'quizzes', ['title']),
+    ('ix_questions_quiz_id_question_text', 'questions', ['quiz_id', 'question_text']),
+    ('ix_answers_question_id_answer_text', 'answers', ['question_id', 'answer_text']),
+    ('ix_questions_categories_category_id', 'questions_categories', ['category_id']),
+    ('ix_quiz_results_quiz_id_user_id_finished_at', 'quiz_results', ['quiz_id', 'user_id', 'finished_at']),
+    ('ix_quiz_results_user_id_finished_at', 'quiz_results', ['user_id', 'finished_at']),
+]
+
+
+def upgrade() -> None:
+    # built concurrently so that quiz_results stays writable while they build
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, columns in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True)
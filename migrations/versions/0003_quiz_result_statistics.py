@@ -0,0 +1,84 @@
+"""quiz result statistics
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 16:14:22.105108
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003'
+down_revision = '0002'
+branch_labels = None
+depends_on = None
+
+
+PERCENTAGE = "CASE WHEN max_score > 0 THEN 100.0 * user_score / max_score ELSE 0.0 END"
+
+
+def upgrade() -> None:
+    op.create_table('quiz_stats',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('best_percentage', sa.Float(), nullable=False),
+    sa.Column('total_percentage', sa.Float(), nullable=False),
+    sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('quiz_id')
+    )
+    op.create_table('quiz_user_stats',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('best_score', sa.Float(), nullable=False),
+    sa.Column('last_score', sa.Float(), nullable=False),
+    sa.Column('max_score', sa.Float(), nullable=False),
+    sa.Column('total_percentage', sa.Float(), nullable=False),
+    sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('user_id', 'quiz_id')
+    )
+    op.create_index('ix_quiz_user_stats_quiz_id_user_id', 'quiz_user_stats', ['quiz_id', 'user_id'], unique=False)
+
+    op.execute(f"""
+        INSERT INTO quiz_user_stats
+            (user_id, quiz_id, attempts, best_score, last_score, max_score, total_percentage, last_finished_at)
+        SELECT DISTINCT ON (user_id, quiz_id)
+            user_id,
+            quiz_id,
+            count(*) OVER results,
+            max(user_score) OVER results,
+            user_score,
+            max_score,
+            sum({PERCENTAGE}) OVER results,
+            finished_at
+        FROM quiz_results
+        WHERE user_id IS NOT NULL AND quiz_id IS NOT NULL
+        WINDOW results AS (PARTITION BY user_id, quiz_id)
+        ORDER BY user_id, quiz_id, finished_at DESC, id DESC
+    """)
+    op.execute(f"""
+        INSERT INTO quiz_stats
+            (quiz_id, attempts, users, best_percentage, total_percentage, last_finished_at)
+        SELECT
+            quiz_id,
+            count(*),
+            count(DISTINCT user_id),
+            max({PERCENTAGE}),
+            sum({PERCENTAGE}),
+            max(finished_at)
+        FROM quiz_results
+        WHERE user_id IS NOT NULL AND quiz_id IS NOT NULL
+        GROUP BY quiz_id
+    """)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_quiz_user_stats_quiz_id_user_id', table_name='quiz_user_stats')
+    op.drop_table('quiz_user_stats')
+    op.drop_table('quiz_stats')
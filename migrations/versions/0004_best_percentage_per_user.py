@@ -0,0 +1,39 @@
+"""best percentage per user
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-18 16:18:41.278384
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004'
+down_revision = '0003'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_user_stats', sa.Column('best_percentage', sa.Float(), nullable=False, server_default='0'))
+    op.execute("""
+        UPDATE quiz_user_stats
+        SET best_percentage = results.best_percentage
+        FROM (
+            SELECT
+                user_id,
+                quiz_id,
+                max(CASE WHEN max_score > 0 THEN 100.0 * user_score / max_score ELSE 0.0 END) AS best_percentage
+            FROM quiz_results
+            WHERE user_id IS NOT NULL AND quiz_id IS NOT NULL
+            GROUP BY user_id, quiz_id
+        ) AS results
+        WHERE quiz_user_stats.user_id = results.user_id AND quiz_user_stats.quiz_id = results.quiz_id
+    """)
+    op.alter_column('quiz_user_stats', 'best_percentage', server_default=None)
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_user_stats', 'best_percentage')
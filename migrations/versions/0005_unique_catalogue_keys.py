@@ -0,0 +1,55 @@
+"""unique catalogue keys
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-18 16:52:14.604227
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005'
+down_revision = '0004'
+branch_labels = None
+depends_on = None
+
+
+# (constraint, table, columns, index the constraint replaces)
+CONSTRAINTS = [
+    ('uq_quizzes_title_description', 'quizzes', ['title', 'description'], 'ix_quizzes_title', ['title']),
+    ('uq_questions_quiz_id_question_text', 'questions', ['quiz_id', 'question_text'], 'ix_questions_quiz_id_question_text', ['quiz_id', 'question_text']),
+    ('uq_answers_question_id_answer_text', 'answers', ['question_id', 'answer_text'], 'ix_answers_question_id_answer_text', ['question_id', 'answer_text']),
+    ('uq_categories_name', 'categories', ['name'], 'ix_categories_name', ['name']),
+]
+
+
+def upgrade() -> None:
+    connection = op.get_bind()
+    for name, table, columns, _, _ in CONSTRAINTS:
+        key = ', '.join(columns)
+        duplicates = connection.execute(sa.text(
+            f'SELECT count(*) FROM (SELECT 1 FROM {table} GROUP BY {key} HAVING count(*) > 1) AS duplicates'
+        )).scalar()
+        if duplicates:
+            raise RuntimeError(f'{table} has {duplicates} duplicated ({key}) keys; merge them before adding {name}')
+
+    # the unique indexes are built concurrently and then adopted by the
+    # constraints, so the tables stay writable while they build
+    with op.get_context().autocommit_block():
+        for name, table, columns, _, _ in CONSTRAINTS:
+            op.create_index(name, table, columns, unique=True, postgresql_concurrently=True)
+    for name, table, _, _, _ in CONSTRAINTS:
+        op.execute(f'ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}')
+    with op.get_context().autocommit_block():
+        for _, table, _, index, _ in CONSTRAINTS:
+            op.drop_index(index, table_name=table, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for _, table, _, index, index_columns in reversed(CONSTRAINTS):
+            op.create_index(index, table, index_columns, unique=False, postgresql_concurrently=True)
+    for name, table, _, _, _ in reversed(CONSTRAINTS):
+        op.drop_constraint(name, table, type_='unique')
@@ -0,0 +1,34 @@
+"""question search indexes
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-18 18:12:37.402951
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007'
+down_revision = '0006'
+branch_labels = None
+depends_on = None
+
+
+QUESTION_SEARCH_VECTOR = sa.text("to_tsvector('english'::regconfig, question_text)")
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_questions_categories_category_id_question_id', 'questions_categories', ['category_id', 'question_id'], unique=False, postgresql_concurrently=True)
+        op.create_index('ix_questions_question_text_search', 'questions', [QUESTION_SEARCH_VECTOR], unique=False, postgresql_using='gin', postgresql_concurrently=True)
+        # the new composite index starts with category_id
+        op.drop_index('ix_questions_categories_category_id', table_name='questions_categories', postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index('ix_questions_categories_category_id', 'questions_categories', ['category_id'], unique=False, postgresql_concurrently=True)
+        op.drop_index('ix_questions_question_text_search', table_name='questions', postgresql_concurrently=True)
+        op.drop_index('ix_questions_categories_category_id_question_id', table_name='questions_categories', postgresql_concurrently=True)
@@ -0,0 +1,24 @@
+"""quiz attempt answer key
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-18 22:05:47.160923
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009'
+down_revision = '0008'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_attempts', sa.Column('answer_key', sa.LargeBinary(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('quiz_attempts', 'answer_key')
@@ -0,0 +1,50 @@
+"""drop quiz stats
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-19 10:12:31.482907
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010'
+down_revision = '0009'
+branch_labels = None
+depends_on = None
+
+
+PERCENTAGE = "CASE WHEN max_score > 0 THEN 100.0 * user_score / max_score ELSE 0.0 END"
+
+
+def upgrade() -> None:
+    op.drop_table('quiz_stats')
+
+
+def downgrade() -> None:
+    op.create_table('quiz_stats',
+    sa.Column('quiz_id', sa.Integer(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('users', sa.Integer(), nullable=False),
+    sa.Column('best_percentage', sa.Float(), nullable=False),
+    sa.Column('total_percentage', sa.Float(), nullable=False),
+    sa.Column('last_finished_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['quiz_id'], ['quizzes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('quiz_id')
+    )
+    op.execute(f"""
+        INSERT INTO quiz_stats
+            (quiz_id, attempts, users, best_percentage, total_percentage, last_finished_at)
+        SELECT
+            quiz_id,
+            count(*),
+            count(DISTINCT user_id),
+            max({PERCENTAGE}),
+            sum({PERCENTAGE}),
+            max(finished_at)
+        FROM quiz_results
+        WHERE user_id IS NOT NULL AND quiz_id IS NOT NULL
+        GROUP BY quiz_id
+    """)
@@ -0,0 +1,31 @@
+"""quiz result submission id
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-19 11:03:18.274615
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '0011'
+down_revision = '0010'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('quiz_results', sa.Column('submission_id', postgresql.UUID(as_uuid=True), nullable=True))
+    # the unique index is built concurrently and then adopted by the
+    # constraint, so quiz_results stays writable while it builds
+    with op.get_context().autocommit_block():
+        op.create_index('uq_quiz_results_submission_id', 'quiz_results', ['submission_id'], unique=True, postgresql_concurrently=True)
+    op.execute('ALTER TABLE quiz_results ADD CONSTRAINT uq_quiz_results_submission_id UNIQUE USING INDEX uq_quiz_results_submission_id')
+
+
+def downgrade() -> None:
+    op.drop_constraint('uq_quiz_results_submission_id', 'quiz_results', type_='unique')
+    op.drop_column('quiz_results', 'submission_id')